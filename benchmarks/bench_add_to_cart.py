@@ -0,0 +1,95 @@
+"""
+Benchmark the server work behind one add-to-cart click on the products page.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_add_to_cart.py --count 20000
+
+Before, the page reloaded after every add, so a click cost the add request
+plus a full products page. Now the add response carries the new count and
+the navigation fragment and the page is updated in place. The run fails
+unless the in-place update runs fewer statements and sends fewer bytes per
+click than the reload. Latency is reported only: each add commits, so it is
+dominated by fsync time, which varies too much between runs to gate on.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import event
+from viber import create_app, db
+from viber.init_db import generate_products
+
+# Products page the click happens on
+PAGE = '/products?category=Jeans&sort=price_asc'
+
+def reload_after_add(client, product_id):
+    """The old click: add to cart, then reload the page."""
+    client.post(f'/cart/add/{product_id}')
+    return len(client.get(PAGE).data)
+
+def update_in_place(client, product_id):
+    """The new click: add to cart and return the navigation fragment."""
+    return len(client.post(f'/cart/add/{product_id}?nav=1').data)
+
+def measure(client, engine, click, repeat):
+    """Return the median latency, statements and response bytes of a click."""
+    statements = []
+    def record(*args):
+        statements.append(args[2])
+    samples, sizes = [], []
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for i in range(repeat):
+            start = time.perf_counter()
+            sizes.append(click(client, i % 50 + 1))
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return statistics.median(samples), len(statements) / repeat, statistics.median(sizes)
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=20000, help='number of products')
+    parser.add_argument('--repeat', type=int, default=200, help='clicks per variant')
+    parser.add_argument('--no-grid-cache', action='store_true',
+                        help='render the reloaded page without the grid cache')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}'}
+        if args.no_grid_cache:
+            config['PRODUCT_GRID_CACHE_BYTES'] = 0
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+            db.session.bulk_save_objects(generate_products(args.count))
+            db.session.commit()
+            engine = db.engine
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['authenticated'] = True
+            sess['username'] = 'bench'
+        client.get(PAGE)  # warm up
+
+        results = {label: measure(client, engine, click, args.repeat)
+                   for label, click in [('reload after add', reload_after_add),
+                                        ('update in place', update_in_place)]}
+
+    print(f'{args.count} products, median of {args.repeat} clicks')
+    print(f'{"":20} {"ms":>10} {"statements":>12} {"bytes":>10}')
+    for label, (ms, statements, size) in results.items():
+        print(f'{label:20} {ms:10.2f} {statements:12.1f} {size:10.0f}')
+
+    before, after = results['reload after add'], results['update in place']
+    print(f'in-place update runs {before[1] / after[1]:.1f}x fewer statements and sends '
+          f'{before[2] / after[2]:.1f}x fewer bytes per click '
+          f'({before[0] / after[0]:.1f}x latency, not gated)')
+    return 0 if after[1] < before[1] and after[2] < before[2] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
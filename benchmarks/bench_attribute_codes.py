@@ -0,0 +1,128 @@
+"""
+Compare product attributes stored as strings with attributes stored as codes.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_attribute_codes.py --count 1000000
+
+Two databases are seeded with the same catalog: one migrated to the schema
+before attributes were encoded, one at the current head. The run reports
+the file and products index sizes, then the median latency of the filter
+and facet count queries the products page runs, with the same filters bound
+as strings or as codes.
+"""
+
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+from flask_migrate import upgrade
+from sqlalchemy import MetaData, Table, insert, text
+from viber import create_app, db
+from viber.init_db import generate_product_rows
+from viber.models.product import Product
+
+# Revision before product attributes were encoded
+STRING_REVISION = 'a4f8e2c6d917'
+
+# Queries shaped like the products page, with their filter values
+QUERIES = [
+    ('category page',
+     'SELECT id FROM products WHERE category IN (:a, :b) ORDER BY price, id LIMIT 25',
+     {'a': ('category', 'Jeans'), 'b': ('category', 'Pants')}),
+    ('combined filters',
+     'SELECT id FROM products WHERE color IN (:a, :b) AND size = :c AND in_stock = 1'
+     ' ORDER BY id LIMIT 25',
+     {'a': ('color', 'Black'), 'b': ('color', 'Red'), 'c': ('size', 'M')}),
+    ('filtered count',
+     'SELECT count(*) FROM products WHERE gender = :a AND season = :b',
+     {'a': ('gender', 'Women'), 'b': ('season', 'Winter')}),
+    ('facet counts',
+     'SELECT color, count(*) FROM products WHERE category = :a GROUP BY color',
+     {'a': ('category', 'Jeans')}),
+]
+
+def seed(path, revision, count, seed_value, chunk_size=20000):
+    """Migrate a database file to a revision and load the seeded catalog."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        upgrade(revision=revision)
+        if revision == 'head':
+            table = Product.__table__  # Binds attributes as codes
+        else:
+            table = Table('products', MetaData(), autoload_with=db.engine)
+        rows = generate_product_rows(count, seed_value)
+        with db.engine.begin() as connection:
+            while chunk := list(itertools.islice(rows, chunk_size)):
+                connection.execute(insert(table), chunk)
+        with db.engine.connect() as connection:
+            connection.execute(text('VACUUM'))
+            connection.execute(text('ANALYZE'))
+        db.engine.dispose()
+    return app
+
+def index_bytes(connection):
+    """Sum the bytes of the products table indexes, if dbstat is available."""
+    try:
+        return connection.execute(text(
+            "SELECT sum(pgsize) FROM dbstat WHERE name IN"
+            " (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'products')"
+        )).scalar()
+    except Exception:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+        return None
+
+def time_queries(app, encode, repeat):
+    """Return the median latency in milliseconds of each query."""
+    timings = []
+    with app.app_context():
+        with db.engine.connect() as connection:
+            for _, sql, params in QUERIES:
+                bound = {name: encode(column, value) for name, (column, value) in params.items()}
+                connection.execute(text(sql), bound).all()  # warm up
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    connection.execute(text(sql), bound).all()
+                    samples.append((time.perf_counter() - start) * 1000)
+                timings.append(statistics.median(samples))
+    return timings
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1000000, help='number of products')
+    parser.add_argument('--seed', type=int, default=42, help='catalog seed')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per query')
+    args = parser.parse_args()
+
+    def code(column, value):
+        return Product.__table__.c[column].type.codes[value]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for label, revision, encode in [('strings', STRING_REVISION, lambda column, value: value),
+                                        ('codes', 'head', code)]:
+            path = os.path.join(tmp, f'{label}.db')
+            start = time.perf_counter()
+            app = seed(path, revision, args.count, args.seed)
+            load = time.perf_counter() - start
+            with app.app_context(), db.engine.connect() as connection:
+                indexes = index_bytes(connection)
+            results[label] = (os.path.getsize(path), indexes, load,
+                              time_queries(app, encode, args.repeat))
+
+    print(f'{args.count} products')
+    print(f'{"storage":10} {"file MB":>9} {"index MB":>9} {"load s":>8}')
+    for label, (size, indexes, load, _) in results.items():
+        index_mb = f'{indexes / 1e6:9.1f}' if indexes is not None else f'{"n/a":>9}'
+        print(f'{label:10} {size / 1e6:9.1f} {index_mb} {load:8.1f}')
+    print()
+    print(f'{"query":20} {"strings ms":>11} {"codes ms":>9}')
+    for i, (name, _, _) in enumerate(QUERIES):
+        print(f'{name:20} {results["strings"][3][i]:11.2f} {results["codes"][3][i]:9.2f}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Compare the catalog snapshot with ORM products for memory and render latency.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_catalog_snapshot.py --count 100000
+
+Memory is measured with tracemalloc while holding every product, once as
+ORM instances and once as a snapshot. Latency is the median time to render
+products pages and a cart page, with the rendered grid cache and facet
+counts disabled so every request loads and renders its products and little
+else.
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from viber import create_app, db
+from viber.init_db import seed_products
+from viber.models.product import Product
+from viber.utils.snapshot import CatalogSnapshot
+
+# Query strings covering the default listing, filters, deep sorts and search
+QUERIES = [
+    '/products',
+    '/products?category=Jeans&sort=price_asc',
+    '/products?color=Black&color=Red&size=M&in_stock=true',
+    '/products?sort=name_desc',
+    '/products?q=cotton',
+]
+
+def measure(build):
+    """Return (bytes allocated, seconds) to build and hold a value."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return size, seconds
+
+def time_requests(client, urls, repeat):
+    """Return the median latency in milliseconds of each URL."""
+    timings = []
+    for url in urls:
+        client.get(url)  # warm up
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.get(url)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings.append(statistics.median(samples))
+    return timings
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100000, help='number of products')
+    parser.add_argument('--repeat', type=int, default=30, help='requests per page')
+    parser.add_argument('--cart-items', type=int, default=20, help='products in the cart')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}',
+                          'PRODUCT_GRID_CACHE_BYTES': 0, 'PRODUCT_FACET_COUNTS': False})
+        app.logger.disabled = True
+        with app.app_context():
+            db.create_all()
+            seed_products(args.count, seed=1, chunk_size=20000)
+            orm_bytes, orm_seconds = measure(lambda: Product.query.all())
+            db.session.remove()
+            snapshot_bytes, snapshot_seconds = measure(CatalogSnapshot.build)
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['authenticated'] = True
+            sess['username'] = 'bench'
+        step = max(args.count // args.cart_items, 1)
+        for product_id in range(1, args.count + 1, step):
+            client.post(f'/cart/add/{product_id}')
+        urls = QUERIES + ['/cart']
+
+        timings = {}
+        for label, enabled in (('orm', False), ('snapshot', True)):
+            app.config['CATALOG_SNAPSHOT'] = enabled
+            timings[label] = time_requests(client, urls, args.repeat)
+
+    print(f'{args.count} products')
+    print(f'{"storage":10} {"bytes/product":>14} {"load s":>8}')
+    print(f'{"orm":10} {orm_bytes / args.count:14.0f} {orm_seconds:8.2f}')
+    print(f'{"snapshot":10} {snapshot_bytes / args.count:14.0f} {snapshot_seconds:8.2f}')
+    print()
+    print(f'{"page":56} {"orm ms":>8} {"snapshot ms":>12}')
+    for url, orm_ms, snapshot_ms in zip(urls, timings['orm'], timings['snapshot']):
+        print(f'{url:56} {orm_ms:8.2f} {snapshot_ms:12.2f}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
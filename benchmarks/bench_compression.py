@@ -0,0 +1,70 @@
+"""
+Measure response sizes and latency with compression at each level.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_compression.py --count 10000
+
+Every page is requested with ``Accept-Encoding: gzip`` at several
+compression levels and without compression, reporting the body size sent
+and the median request latency.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from viber import create_app, db
+from viber.init_db import seed_products
+from viber.utils.compression import get_compression_stats
+
+URLS = ['/products', '/products?category=Jeans&sort=price_asc', '/products/facets',
+        '/api/products?format=json&fields=id,name,price', '/']
+
+LEVELS = [None, 1, 6, 9]
+
+def measure(client, url, repeat):
+    """Return (body bytes, median milliseconds) of a URL."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        size = len(response.data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return size, statistics.median(samples)
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=10000, help='number of products')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per URL and level')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}',
+                          'PAGE_CACHE_BYTES': 0})
+        with app.app_context():
+            db.create_all()
+            seed_products(args.count, seed=1)
+        client = app.test_client()
+
+        results = {}
+        for level in LEVELS:
+            app.config['RESPONSE_COMPRESSION'] = level is not None
+            app.config['COMPRESSION_LEVEL'] = level or 6
+            results[level] = [measure(client, url, args.repeat) for url in URLS]
+        with app.app_context():
+            stats = get_compression_stats().stats()
+
+    header = ''.join(f'{"off" if level is None else f"level {level}":>18}' for level in LEVELS)
+    print(f'{"url":48}{header}')
+    for i, url in enumerate(URLS):
+        cells = ''.join(f'{results[level][i][0]:>9} {results[level][i][1]:6.2f}ms'
+                        for level in LEVELS)
+        print(f'{url:48}{cells}')
+    print(f'{stats["bytes_saved"]:,} bytes saved over {stats["responses"]} responses')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
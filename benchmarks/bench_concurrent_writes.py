@@ -0,0 +1,91 @@
+"""
+Stress concurrent cart writers against one SQLite database file.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_concurrent_writes.py --workers 8 --adds 200
+
+Each worker process plays a gunicorn worker: it adds products to a cart and
+loads a page after every add. The default profile runs in rollback-journal
+mode, where readers and the writer exclude each other and any write that
+cannot get the lock within the driver timeout fails with ``database is
+locked``; the ``--timeout`` option shortens that wait to mimic contention
+outlasting it. The production profile runs in WAL mode with a busy timeout.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from viber import create_app, db
+from viber.init_db import generate_products
+
+def worker(config, username, adds, results):
+    """Add products to a cart, counting failed requests."""
+    app = create_app(config)
+    app.logger.disabled = True  # Failures are counted, not logged
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['username'] = username
+    failed = 0
+    for i in range(adds):
+        try:
+            if client.post(f'/cart/add/{i % 20 + 1}').status_code != 200:
+                failed += 1
+            client.get('/about')
+        except Exception:  # database is locked
+            failed += 1
+    results.put(failed)
+
+def run(config, workers, adds):
+    """Run the workers against a fresh database and return (errors, seconds)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = dict(config, SQLALCHEMY_DATABASE_URI=f'sqlite:///{os.path.join(tmp, "bench.db")}')
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+            db.session.bulk_save_objects(generate_products(100))
+            db.session.commit()
+            db.engine.dispose()
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(config, f'user{i}', adds, results))
+                     for i in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        errors = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return errors, time.perf_counter() - start
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=8, help='concurrent processes')
+    parser.add_argument('--adds', type=int, default=200, help='add-to-cart requests per worker')
+    parser.add_argument('--timeout', type=float, default=0.0,
+                        help='driver lock wait in seconds for the short-wait default run')
+    args = parser.parse_args()
+
+    runs = [
+        ('default', {'DATABASE_PROFILE': 'default'}),
+        (f'default, {args.timeout:g} s wait', {
+            'DATABASE_PROFILE': 'default',
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': args.timeout}}}),
+        ('production', {'DATABASE_PROFILE': 'production'}),
+    ]
+    print(f'{args.workers} workers x {args.adds} adds')
+    print(f'{"profile":24} {"errors":>8} {"seconds":>9}')
+    failed = False
+    for label, config in runs:
+        errors, seconds = run(config, args.workers, args.adds)
+        print(f'{label:24} {errors:8d} {seconds:9.2f}')
+        failed = failed or (label == 'production' and errors > 0)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
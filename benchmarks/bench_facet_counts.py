@@ -0,0 +1,85 @@
+"""
+Benchmark the latency facet counts add to the products page.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_facet_counts.py --count 50000
+
+Counts come from a single UNION ALL aggregate, or from bitmap popcounts when
+the facet index is enabled. The run fails if either mode adds more than its
+latency bound to the median request.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from viber import create_app, db
+from viber.init_db import generate_products
+
+# Query strings covering no filters, single facets and combined filters
+QUERIES = [
+    '/products',
+    '/products?color=Black',
+    '/products?category=Jeans&sort=price_asc',
+    '/products?color=Black&color=Red&size=M&in_stock=true',
+    '/products?min_price=50&max_price=80&gender=Women',
+]
+
+def time_requests(client, repeat):
+    """Return the median latency in milliseconds of each benchmark query."""
+    timings = []
+    for url in QUERIES:
+        client.get(url)  # warm up
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.get(url)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings.append(statistics.median(samples))
+    return timings
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=20000, help='number of products')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per query')
+    parser.add_argument('--max-added-ms-sql', type=float, default=50.0,
+                        help='latency bound for counts from the SQL aggregate')
+    parser.add_argument('--max-added-ms-index', type=float, default=5.0,
+                        help='latency bound for counts from the facet index')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}'})
+        with app.app_context():
+            db.create_all()
+            db.session.bulk_save_objects(generate_products(args.count))
+            db.session.commit()
+
+        client = app.test_client()
+        results = {}
+        for label, counts, index in [('no counts', False, False),
+                                     ('SQL counts', True, False),
+                                     ('index counts', True, True)]:
+            app.config.update(PRODUCT_FACET_COUNTS=counts, CATALOG_FACET_INDEX=index)
+            results[label] = time_requests(client, args.repeat)
+
+    print(f'{args.count} products, median of {args.repeat} requests (ms)')
+    print(f'{"query":60} ' + ' '.join(f'{label:>13}' for label in results))
+    for i, url in enumerate(QUERIES):
+        print(f'{url:60} ' + ' '.join(f'{timings[i]:13.2f}' for timings in results.values()))
+
+    baseline = statistics.median(results['no counts'])
+    failed = False
+    for label, bound in (('SQL counts', args.max_added_ms_sql),
+                         ('index counts', args.max_added_ms_index)):
+        added = statistics.median(results[label]) - baseline
+        status = 'ok' if added <= bound else 'FAIL'
+        print(f'{label}: +{added:.2f} ms over the page without counts (bound {bound} ms) {status}')
+        failed = failed or added > bound
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Measure first-request latency of a new worker with and without template caching.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_template_cache.py --workers 5
+
+Each run starts fresh worker processes, as a deploy or autoscaling event
+would, and times the first request to every page. Runs:
+
+- ``cold``: templates are parsed and compiled on first use
+- ``bytecode``: templates are loaded from a cache written by ``flask templates compile``
+- ``warm-up``: the bytecode cache plus ``warm_up``, which renders each page
+  before the first request; its start-up time is reported separately
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from viber import create_app, db
+from viber.init_db import seed_products
+from viber.utils.template import WARM_UP_PATHS, compile_templates, warm_up
+
+def worker(config, warm, results):
+    """Start an application and time its first request to each page."""
+    start = time.perf_counter()
+    app = create_app(config)
+    if warm:
+        with app.app_context():
+            warm_up(app)
+    startup = time.perf_counter() - start
+    client = app.test_client()
+    timings = []
+    for path in WARM_UP_PATHS:
+        start = time.perf_counter()
+        client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    results.put((startup * 1000, timings))
+
+def run(config, warm, workers):
+    """Run workers one after another and return median (start-up ms, first request ms per page)."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    samples = []
+    for _ in range(workers):
+        process = context.Process(target=worker, args=(config, warm, results))
+        process.start()
+        samples.append(results.get())
+        process.join()
+    startup = statistics.median(sample[0] for sample in samples)
+    return startup, [statistics.median(sample[1][i] for sample in samples)
+                     for i in range(len(WARM_UP_PATHS))]
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=5, help='worker starts per run')
+    parser.add_argument('--count', type=int, default=1000, help='number of products')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}',
+                  'TEMPLATE_CACHE_DIR': os.path.join(tmp, 'jinja_cache')}
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+            seed_products(args.count, seed=1)
+            db.engine.dispose()
+        compile_templates(app)
+
+        cached = dict(config, TEMPLATE_BYTECODE_CACHE=True)
+        runs = [('cold', config, False), ('bytecode', cached, False), ('warm-up', cached, True)]
+        results = {label: run(run_config, warm, args.workers) for label, run_config, warm in runs}
+
+    print(f'median of {args.workers} fresh workers, first request per page (ms)')
+    print(f'{"page":12}' + ''.join(f'{label:>12}' for label, _, _ in runs))
+    for i, path in enumerate(WARM_UP_PATHS):
+        print(f'{path:12}' + ''.join(f'{results[label][1][i]:12.1f}' for label, _, _ in runs))
+    print(f'{"start-up":12}' + ''.join(f'{results[label][0]:12.1f}' for label, _, _ in runs))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
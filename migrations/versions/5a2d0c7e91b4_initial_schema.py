@@ -0,0 +1,60 @@
+"""initial schema
+
+Revision ID: 5a2d0c7e91b4
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a2d0c7e91b4'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('image_url', sa.String(length=200), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('fit', sa.String(length=50), nullable=False),
+    sa.Column('size', sa.String(length=10), nullable=False),
+    sa.Column('color', sa.String(length=20), nullable=False),
+    sa.Column('material', sa.String(length=50), nullable=False),
+    sa.Column('style', sa.String(length=50), nullable=False),
+    sa.Column('season', sa.String(length=20), nullable=False),
+    sa.Column('gender', sa.String(length=10), nullable=False),
+    sa.Column('in_stock', sa.Boolean(), nullable=True),
+    sa.Column('stock_quantity', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=80), nullable=False),
+    sa.Column('password', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('cart_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.String(length=128), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('cart_items')
+    op.drop_table('users')
+    op.drop_table('products')
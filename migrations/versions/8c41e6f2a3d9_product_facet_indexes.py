@@ -0,0 +1,42 @@
+"""product facet indexes
+
+Revision ID: 8c41e6f2a3d9
+Revises: 5a2d0c7e91b4
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e6f2a3d9'
+down_revision = '5a2d0c7e91b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_price', ['price'], unique=False)
+        batch_op.create_index('ix_products_name', ['name'], unique=False)
+        batch_op.create_index('ix_products_category_price', ['category', 'price'], unique=False)
+        batch_op.create_index('ix_products_style', ['style'], unique=False)
+        batch_op.create_index('ix_products_size', ['size'], unique=False)
+        batch_op.create_index('ix_products_color', ['color'], unique=False)
+        batch_op.create_index('ix_products_gender', ['gender'], unique=False)
+        batch_op.create_index('ix_products_season', ['season'], unique=False)
+        batch_op.create_index('ix_products_in_stock_price', ['in_stock', 'price'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_in_stock_price')
+        batch_op.drop_index('ix_products_season')
+        batch_op.drop_index('ix_products_gender')
+        batch_op.drop_index('ix_products_color')
+        batch_op.drop_index('ix_products_style')
+        batch_op.drop_index('ix_products_size')
+        batch_op.drop_index('ix_products_category_price')
+        batch_op.drop_index('ix_products_name')
+        batch_op.drop_index('ix_products_price')
@@ -0,0 +1,33 @@
+"""product sku
+
+Revision ID: a4f8e2c6d917
+Revises: f3d6b2e8c715
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f8e2c6d917'
+down_revision = 'f3d6b2e8c715'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A nullable column is added in place, so the search triggers on
+    # products are kept
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    # Existing products get the SKU the seeder derives from their id
+    # (viber.init_db.generate_sku), so they can be exported and imported again
+    op.execute("UPDATE products SET sku = printf('VB-%08d', id) WHERE sku IS NULL")
+    op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_products_sku'), table_name='products')
+    # Dropped in place (SQLite 3.35+) rather than by recreating the table,
+    # which would lose the search triggers
+    op.drop_column('products', 'sku')
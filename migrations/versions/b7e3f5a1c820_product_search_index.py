@@ -0,0 +1,61 @@
+"""product search index
+
+Revision ID: b7e3f5a1c820
+Revises: 8c41e6f2a3d9
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f5a1c820'
+down_revision = '8c41e6f2a3d9'
+branch_labels = None
+depends_on = None
+
+# Kept inline so the migration does not change if the application module does
+CREATE_FTS_TABLE = """
+CREATE VIRTUAL TABLE products_fts USING fts5(
+    name, description,
+    content='products', content_rowid='id',
+    tokenize='porter unicode61'
+)
+"""
+
+CREATE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def upgrade():
+    op.execute(CREATE_FTS_TABLE)
+    for statement in CREATE_FTS_TRIGGERS:
+        op.execute(statement)
+    op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    for trigger in ('products_fts_au', 'products_fts_ad', 'products_fts_ai'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS products_fts')
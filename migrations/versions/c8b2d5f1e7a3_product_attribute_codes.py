@@ -0,0 +1,96 @@
+"""product attribute codes
+
+Revision ID: c8b2d5f1e7a3
+Revises: a4f8e2c6d917
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8b2d5f1e7a3'
+down_revision = 'a4f8e2c6d917'
+branch_labels = None
+depends_on = None
+
+# Kept inline so the migration does not change if the application module
+# does; codes are positions in these lists
+ATTRIBUTES = {
+    'category': (50, ['T-Shirts', 'Shirts', 'Pants', 'Jeans', 'Dresses', 'Skirts', 'Jackets',
+                      'Coats', 'Sweaters', 'Hoodies']),
+    'fit': (50, ['Regular', 'Slim', 'Relaxed', 'Oversized', 'Fitted', 'Loose']),
+    'size': (10, ['XS', 'S', 'M', 'L', 'XL', 'XXL']),
+    'color': (20, ['Black', 'White', 'Navy', 'Gray', 'Red', 'Blue', 'Green', 'Yellow', 'Purple',
+                   'Pink', 'Brown', 'Beige']),
+    'material': (50, ['Cotton', 'Polyester', 'Wool', 'Linen', 'Denim', 'Silk', 'Leather',
+                      'Canvas', 'Fleece']),
+    'style': (50, ['Casual', 'Formal', 'Sport', 'Vintage', 'Modern', 'Classic', 'Streetwear',
+                   'Business']),
+    'season': (20, ['Spring', 'Summer', 'Fall', 'Winter', 'All-Season']),
+    'gender': (10, ['Men', 'Women', 'Unisex']),
+}
+
+# Recreating the products table drops its triggers
+CREATE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def _recode(column, pairs):
+    """Rewrite a column through a CASE mapping of (old, new) values."""
+    cases = ' '.join(f"WHEN '{old}' THEN '{new}'" for old, new in pairs)
+    op.execute(f'UPDATE products SET {column} = CASE {column} {cases} END')
+
+
+def _recreate_triggers():
+    for statement in CREATE_FTS_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade():
+    connection = op.get_bind()
+    for column, (_, values) in ATTRIBUTES.items():
+        unknown = connection.execute(sa.text(
+            f'SELECT DISTINCT {column} FROM products WHERE {column} NOT IN '
+            f"({', '.join(repr(value) for value in values)})")).scalars().all()
+        if unknown:
+            raise RuntimeError(f'products.{column} has values outside the known list: {unknown}')
+
+    for column, (_, values) in ATTRIBUTES.items():
+        _recode(column, [(value, code) for code, value in enumerate(values)])
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        for column, (length, _) in ATTRIBUTES.items():
+            batch_op.alter_column(column, existing_type=sa.String(length=length),
+                                  type_=sa.SmallInteger(), existing_nullable=False)
+    _recreate_triggers()
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        for column, (length, _) in ATTRIBUTES.items():
+            batch_op.alter_column(column, existing_type=sa.SmallInteger(),
+                                  type_=sa.String(length=length), existing_nullable=False)
+    for column, (_, values) in ATTRIBUTES.items():
+        _recode(column, [(code, value) for code, value in enumerate(values)])
+    _recreate_triggers()
@@ -0,0 +1,31 @@
+"""product changes
+
+Revision ID: d9e4a6c2b158
+Revises: c8b2d5f1e7a3
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9e4a6c2b158'
+down_revision = 'c8b2d5f1e7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('operation', sa.String(length=10), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+
+
+def downgrade():
+    op.drop_table('product_changes')
@@ -0,0 +1,43 @@
+"""unique cart item product
+
+Revision ID: e5c1a7b3d904
+Revises: d2a9c4e6b1f3
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c1a7b3d904'
+down_revision = 'd2a9c4e6b1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Merge duplicate rows left by concurrent adds into the oldest row
+    op.execute("""
+        UPDATE cart_items SET quantity = (
+            SELECT SUM(duplicate.quantity) FROM cart_items AS duplicate
+            WHERE duplicate.session_id = cart_items.session_id
+              AND duplicate.product_id = cart_items.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart_items GROUP BY session_id, product_id HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM cart_items WHERE id NOT IN (
+            SELECT MIN(id) FROM cart_items GROUP BY session_id, product_id
+        )
+    """)
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.create_index('ix_cart_items_session_product', ['session_id', 'product_id'],
+                              unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_cart_items_session_product')
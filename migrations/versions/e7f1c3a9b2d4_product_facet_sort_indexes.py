@@ -0,0 +1,52 @@
+"""product facet sort indexes
+
+Revision ID: e7f1c3a9b2d4
+Revises: d9e4a6c2b158
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7f1c3a9b2d4'
+down_revision = 'd9e4a6c2b158'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Created in place rather than in a batch, which would recreate the
+    # table and lose the search triggers
+    op.create_index('ix_products_category', 'products', ['category'], unique=False)
+    op.create_index('ix_products_category_name', 'products', ['category', 'name'], unique=False)
+    op.create_index('ix_products_style_price', 'products', ['style', 'price'], unique=False)
+    op.create_index('ix_products_style_name', 'products', ['style', 'name'], unique=False)
+    op.create_index('ix_products_size_price', 'products', ['size', 'price'], unique=False)
+    op.create_index('ix_products_size_name', 'products', ['size', 'name'], unique=False)
+    op.create_index('ix_products_color_price', 'products', ['color', 'price'], unique=False)
+    op.create_index('ix_products_color_name', 'products', ['color', 'name'], unique=False)
+    op.create_index('ix_products_gender_price', 'products', ['gender', 'price'], unique=False)
+    op.create_index('ix_products_gender_name', 'products', ['gender', 'name'], unique=False)
+    op.create_index('ix_products_season_price', 'products', ['season', 'price'], unique=False)
+    op.create_index('ix_products_season_name', 'products', ['season', 'name'], unique=False)
+    op.create_index('ix_products_in_stock', 'products', ['in_stock'], unique=False)
+    op.create_index('ix_products_in_stock_name', 'products', ['in_stock', 'name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_products_in_stock_name', table_name='products')
+    op.drop_index('ix_products_in_stock', table_name='products')
+    op.drop_index('ix_products_season_name', table_name='products')
+    op.drop_index('ix_products_season_price', table_name='products')
+    op.drop_index('ix_products_gender_name', table_name='products')
+    op.drop_index('ix_products_gender_price', table_name='products')
+    op.drop_index('ix_products_color_name', table_name='products')
+    op.drop_index('ix_products_color_price', table_name='products')
+    op.drop_index('ix_products_size_name', table_name='products')
+    op.drop_index('ix_products_size_price', table_name='products')
+    op.drop_index('ix_products_style_name', table_name='products')
+    op.drop_index('ix_products_style_price', table_name='products')
+    op.drop_index('ix_products_category_name', table_name='products')
+    op.drop_index('ix_products_category', table_name='products')
@@ -0,0 +1,36 @@
+"""cart summaries
+
+Revision ID: f3d6b2e8c715
+Revises: e5c1a7b3d904
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3d6b2e8c715'
+down_revision = 'e5c1a7b3d904'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cart_summaries',
+    sa.Column('session_id', sa.String(length=128), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+    op.execute("""
+        INSERT INTO cart_summaries (session_id, item_count, total)
+        SELECT cart_items.session_id, SUM(cart_items.quantity),
+               SUM(cart_items.quantity * products.price)
+        FROM cart_items JOIN products ON products.id = cart_items.product_id
+        GROUP BY cart_items.session_id
+    """)
+
+
+def downgrade():
+    op.drop_table('cart_summaries')
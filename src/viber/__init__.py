@@ -9,7 +9,14 @@ from .routes.auth import auth_bp
 
 # Import models to ensure they are registered with SQLAlchemy
 from .models.product import Product
-from .models.cart import CartItem
+from .models.cart import CartItem, CartSummary
+from .models.catalog import CatalogVersion, ProductChange
+from .models.search import include_object
+from .utils.assets import init_assets
+from .utils.change_feed import poll_changes
+from .utils.compression import compress_response
+from .utils.database import configure_database, init_engines
+from .utils.template import configure_template_cache
 
 def create_app(config=None):
     """Create and configure the Flask application.
@@ -24,6 +31,7 @@ def create_app(config=None):
     template_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'templates'))
     static_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'static'))
     instance_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'instance'))
+    migrations_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'migrations'))
     
     # Ensure instance directory exists
     os.makedirs(instance_dir, exist_ok=True)
@@ -38,7 +46,28 @@ def create_app(config=None):
     app.config.update(
         SQLALCHEMY_DATABASE_URI=f'sqlite:///{db_path}',
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
-        SECRET_KEY='dev'  # Set a default secret key
+        DATABASE_PROFILE='default',  # 'production' enables WAL, busy waiting and pool tuning
+        CATALOG_READ_ONLY_BIND=False,  # Run catalog page queries on a read-only engine
+        SECRET_KEY='dev',  # Set a default secret key
+        PRODUCTS_PER_PAGE=24,  # Page size of the product listing
+        CATALOG_FACET_INDEX=False,  # Resolve product filters from in-memory bitmaps
+        CATALOG_SNAPSHOT=False,  # Display products from an in-memory catalog snapshot
+        PRODUCT_CHANGE_POLL_INTERVAL=1.0,  # Seconds between polls of the product change log
+        PRODUCT_FACET_COUNTS=True,  # Show per-value counts in the filter sidebar
+        PRODUCT_GRID_CACHE_BYTES=16 * 1024 * 1024,  # Rendered grid cache size, 0 disables
+        PAGE_CACHE_BYTES=1024 * 1024,  # Anonymous content page cache size, 0 disables
+        PAGE_CACHE_PATH=None,  # SQLite file sharing cached pages between workers
+        PAGE_CACHE_GZIP_LEVEL=9,  # Compression level of the cached gzip copy
+        RESPONSE_COMPRESSION=True,  # Compress HTML and JSON responses
+        COMPRESSION_LEVEL=6,  # 1 (fastest) to 9 (smallest)
+        COMPRESSION_MIN_SIZE=500,  # Smaller bodies are sent uncompressed
+        COMPRESSION_STREAM_FLUSH=8192,  # Streamed JSON is flushed after this many bytes
+        COMPRESSION_MIMETYPES=('text/html', 'application/json', 'application/x-ndjson'),
+        STREAM_PRODUCT_PAGES=True,  # Send the products page head before the grid is rendered
+        TEMPLATE_STREAM_BUFFER=8192,  # Minimum characters per streamed chunk
+        TEMPLATE_BYTECODE_CACHE=False,  # Load compiled templates from TEMPLATE_CACHE_DIR
+        TEMPLATE_CACHE_DIR=os.path.join(instance_dir, 'jinja_cache'),
+        API_YIELD_PER=1000  # Rows fetched per batch when streaming API results
     )
     
     # Override defaults with passed config
@@ -49,14 +78,35 @@ def create_app(config=None):
     if not app.config.get('SECRET_KEY'):
         app.config['SECRET_KEY'] = 'dev'
     
+    configure_template_cache(app)
+    
     # Initialize extensions with app
+    configure_database(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_engines(app)
+    migrate.init_app(app, db, directory=migrations_dir, render_as_batch=True,
+                     include_object=include_object)
     
     # Register blueprints
-    from .routes import auth_bp, cart_bp, pages_bp
+    from .routes import api_bp, auth_bp, cart_bp, pages_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(cart_bp)
     app.register_blueprint(pages_bp)
+    app.register_blueprint(api_bp)
+    
+    # Serve built static assets and add the asset URL helpers to templates
+    init_assets(app)
+    
+    # Apply product changes made by other worker processes to in-process caches
+    app.before_request(poll_changes)
+    
+    # Compress HTML and JSON responses for clients that accept it
+    app.after_request(compress_response)
+    
+    # Register CLI commands
+    from .cli import assets_cli, catalog_cli, templates_cli
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(templates_cli)
     
     return app 
\ No newline at end of file
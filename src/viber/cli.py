@@ -0,0 +1,119 @@
+"""
+Command line interface for the Viber application.
+"""
+
+import contextlib
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from .extensions import db
+from .init_db import seed_products
+from .models.catalog import ProductChange
+from .utils.assets import build_assets, vendor_assets
+from .utils.catalog_io import (FORMATS, count_unexported, detect_format, export_products,
+                               import_products, read_rows, write_rows)
+from .utils.template import compile_templates
+
+assets_cli = AppGroup('assets', help='Build the static assets.')
+catalog_cli = AppGroup('catalog', help='Manage the product catalog.')
+templates_cli = AppGroup('templates', help='Manage the page templates.')
+
+def open_stream(path: str, mode: str) -> Any:
+    """Open a file for the csv module, or the matching standard stream for '-'."""
+    if path == '-':
+        name = 'stdin' if 'r' in mode else 'stdout'
+        return contextlib.nullcontext(click.get_text_stream(name, encoding='utf-8'))
+    return open(path, mode, encoding='utf-8', newline='')
+
+@catalog_cli.command('seed')
+@click.option('--count', type=click.IntRange(min=1), default=100, show_default=True,
+              help='Number of products to generate.')
+@click.option('--seed', type=int, default=None,
+              help='Random seed for a reproducible catalog.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=10000, show_default=True,
+              help='Rows inserted per batch.')
+def seed_command(count: int, seed: Optional[int], chunk_size: int) -> None:
+    """Insert generated products into the catalog."""
+    db.create_all()
+
+    def report(done: int, elapsed: float) -> None:
+        click.echo(f'{done}/{count} products ({done / max(elapsed, 1e-9):,.0f} rows/s)')
+
+    inserted = seed_products(count, seed=seed, chunk_size=chunk_size, progress=report)
+    click.echo(f'Seeded {inserted} products.')
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'file_format', type=click.Choice(FORMATS), default=None,
+              help='File format, guessed from the file name by default.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=5000, show_default=True,
+              help='Rows written per transaction.')
+def import_command(path: str, file_format: Optional[str], chunk_size: int) -> None:
+    """Upsert products by SKU from a CSV or NDJSON file ('-' for stdin)."""
+    file_format = file_format or detect_format(path)
+
+    def reject(line_number: int, message: str) -> None:
+        click.echo(f'{path}:{line_number}: {message}', err=True)
+
+    def report(counts: Dict[str, int], elapsed: float) -> None:
+        click.echo(f"{counts['read']} rows read, {counts['written']} written "
+                   f"({counts['read'] / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    with open_stream(path, 'r') as stream:
+        counts = import_products(read_rows(stream, file_format), chunk_size=chunk_size,
+                                 on_error=reject, progress=report)
+    click.echo(f"Imported {counts['read']} rows: {counts['written']} written, "
+               f"{counts['unchanged']} unchanged, {counts['rejected']} rejected.")
+    if counts['rejected']:
+        sys.exit(1)
+
+@catalog_cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True, allow_dash=True),
+                default='-')
+@click.option('--format', 'file_format', type=click.Choice(FORMATS), default=None,
+              help='File format, guessed from the file name by default.')
+def export_command(path: str, file_format: Optional[str]) -> None:
+    """Write every product as CSV or NDJSON (to stdout by default)."""
+    file_format = file_format or detect_format(path)
+    with open_stream(path, 'w') as stream:
+        count = write_rows(stream, export_products(current_app.config['API_YIELD_PER']),
+                           file_format)
+    click.echo(f'Exported {count} products.', err=True)
+    skipped = count_unexported()
+    if skipped:
+        click.echo(f'Warning: skipped {skipped} products without a SKU, '
+                   'which could not be imported again.', err=True)
+
+@catalog_cli.command('prune-changes')
+@click.option('--days', type=click.IntRange(min=0), default=7, show_default=True,
+              help='Keep changes logged within this many days.')
+def prune_changes_command(days: int) -> None:
+    """Delete old entries from the product change log."""
+    deleted = ProductChange.prune(db.session.connection(),
+                                  datetime.utcnow() - timedelta(days=days))
+    db.session.commit()
+    click.echo(f'Pruned {deleted} product changes.')
+
+@templates_cli.command('compile')
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=None,
+              help='Bytecode cache directory (default: TEMPLATE_CACHE_DIR).')
+def compile_command(cache_dir: Optional[str]) -> None:
+    """Compile every template into the bytecode cache, e.g. at build time."""
+    directory = cache_dir or current_app.config['TEMPLATE_CACHE_DIR']
+    names = compile_templates(current_app, directory)
+    click.echo(f'Compiled {len(names)} templates into {directory}.')
+
+@assets_cli.command('build')
+def build_assets_command() -> None:
+    """Write fingerprinted, precompressed copies of the static files."""
+    manifest = build_assets(current_app.static_folder)
+    click.echo(f'Built {len(manifest)} assets into {current_app.static_folder}/dist.')
+
+@assets_cli.command('vendor')
+def vendor_assets_command() -> None:
+    """Download the Bootstrap files into the static folder, to serve them locally."""
+    for name in vendor_assets(current_app.static_folder):
+        click.echo(f'Downloaded {name}')
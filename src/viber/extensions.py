@@ -1,9 +1,26 @@
 """
 Shared Flask extensions.
 """
+from typing import Any
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
 
+# Extension key of the read-only engine used by catalog requests
+READ_ONLY_ENGINE = 'viber.read_only_engine'
+
+class RoutingSession(Session):
+    """Session sending every query of a read-only request to the read-only engine."""
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, bind: Any = None,
+                 **kwargs: Any) -> Any:
+        if bind is None and has_app_context() and g.get('read_only'):
+            engine = current_app.extensions.get(READ_ONLY_ENGINE)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 # Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate() 
\ No newline at end of file
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
@@ -2,10 +2,16 @@
 Database initialization script for Viber.
 """
 
+import itertools
 import os
 import random
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from sqlalchemy import func, insert, select
 from viber import create_app, db
+from viber.models.catalog import CatalogVersion, ProductChange
 from viber.models.product import Product
+from viber.models.search import create_search_triggers, drop_search_triggers, rebuild_search_index
 
 # Product attributes for generating diverse items
 CATEGORIES = ['T-Shirts', 'Shirts', 'Pants', 'Jeans', 'Dresses', 'Skirts', 'Jackets', 'Coats', 'Sweaters', 'Hoodies']
@@ -17,43 +23,112 @@ STYLES = ['Casual', 'Formal', 'Sport', 'Vintage', 'Modern', 'Classic', 'Streetwe
 SEASONS = ['Spring', 'Summer', 'Fall', 'Winter', 'All-Season']
 GENDERS = ['Men', 'Women', 'Unisex']
 
-def generate_price():
+def generate_sku(product_id: int) -> str:
+    """Generate the SKU of a product from its id; the SKU migration backfills the same."""
+    return f'VB-{product_id:08d}'
+
+def generate_price(rng: Any = random):
     """Generate a random price between 19.99 and 199.99."""
-    return round(random.uniform(19.99, 199.99), 2)
+    return round(rng.uniform(19.99, 199.99), 2)
 
 def generate_description(name, material, style, fit):
     """Generate a product description."""
     return f"A {style.lower()} {name.lower()} made from premium {material.lower()}. " \
            f"Features a {fit.lower()} fit that's perfect for any occasion."
 
-def generate_products(count=100):
-    """Generate a list of diverse products."""
-    products = []
-    for _ in range(count):
-        category = random.choice(CATEGORIES)
-        style = random.choice(STYLES)
-        material = random.choice(MATERIALS)
-        fit = random.choice(FITS)
+def generate_product_rows(count: int, seed: Optional[int] = None,
+                          first_id: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Generate product rows one at a time.
+
+    Args:
+        count: Number of rows to generate
+        seed: Seed for a reproducible catalog, or None for a random one
+        first_id: Id the first row will be stored under, which its SKU is
+            derived from; the following rows count up from it
+
+    Yields:
+        dict: Column values of one product
+    """
+    rng = random.Random(seed)
+    for product_id in range(first_id, first_id + count):
+        category = rng.choice(CATEGORIES)
+        style = rng.choice(STYLES)
+        material = rng.choice(MATERIALS)
+        fit = rng.choice(FITS)
         name = f"{style} {material} {category.rstrip('s')}"
-        in_stock = random.choice([True, True, True, False])  # 75% chance of being in stock
+        in_stock = rng.choice([True, True, True, False])  # 75% chance of being in stock
         
-        products.append(Product(
+        yield dict(
+            sku=generate_sku(product_id),
             name=name,
             description=generate_description(name, material, style, fit),
-            price=generate_price(),
+            price=generate_price(rng),
             image_url=f'https://placehold.co/300x200?text={name.replace(" ", "+")}',
             category=category,
             fit=fit,
-            size=random.choice(SIZES),
-            color=random.choice(COLORS),
+            size=rng.choice(SIZES),
+            color=rng.choice(COLORS),
             material=material,
             style=style,
-            season=random.choice(SEASONS),
-            gender=random.choice(GENDERS),
+            season=rng.choice(SEASONS),
+            gender=rng.choice(GENDERS),
             in_stock=in_stock,
-            stock_quantity=random.randint(0, 50) if in_stock else 0
-        ))
-    return products
+            stock_quantity=rng.randint(0, 50) if in_stock else 0
+        )
+
+def generate_products(count=100, seed=None, first_id=1):
+    """Generate a list of diverse products."""
+    return [Product(**row) for row in generate_product_rows(count, seed, first_id)]
+
+def seed_products(count: int, seed: Optional[int] = None, chunk_size: int = 10000,
+                  progress: Optional[Callable[[int, float], None]] = None) -> int:
+    """
+    Insert generated products in chunked executemany batches in one transaction.
+
+    When the load at least doubles the catalog, the product indexes and the
+    search triggers are dropped for the load and rebuilt once afterwards,
+    which is much faster than maintaining them row by row. Rows get the ids
+    following the current highest one, and SKUs derived from those ids, so
+    repeated loads never collide.
+
+    Args:
+        count: Number of products to insert
+        seed: Seed for a reproducible catalog, or None for a random one
+        chunk_size: Rows per executemany batch
+        progress: Called with (rows inserted, seconds elapsed) after each batch
+
+    Returns:
+        int: Number of products inserted
+    """
+    connection = db.session.connection()
+    indexes: List[Any] = []
+    if count >= db.session.query(Product).count():
+        indexes = list(Product.__table__.indexes)
+        for index in indexes:
+            index.drop(connection)
+        drop_search_triggers(connection)
+
+    statement = insert(Product.__table__)
+    first_id = (connection.execute(select(func.max(Product.id))).scalar() or 0) + 1
+    rows = generate_product_rows(count, seed, first_id)
+    inserted = 0
+    start = time.perf_counter()
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        connection.execute(statement, chunk)
+        inserted += len(chunk)
+        if progress:
+            progress(inserted, time.perf_counter() - start)
+
+    if indexes:
+        for index in indexes:
+            index.create(connection)
+        rebuild_search_index(connection)
+        create_search_triggers(connection)
+    CatalogVersion.bump(connection)
+    ProductChange.record(connection, ProductChange.RESET)
+    db.session.commit()
+    return inserted
 
 def init_db():
     """Initialize the database with tables and sample data."""
@@ -70,9 +145,7 @@ def init_db():
         db.create_all()
         
         # Add sample data
-        products = generate_products(100)
-        db.session.bulk_save_objects(products)
-        db.session.commit()
+        seed_products(100)
         print("Database initialized with 100 sample products.")
 
 if __name__ == '__main__':
@@ -3,6 +3,8 @@ Models package.
 """
 from .user import User
 from .product import Product
-from .cart import CartItem
+from .cart import CartItem, CartSummary
+from .catalog import CatalogVersion, ProductChange
+from . import search  # Registers the full-text search index DDL
 
-__all__ = ['User', 'Product', 'CartItem'] 
\ No newline at end of file
+__all__ = ['User', 'Product', 'CartItem', 'CartSummary', 'CatalogVersion', 'ProductChange'] 
\ No newline at end of file
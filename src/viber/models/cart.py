@@ -2,12 +2,21 @@
 Cart model for the Viber application.
 """
 
+from typing import Any, Iterable, List, Optional, Tuple
+from sqlalchemy import event, literal
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import joinedload
 from ..extensions import db
+from .product import Product
 
 class CartItem(db.Model):
     """CartItem model for storing items in user carts."""
     
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        # One row per product in a cart; also serves lookups by session
+        db.Index('ix_cart_items_session_product', 'session_id', 'product_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     quantity = db.Column(db.Integer, nullable=False, default=1)
@@ -27,6 +36,84 @@ class CartItem(db.Model):
             'total': self.product.price * self.quantity
         }
     
+    @classmethod
+    def add(cls, session_id: str, product_id: int, quantity: int = 1) -> Optional[int]:
+        """Add a product to the cart for a session in a single statement.
+        
+        The row is inserted, or its quantity incremented if the product is
+        already in the cart, so concurrent adds never create duplicate rows.
+        The caller commits.
+        
+        Args:
+            session_id: The session identifier
+            product_id: The product to add
+            quantity: How many to add
+            
+        Returns:
+            int: The new quantity of the product in the cart, or None if
+            the product does not exist
+        """
+        table = cls.__table__
+        source = (db.select(literal(session_id), Product.id, literal(quantity))
+                  .where(Product.id == product_id))
+        statement = insert(table).from_select(['session_id', 'product_id', 'quantity'], source)
+        statement = statement.on_conflict_do_update(
+            index_elements=['session_id', 'product_id'],
+            set_={'quantity': table.c.quantity + statement.excluded.quantity}
+        ).returning(table.c.quantity)
+        quantity = db.session.execute(statement).scalar()
+        if quantity is not None:
+            CartSummary.refresh(db.session.connection(), session_id)
+        return quantity
+    
+    @classmethod
+    def get_cart_items(cls, session_id: str) -> List['CartItem']:
+        """Get the items in cart for a session with their products loaded.
+        
+        Args:
+            session_id: The session identifier
+            
+        Returns:
+            list: Cart items in the order they were added
+        """
+        return (cls.query.options(joinedload(cls.product))
+                .filter_by(session_id=session_id)
+                .order_by(cls.id)
+                .all())
+    
+    @classmethod
+    def get_cart_rows(cls, session_id: str) -> List[Tuple[int, int, int]]:
+        """Get the items in cart for a session without loading their products.
+        
+        Args:
+            session_id: The session identifier
+            
+        Returns:
+            list: (item id, product id, quantity) rows in the order they were added
+        """
+        return [tuple(row) for row in db.session.execute(
+            db.select(cls.id, cls.product_id, cls.quantity)
+            .where(cls.session_id == session_id)
+            .order_by(cls.id))]
+    
+    @classmethod
+    def get_cart_totals(cls, session_id: str) -> Tuple[int, float]:
+        """Get the number of items and the total price of the cart for a session.
+        
+        Args:
+            session_id: The session identifier
+            
+        Returns:
+            tuple: (total number of items, total price)
+        """
+        count, total = db.session.execute(
+            db.select(db.func.coalesce(db.func.sum(cls.quantity), 0),
+                      db.func.coalesce(db.func.sum(cls.quantity * Product.price), 0.0))
+            .join(Product, Product.id == cls.product_id)
+            .where(cls.session_id == session_id)
+        ).one()
+        return count, total
+    
     @classmethod
     def get_cart_count(cls, session_id):
         """Get total number of items in cart for a session.
@@ -37,8 +124,10 @@ class CartItem(db.Model):
         Returns:
             int: Total number of items in cart
         """
-        cart_items = cls.query.filter_by(session_id=session_id).all()
-        return sum(item.quantity for item in cart_items)
+        return db.session.execute(
+            db.select(db.func.coalesce(db.func.sum(cls.quantity), 0))
+            .where(cls.session_id == session_id)
+        ).scalar()
     
     @classmethod
     def clear_cart(cls, session_id):
@@ -48,4 +137,120 @@ class CartItem(db.Model):
             session_id: The session identifier
         """
         cls.query.filter_by(session_id=session_id).delete()
-        db.session.commit() 
\ No newline at end of file
+        CartSummary.refresh(db.session.connection(), session_id)
+        db.session.commit()
+
+class CartSummary(db.Model):
+    """Item count and total of a cart, kept in step with its cart items.
+    
+    Every cart change refreshes the summary in the same transaction: ORM
+    changes through session flush events, bulk statements by calling
+    ``refresh`` themselves. Pages read the navigation cart count from here
+    by primary key instead of aggregating cart items.
+    """
+    
+    __tablename__ = 'cart_summaries'
+    
+    session_id = db.Column(db.String(128), primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        """String representation of the cart summary."""
+        return f'<CartSummary {self.session_id}: {self.item_count}>'
+    
+    @classmethod
+    def get_count(cls, session_id: str) -> int:
+        """Get the number of items in cart for a session.
+        
+        Args:
+            session_id: The session identifier
+            
+        Returns:
+            int: Total number of items in cart
+        """
+        count = db.session.execute(
+            db.select(cls.item_count).where(cls.session_id == session_id)).scalar()
+        return count or 0
+    
+    @classmethod
+    def get_totals(cls, session_id: str) -> Tuple[int, float]:
+        """Get the number of items and the total price of the cart for a session.
+        
+        Args:
+            session_id: The session identifier
+            
+        Returns:
+            tuple: (total number of items, total price)
+        """
+        row = db.session.execute(
+            db.select(cls.item_count, cls.total).where(cls.session_id == session_id)).first()
+        return (row.item_count, row.total) if row else (0, 0.0)
+    
+    @classmethod
+    def refresh(cls, connection: Any, session_id: str) -> None:
+        """Recompute the summary of a cart from its items.
+        
+        Args:
+            connection: The connection the cart changes were made on
+            session_id: The session identifier
+        """
+        items = CartItem.__table__
+        source = (db.select(literal(session_id),
+                            db.func.coalesce(db.func.sum(items.c.quantity), 0),
+                            db.func.coalesce(db.func.sum(items.c.quantity * Product.price), 0.0))
+                  .select_from(items.join(Product.__table__, Product.id == items.c.product_id))
+                  .where(items.c.session_id == session_id))
+        connection.execute(cls._upsert(source))
+    
+    @classmethod
+    def refresh_products(cls, connection: Any, product_ids: Iterable[int]) -> None:
+        """Recompute the summaries of every cart holding one of the products.
+        
+        Args:
+            connection: The connection the product changes were made on
+            product_ids: The changed products
+        """
+        items = CartItem.__table__
+        carts = db.select(items.c.session_id).where(items.c.product_id.in_(list(product_ids)))
+        source = (db.select(items.c.session_id,
+                            db.func.sum(items.c.quantity),
+                            db.func.sum(items.c.quantity * Product.price))
+                  .select_from(items.join(Product.__table__, Product.id == items.c.product_id))
+                  .where(items.c.session_id.in_(carts))
+                  .group_by(items.c.session_id))
+        connection.execute(cls._upsert(source))
+    
+    @classmethod
+    def _upsert(cls, source: Any) -> Any:
+        """Build an upsert of (session id, item count, total) rows."""
+        statement = insert(cls.__table__).from_select(['session_id', 'item_count', 'total'], source)
+        return statement.on_conflict_do_update(
+            index_elements=['session_id'],
+            set_={'item_count': statement.excluded.item_count, 'total': statement.excluded.total})
+
+@event.listens_for(db.session, 'before_flush')
+def _detect_cart_changes(session: Any, flush_context: Any, instances: Any) -> None:
+    """Collect the carts and product prices changed by a flush."""
+    carts = session.info.setdefault('changed_carts', set())
+    prices = session.info.setdefault('changed_prices', set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, CartItem):
+            carts.add(obj.session_id)
+            # A cart item moved to another cart changes the old cart too
+            carts.update(db.inspect(obj).attrs.session_id.history.deleted)
+        elif isinstance(obj, Product) and obj.id is not None:
+            if db.inspect(obj).attrs.price.history.has_changes():
+                prices.add(obj.id)
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_cart_summaries(session: Any, flush_context: Any) -> None:
+    """Refresh the summaries of changed carts in the same transaction."""
+    carts = session.info.pop('changed_carts', ())
+    prices = session.info.pop('changed_prices', ())
+    connection = session.connection() if carts or prices else None
+    for session_id in carts:
+        if session_id is not None:
+            CartSummary.refresh(connection, session_id)
+    if prices:
+        CartSummary.refresh_products(connection, prices) 
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+Catalog version and product change log models for the Viber application.
+"""
+
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, event, insert, update
+from ..extensions import db
+from .cart import CartSummary
+from .product import Product
+
+class CatalogVersion(db.Model):
+    """Single-row counter bumped whenever any product changes."""
+
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        """String representation of the catalog version."""
+        return f'<CatalogVersion {self.version}>'
+
+    @classmethod
+    def current(cls) -> int:
+        """Get the current catalog version.
+
+        Returns:
+            int: The version number, or 0 if the catalog has never changed
+        """
+        version = db.session.execute(
+            db.select(cls.version).where(cls.id == 1)).scalar()
+        return version or 0
+
+    @classmethod
+    def stamp(cls) -> Tuple[int, Optional[datetime]]:
+        """Get the current catalog version and the time it last changed.
+
+        Returns:
+            tuple: (version number, last change in UTC or None if unknown)
+        """
+        row = db.session.execute(
+            db.select(cls.version, cls.updated_at).where(cls.id == 1)).first()
+        if row is None:
+            return 0, None
+        return row.version, row.updated_at
+
+    @classmethod
+    def bump(cls, connection: Any) -> None:
+        """Increment the catalog version.
+
+        Bulk writes that bypass the ORM must call this themselves, inside the
+        same transaction as the product changes.
+
+        Args:
+            connection: The connection the product changes were made on
+        """
+        connection.execute(update(cls.__table__).where(cls.__table__.c.id == 1).values(
+            version=cls.__table__.c.version + 1,
+            updated_at=db.func.current_timestamp()))
+
+class ProductChange(db.Model):
+    """Append-only log of product changes, read by every worker to refresh its caches."""
+
+    __tablename__ = 'product_changes'
+    # Ids must never be reused after old entries are pruned, or a worker
+    # could skip changes numbered below its watermark
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    RESET = 'reset'  # Too many changes to list; reload every product
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer)  # None for a reset
+    operation = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        """String representation of the product change."""
+        return f'<ProductChange {self.id} {self.operation} {self.product_id}>'
+
+    @classmethod
+    def record(cls, connection: Any, operation: str,
+               product_ids: Optional[Iterable[int]] = None) -> None:
+        """Log product changes.
+
+        Bulk writes that bypass the ORM must call this themselves, inside the
+        same transaction as the product changes.
+
+        Args:
+            connection: The connection the product changes were made on
+            operation: ``UPSERT``, ``DELETE`` or ``RESET``
+            product_ids: The changed products; ignored for a reset
+        """
+        if operation == cls.RESET:
+            rows = [{'product_id': None, 'operation': operation}]
+        else:
+            rows = [{'product_id': product_id, 'operation': operation}
+                    for product_id in product_ids or ()]
+        if rows:
+            connection.execute(insert(cls.__table__), rows)
+
+    @classmethod
+    def latest(cls) -> int:
+        """Get the id of the newest change, the watermark of an up to date reader.
+
+        Returns:
+            int: The id, or 0 if no change was ever logged
+        """
+        return db.session.execute(db.select(db.func.max(cls.id))).scalar() or 0
+
+    @classmethod
+    def oldest(cls) -> Optional[int]:
+        """Get the id of the oldest change still in the log."""
+        return db.session.execute(db.select(db.func.min(cls.id))).scalar()
+
+    @classmethod
+    def since(cls, watermark: int, limit: int = 1000) -> List[Tuple[int, Optional[int], str]]:
+        """Get the changes logged after a watermark.
+
+        Args:
+            watermark: The id of the last change already applied
+            limit: Maximum number of changes to return
+
+        Returns:
+            list: (id, product id, operation) rows in log order
+        """
+        return [tuple(row) for row in db.session.execute(
+            db.select(cls.id, cls.product_id, cls.operation)
+            .where(cls.id > watermark)
+            .order_by(cls.id)
+            .limit(limit))]
+
+    @classmethod
+    def prune(cls, connection: Any, before: datetime) -> int:
+        """Delete changes logged before a point in time.
+
+        Workers whose watermark falls behind the pruned range reload their
+        caches in full on their next poll.
+
+        Args:
+            connection: The connection to delete on
+            before: Changes logged before this time (UTC) are deleted
+
+        Returns:
+            int: Number of deleted changes
+        """
+        return connection.execute(
+            delete(cls.__table__).where(cls.__table__.c.changed_at < before)).rowcount
+
+@event.listens_for(CatalogVersion.__table__, 'after_create')
+def _insert_catalog_version(target: Any, connection: Any, **kw: Any) -> None:
+    connection.execute(target.insert().values(id=1, version=0))
+
+@event.listens_for(db.session, 'before_flush')
+def _detect_product_changes(session: Any, flush_context: Any, instances: Any) -> None:
+    """Flag flushes that insert, update or delete products."""
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Product):
+            session.info['catalog_changed'] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, Product) and session.is_modified(obj):
+            session.info['catalog_changed'] = True
+            return
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_catalog_version(session: Any, flush_context: Any) -> None:
+    """Bump the catalog version and log the product changes in the same transaction."""
+    if not session.info.pop('catalog_changed', False):
+        return
+    connection = session.connection()
+    CatalogVersion.bump(connection)
+    upserted = [obj.id for obj in session.new | session.dirty
+                if isinstance(obj, Product) and session.is_modified(obj)]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Product)]
+    ProductChange.record(connection, ProductChange.UPSERT, upserted)
+    ProductChange.record(connection, ProductChange.DELETE, deleted)
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _log_bulk_product_changes(orm_execute_state: Any) -> Any:
+    """Bump the catalog version and log the products changed by ORM bulk updates and deletes.
+
+    ``Query.update``, ``Query.delete`` and ``session.execute(update(Product))``
+    do not flush, so the flush listeners never see them. The affected ids
+    are selected with the statement's own criteria before it runs.
+    """
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, Product):
+        return None
+    session = orm_execute_state.session
+    if orm_execute_state.is_executemany:
+        product_ids = [params['id'] for params in orm_execute_state.parameters]
+    else:
+        query = db.select(Product.id)
+        whereclause = orm_execute_state.statement.whereclause
+        if whereclause is not None:
+            query = query.where(whereclause)
+        product_ids = list(session.execute(query, orm_execute_state.parameters).scalars())
+    result = orm_execute_state.invoke_statement()
+    if product_ids:
+        connection = session.connection()
+        CatalogVersion.bump(connection)
+        if orm_execute_state.is_delete:
+            ProductChange.record(connection, ProductChange.DELETE, product_ids)
+        else:
+            ProductChange.record(connection, ProductChange.UPSERT, product_ids)
+            CartSummary.refresh_products(connection, product_ids)
+    return result
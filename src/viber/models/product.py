@@ -2,9 +2,13 @@
 Product model for the Viber application.
 """
 
+from typing import Any, Optional, Sequence
+from sqlalchemy.types import SmallInteger, TypeDecorator
 from ..extensions import db
 
-# Constants for product attributes
+# Constants for product attributes. Values are stored as their position in
+# these lists, so new values must be appended and existing ones never
+# reordered or removed without a data migration.
 CATEGORIES = ['T-Shirts', 'Shirts', 'Pants', 'Jeans', 'Dresses', 'Skirts', 'Jackets', 'Coats', 'Sweaters', 'Hoodies']
 FITS = ['Regular', 'Slim', 'Relaxed', 'Oversized', 'Fitted', 'Loose']
 SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
@@ -14,23 +18,63 @@ STYLES = ['Casual', 'Formal', 'Sport', 'Vintage', 'Modern', 'Classic', 'Streetwe
 SEASONS = ['Spring', 'Summer', 'Fall', 'Winter', 'All-Season']
 GENDERS = ['Men', 'Women', 'Unisex']
 
+class EnumCode(TypeDecorator):
+    """
+    A string from a fixed list of values, stored as its position in the list.
+
+    Rows and indexes hold small integers instead of repeated strings, and
+    filters compare integers, while Python code and templates keep seeing
+    the strings. Values outside the list bind as NULL, so they match nothing
+    in a filter and are rejected by a NOT NULL column on write.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, values: Sequence[str]) -> None:
+        super().__init__()
+        self.values = tuple(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def process_bind_param(self, value: Optional[str], dialect: Any) -> Optional[int]:
+        """Convert a value to its code."""
+        return None if value is None else self.codes.get(value)
+
+    def process_result_value(self, value: Optional[int], dialect: Any) -> Optional[str]:
+        """Convert a code back to its value."""
+        return None if value is None else self.values[value]
+
 class Product(db.Model):
     """Product model for storing product items."""
     __tablename__ = 'products'
+    __table_args__ = (
+        # Every SQLite index ends with the rowid, so (column, id) keyset order
+        # comes for free from a single-column index on the sort column
+        db.Index('ix_products_price', 'price'),
+        db.Index('ix_products_name', 'name'),
+        # For each filter, one index per sort: (facet) walks a facet value in
+        # featured (id) order, (facet, price) and (facet, name) in price and
+        # name order, so a filtered page never sorts the whole filtered set
+        *[db.Index(f'ix_products_{facet}{suffix}', facet, *columns)
+          for facet in ('category', 'style', 'size', 'color', 'gender', 'season', 'in_stock')
+          for suffix, columns in (('', ()), ('_price', ('price',)), ('_name', ('name',)))],
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    sku = db.Column(db.String(64), unique=True, index=True)  # Stable key for catalog imports
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.Float, nullable=False)
     image_url = db.Column(db.String(200), nullable=False)
-    category = db.Column(db.String(50), nullable=False, default=CATEGORIES[0])
-    fit = db.Column(db.String(50), nullable=False, default=FITS[0])
-    size = db.Column(db.String(10), nullable=False, default=SIZES[2])  # Default to M
-    color = db.Column(db.String(20), nullable=False, default=COLORS[0])
-    material = db.Column(db.String(50), nullable=False, default=MATERIALS[0])
-    style = db.Column(db.String(50), nullable=False, default=STYLES[0])
-    season = db.Column(db.String(20), nullable=False, default=SEASONS[-1])  # Default to All-Season
-    gender = db.Column(db.String(10), nullable=False, default=GENDERS[-1])  # Default to Unisex
+    category = db.Column(EnumCode(CATEGORIES), nullable=False, default=CATEGORIES[0])
+    fit = db.Column(EnumCode(FITS), nullable=False, default=FITS[0])
+    size = db.Column(EnumCode(SIZES), nullable=False, default=SIZES[2])  # Default to M
+    color = db.Column(EnumCode(COLORS), nullable=False, default=COLORS[0])
+    material = db.Column(EnumCode(MATERIALS), nullable=False, default=MATERIALS[0])
+    style = db.Column(EnumCode(STYLES), nullable=False, default=STYLES[0])
+    season = db.Column(EnumCode(SEASONS), nullable=False,
+                       default=SEASONS[-1])  # Default to All-Season
+    gender = db.Column(EnumCode(GENDERS), nullable=False, default=GENDERS[-1])  # Default to Unisex
     in_stock = db.Column(db.Boolean, default=True)
     stock_quantity = db.Column(db.Integer, default=10)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -0,0 +1,102 @@
+"""
+Full-text search index for products.
+
+Product names and descriptions are mirrored into an SQLite FTS5 table using
+external content, so the index stores only tokens and reads the text from the
+products table. Triggers keep it in sync with every insert, update and delete.
+"""
+
+import re
+from typing import Any, Optional
+from sqlalchemy import column, event, literal_column, table, text
+from ..extensions import db
+from .product import Product
+
+FTS_TABLE = 'products_fts'
+
+products_fts = table(FTS_TABLE, column('rowid'), column('rank'))
+
+CREATE_FTS_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    name, description,
+    content='products', content_rowid='id',
+    tokenize='porter unicode61'
+)
+"""
+
+CREATE_FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+FTS_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+def create_search_triggers(connection: Any) -> None:
+    """Create the triggers that keep the search index in sync with products."""
+    for statement in CREATE_FTS_TRIGGERS:
+        connection.execute(text(statement))
+
+def drop_search_triggers(connection: Any) -> None:
+    """Drop the sync triggers, e.g. before a bulk load followed by a rebuild."""
+    for trigger in FTS_TRIGGERS:
+        connection.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+
+def rebuild_search_index(connection: Any) -> None:
+    """Repopulate the whole search index from the products table in one pass."""
+    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+@event.listens_for(Product.__table__, 'after_create')
+def _create_search_index(target: Any, connection: Any, **kw: Any) -> None:
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(CREATE_FTS_TABLE))
+        create_search_triggers(connection)
+
+@event.listens_for(Product.__table__, 'before_drop')
+def _drop_search_index(target: Any, connection: Any, **kw: Any) -> None:
+    if connection.dialect.name == 'sqlite':
+        drop_search_triggers(connection)
+        connection.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+
+def include_object(obj: Any, name: str, type_: str, reflected: bool, compare_to: Any) -> bool:
+    """Hide the search index and its shadow tables from migration autogenerate."""
+    return not (type_ == 'table' and reflected and name.startswith(FTS_TABLE))
+
+def match_expression(query: Optional[str]) -> Optional[str]:
+    """
+    Convert user input into a safe FTS5 match expression.
+
+    Every word is quoted so FTS5 operators in the input are treated as text,
+    and the last word matches as a prefix so results update while typing.
+
+    Args:
+        query: The search text entered by the user
+
+    Returns:
+        str: The match expression, or None if the input has no words
+    """
+    words = re.findall(r'\w+', query or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+def search_condition(expression: str) -> Any:
+    """Build the MATCH condition for a match expression."""
+    return literal_column(FTS_TABLE).op('MATCH')(expression)
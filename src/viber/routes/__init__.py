@@ -2,8 +2,9 @@
 Route blueprints for the Viber application.
 """
 
+from .api import api_bp
 from .auth import auth_bp
 from .cart import cart_bp
 from .pages import pages_bp
 
-__all__ = ['auth_bp', 'cart_bp', 'pages_bp'] 
\ No newline at end of file
+__all__ = ['api_bp', 'auth_bp', 'cart_bp', 'pages_bp'] 
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+JSON API routes for the Viber application.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Sequence
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import select
+from ..extensions import db
+from ..models.product import Product
+from ..utils.catalog import SORT_OPTIONS, parse_filters, parse_sort, apply_filters, sort_column
+from ..utils.database import use_read_only
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+# The API only reads, so its queries can run on the read-only engine
+api_bp.before_request(use_read_only)
+
+# Product fields available to API consumers, in output order
+PRODUCT_FIELDS = ('id', 'name', 'description', 'price', 'image_url', 'category', 'fit',
+                  'size', 'color', 'material', 'style', 'season', 'gender', 'in_stock',
+                  'stock_quantity')
+
+# Response formats mapped to their mimetypes
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+def parse_fields(value: str) -> List[str]:
+    """
+    Parse a comma separated field projection.
+
+    Args:
+        value: The ``fields`` argument, empty for every field
+
+    Returns:
+        list: The requested fields, in the order given
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields)) or list(PRODUCT_FIELDS)
+
+def stream_products(selected_filters: Dict[str, Any], sort: str,
+                    fields: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream matching products as dictionaries of the requested fields.
+
+    Only the requested columns are selected, and rows are fetched from the
+    cursor in batches of ``API_YIELD_PER`` so memory use does not grow with
+    the size of the catalog.
+
+    Args:
+        selected_filters: The selected filters
+        sort: The sort option
+        fields: The fields to include
+
+    Yields:
+        dict: One product per matching row
+    """
+    statement = select(*[getattr(Product, field) for field in fields]).select_from(Product)
+    statement = apply_filters(statement, selected_filters)
+    _, descending = SORT_OPTIONS[sort]
+    keys = [key for key in (sort_column(sort), Product.id) if key is not None]
+    statement = statement.order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+    result = db.session.execute(statement, execution_options={
+        'yield_per': current_app.config['API_YIELD_PER']})
+    try:
+        for row in result:
+            yield dict(zip(fields, row))
+    finally:
+        result.close()
+
+def ndjson_lines(products: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Encode products as newline delimited JSON."""
+    for product in products:
+        yield json.dumps(product, separators=(',', ':')) + '\n'
+
+def json_array(products: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Encode products as a JSON array, one element at a time."""
+    yield '['
+    separator = '\n'
+    for product in products:
+        yield separator + json.dumps(product, separators=(',', ':'))
+        separator = ',\n'
+    yield '\n]\n'
+
+@api_bp.route('/products')
+def products() -> Any:
+    """
+    Stream the products matching the same filters as the products page.
+
+    Query arguments are those of ``/products`` plus ``fields`` (a comma
+    separated projection, default every field) and ``format`` (``ndjson``,
+    the default, or ``json`` for a single array).
+    """
+    output_format = request.args.get('format', 'ndjson')
+    if output_format not in FORMATS:
+        return jsonify({'error': f'Unknown format: {output_format}'}), 400
+    try:
+        fields = parse_fields(request.args.get('fields', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = stream_products(parse_filters(request.args), parse_sort(request.args), fields)
+    encode = ndjson_lines if output_format == 'ndjson' else json_array
+    return Response(stream_with_context(encode(rows)), mimetype=FORMATS[output_format])
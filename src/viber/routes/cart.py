@@ -2,22 +2,83 @@
 Cart routes for the Viber application.
 """
 
-from typing import Any
-from flask import Blueprint, request, session, jsonify
-from ..models.cart import CartItem
+from typing import Any, Dict, List
+from flask import Blueprint, abort, render_template, request, session, jsonify
+from ..models.cart import CartItem, CartSummary
 from ..models.product import Product
 from ..utils.decorators import login_required
+from ..utils.snapshot import get_snapshot
 from ..utils.template import render_template_with_nav
 from .. import db
 
 cart_bp = Blueprint('cart', __name__)
 
+class CartLine:
+    """A cart item displayed with its product from the catalog snapshot."""
+
+    __slots__ = ('id', 'quantity', 'product')
+
+    def __init__(self, item_id: int, quantity: int, product: Any) -> None:
+        self.id = item_id
+        self.quantity = quantity
+        self.product = product
+
+# Cart operations accepted by the batch endpoint, mapped to their id field
+BATCH_OPERATIONS = {
+    'add': 'product_id',
+    'update': 'item_id',
+    'remove': 'item_id',
+}
+
+def is_integer(value: Any) -> bool:
+    """Check for a JSON integer; ``true`` and ``false`` decode to bool, a subclass of int."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def parse_operations(data: Any) -> List[Dict[str, Any]]:
+    """
+    Validate a list of batch cart operations.
+
+    Args:
+        data: The decoded JSON request body
+
+    Returns:
+        list: The operations, with ``quantity`` defaulted to 1 for adds
+
+    Raises:
+        ValueError: If the body is not a list of valid operations
+    """
+    if not isinstance(data, list) or not data:
+        raise ValueError('Expected a non-empty list of operations')
+    operations = []
+    for operation in data:
+        if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+            raise ValueError(f'Invalid operation: {operation!r}')
+        id_field = BATCH_OPERATIONS[operation['op']]
+        quantity = operation.get('quantity', 1 if operation['op'] == 'add' else None)
+        if not is_integer(operation.get(id_field)) or (
+                operation['op'] != 'remove' and not is_integer(quantity)):
+            raise ValueError(f'Invalid operation: {operation!r}')
+        if operation['op'] == 'add' and quantity < 1:
+            raise ValueError(f'Invalid operation: {operation!r}')
+        operations.append(dict(operation, quantity=quantity))
+    return operations
+
 @cart_bp.route('/cart')
 @login_required
 def view_cart() -> Any:
     """Display the shopping cart."""
-    cart_items = CartItem.query.filter_by(session_id=session['username']).all()
-    total = sum(item.product.price * item.quantity for item in cart_items)
+    snapshot = get_snapshot()
+    cart_items = None
+    if snapshot is not None:
+        rows = CartItem.get_cart_rows(session['username'])
+        # A product committed after the snapshot was read is only in the
+        # database; load every line from there so they match the total
+        if all(product_id in snapshot for _, product_id, _ in rows):
+            cart_items = [CartLine(item_id, quantity, snapshot.get(product_id))
+                          for item_id, product_id, quantity in rows]
+    if cart_items is None:
+        cart_items = CartItem.get_cart_items(session['username'])
+    _, total = CartSummary.get_totals(session['username'])
     return render_template_with_nav('cart.html', 
                                   active_page='cart',
                                   cart_items=cart_items,
@@ -26,29 +87,83 @@ def view_cart() -> Any:
 @cart_bp.route('/cart/add/<int:product_id>', methods=['POST'])
 @login_required
 def add_to_cart(product_id: int) -> Any:
-    """Add a product to the cart."""
-    product = Product.query.get_or_404(product_id)
-    
-    # Check if product already in cart
-    cart_item = CartItem.query.filter_by(
-        session_id=session['username'],
-        product_id=product_id
-    ).first()
-    
-    if cart_item:
-        cart_item.quantity += 1
-    else:
-        cart_item = CartItem(
-            session_id=session['username'],
-            product_id=product_id
-        )
-        db.session.add(cart_item)
-    
+    """
+    Add a product to the cart.
+
+    Returns the product's quantity in the cart and the new cart count, plus
+    the rendered navigation cart link when requested with ``?nav=1``, so
+    the page can be updated in place.
+    """
+    quantity = CartItem.add(session['username'], product_id)
+    if quantity is None:
+        abort(404)
     db.session.commit()
     
-    return jsonify({
+    cart_count = CartSummary.get_count(session['username'])
+    data = {
         'message': 'Product added to cart',
-        'cart_count': CartItem.get_cart_count(session['username'])
+        'product_id': product_id,
+        'quantity': quantity,
+        'cart_count': cart_count
+    }
+    if request.args.get('nav'):
+        data['nav'] = render_template('_cart_badge.html', cart_count=cart_count)
+    return jsonify(data)
+
+@cart_bp.route('/cart/batch', methods=['POST'])
+@login_required
+def batch_update_cart() -> Any:
+    """
+    Apply a list of cart operations in a single transaction.
+
+    Each operation is one of ``{"op": "add", "product_id": ..., "quantity": ...}``,
+    ``{"op": "update", "item_id": ..., "quantity": ...}`` (a quantity of 0 or
+    less removes the item) or ``{"op": "remove", "item_id": ...}``. Either
+    every operation is applied or none is.
+    """
+    try:
+        operations = parse_operations(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Check every referenced item in one query
+    item_ids = {op['item_id'] for op in operations if 'item_id' in op}
+    items = {item.id: item for item in CartItem.query.filter(CartItem.id.in_(item_ids))}
+    if len(items) != len(item_ids):
+        abort(404)
+    if any(item.session_id != session['username'] for item in items.values()):
+        return jsonify({'error': 'Not authorized'}), 403
+
+    for operation in operations:
+        if operation['op'] == 'add':
+            # The add is a single statement run now, so earlier changes to
+            # the session's items must reach the database first
+            db.session.flush()
+            if CartItem.add(session['username'], operation['product_id'],
+                            operation['quantity']) is None:
+                db.session.rollback()
+                abort(404)
+            continue
+        item = items[operation['item_id']]
+        if operation['op'] == 'update' and operation['quantity'] > 0:
+            item.quantity = operation['quantity']
+        elif item not in db.session.deleted:
+            db.session.delete(item)
+    db.session.commit()
+
+    lines = db.session.execute(
+        db.select(CartItem.id, CartItem.quantity,
+                  (CartItem.quantity * Product.price).label('total'))
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.session_id == session['username'])
+        .order_by(CartItem.id)
+    )
+    cart_count, total = CartSummary.get_totals(session['username'])
+    return jsonify({
+        'message': 'Cart updated',
+        'cart_count': cart_count,
+        'total': total,
+        'items': [dict(line._mapping) for line in lines]
     })
 
 @cart_bp.route('/cart/update/<int:item_id>', methods=['POST'])
@@ -88,5 +203,5 @@ def remove_from_cart(item_id: int) -> Any:
     
     return jsonify({
         'message': 'Item removed from cart',
-        'cart_count': CartItem.get_cart_count(session['username'])
+        'cart_count': CartSummary.get_count(session['username'])
     }) 
\ No newline at end of file
@@ -2,93 +2,98 @@
 Page routes for the Viber application.
 """
 
-from typing import Any
-from flask import Blueprint, render_template, session, request
-from sqlalchemy import or_, and_
-from ..models.product import Product, CATEGORIES, FITS, SIZES, COLORS, MATERIALS, STYLES, SEASONS, GENDERS
-from ..extensions import db
+from typing import Any, Dict, Optional, Tuple
+from flask import Blueprint, current_app, request, jsonify
+from ..models.product import Product, CATEGORIES, SIZES, COLORS, STYLES, SEASONS, GENDERS
+from ..utils.catalog import parse_filters, parse_sort, filter_args, apply_filters, facet_counts
+from ..utils.conditional import catalog_version, conditional, template_version
+from ..utils.database import use_read_only
+from ..utils.facet_index import FacetIndex, get_facet_index
+from ..utils.page_cache import cached_page
+from ..utils.pagination import KeysetPage, keyset_paginate
+from ..utils.product_grid import cached, filters_key, get_grid_cache, stream_product_grid
+from ..utils.snapshot import get_snapshot
 from ..utils.template import render_template_with_nav
 
 pages_bp = Blueprint('pages', __name__)
 
+# Pages only read, so their queries can run on the read-only engine
+pages_bp.before_request(use_read_only)
+
+def count_facets(selected_filters: Dict[str, Any],
+                 facet_index: Optional[FacetIndex]) -> Tuple[Dict[str, Dict[str, int]], int]:
+    """Count products per facet value from the facet index or the (cached) database query."""
+    if facet_index is not None and not selected_filters['q']:
+        return facet_index.facet_counts(selected_filters)
+    return cached(get_grid_cache(), ('facets', filters_key(selected_filters)),
+                  lambda: facet_counts(selected_filters), lambda counts: len(repr(counts)))
+
 @pages_bp.route('/')
+@conditional(template_version)
+@cached_page
 def home() -> Any:
     """Display the home page."""
     return render_template_with_nav('home.html', active_page='home')
 
 @pages_bp.route('/about')
+@conditional(template_version)
+@cached_page
 def about() -> Any:
     """Display the about page."""
     return render_template_with_nav('about.html', active_page='about')
 
 @pages_bp.route('/contact')
+@conditional(template_version)
+@cached_page
 def contact() -> Any:
     """Display the contact page."""
     return render_template_with_nav('contact.html', active_page='contact')
 
 @pages_bp.route('/products')
+@conditional(catalog_version)
 def products() -> Any:
     """Display the products page."""
-    # Get filter parameters from request
-    selected_filters = {
-        'category': request.args.getlist('category'),
-        'style': request.args.getlist('style'),
-        'size': request.args.getlist('size'),
-        'color': request.args.getlist('color'),
-        'gender': request.args.getlist('gender'),
-        'season': request.args.getlist('season'),
-        'min_price': request.args.get('min_price', type=float),
-        'max_price': request.args.get('max_price', type=float),
-        'in_stock': request.args.get('in_stock') == 'true'
-    }
-
-    # Build the query
-    query = Product.query
+    # Get filter and sort parameters from request
+    selected_filters = parse_filters(request.args)
+    sort = parse_sort(request.args)
 
-    # Apply filters
-    if selected_filters['category']:
-        query = query.filter(Product.category.in_(selected_filters['category']))
-    if selected_filters['style']:
-        query = query.filter(Product.style.in_(selected_filters['style']))
-    if selected_filters['size']:
-        query = query.filter(Product.size.in_(selected_filters['size']))
-    if selected_filters['color']:
-        query = query.filter(Product.color.in_(selected_filters['color']))
-    if selected_filters['gender']:
-        query = query.filter(Product.gender.in_(selected_filters['gender']))
-    if selected_filters['season']:
-        query = query.filter(Product.season.in_(selected_filters['season']))
-    if selected_filters['min_price'] is not None:
-        query = query.filter(Product.price >= selected_filters['min_price'])
-    if selected_filters['max_price'] is not None:
-        query = query.filter(Product.price <= selected_filters['max_price'])
-    if selected_filters['in_stock']:
-        query = query.filter(Product.in_stock == True)
+    # Fetch a single page of results, from the facet index when enabled
+    per_page = current_app.config['PRODUCTS_PER_PAGE']
+    after, before = request.args.get('after'), request.args.get('before')
+    facet_index = get_facet_index()
 
-    # Apply sorting
-    sort = request.args.get('sort', 'featured')
-    if sort == 'price_asc':
-        query = query.order_by(Product.price.asc())
-    elif sort == 'price_desc':
-        query = query.order_by(Product.price.desc())
-    elif sort == 'name_asc':
-        query = query.order_by(Product.name.asc())
-    elif sort == 'name_desc':
-        query = query.order_by(Product.name.desc())
+    def fetch_page() -> KeysetPage:
+        # Display data comes from the catalog snapshot when enabled, so only
+        # the ids of the page are read from the database or the facet index
+        snapshot = get_snapshot()
+        if facet_index is not None and not selected_filters['q']:
+            if snapshot is None:
+                return facet_index.page(selected_filters, sort, per_page,
+                                        after=after, before=before)
+            ids, has_next, has_prev = facet_index.paginate(selected_filters, sort, per_page,
+                                                           after=after, before=before)
+            return KeysetPage(snapshot.get_many(ids), sort, has_next=has_next, has_prev=has_prev)
+        query = apply_filters(Product.query, selected_filters)
+        return keyset_paginate(query, sort, per_page, after=after, before=before,
+                               load=snapshot.get_many if snapshot is not None else None)
 
-    # Execute query
-    products = query.all()
+    # Render the grid, or reuse the cached grid for this catalog version. It
+    # is only computed when the template reaches it, and the facet counts
+    # after it, so a streamed page sends its head, navigation and filter
+    # sidebar first
+    product_grid = stream_product_grid(selected_filters, sort, per_page, after, before,
+                                       fetch_page, filter_args=filter_args(selected_filters))
 
-    # Get cart count for authenticated users
-    cart_count = 0
-    if session.get('authenticated'):
-        cart = session.get('cart', {})
-        cart_count = sum(cart.values())
+    def load_facet_counts() -> Dict[str, Dict[str, int]]:
+        # Count products per filter value for the sidebar
+        return count_facets(selected_filters, facet_index)[0]
 
     return render_template_with_nav('products.html',
+                         stream=current_app.config['STREAM_PRODUCT_PAGES'],
                          active_page='products',
-                         products=products,
-                         cart_count=cart_count,
+                         product_grid=product_grid,
+                         load_facet_counts=load_facet_counts,
+                         show_facet_counts=current_app.config['PRODUCT_FACET_COUNTS'],
                          categories=CATEGORIES,
                          styles=STYLES,
                          sizes=SIZES,
@@ -96,4 +101,14 @@ def products() -> Any:
                          genders=GENDERS,
                          seasons=SEASONS,
                          selected_filters=selected_filters,
-                         sort_by=sort) 
\ No newline at end of file
+                         filter_args=filter_args(selected_filters),
+                         sort_by=sort)
+
+
+@pages_bp.route('/products/facets')
+@conditional(catalog_version)
+def product_facets() -> Any:
+    """Return facet counts for the selected product filters as JSON."""
+    selected_filters = parse_filters(request.args)
+    counts, total = count_facets(selected_filters, get_facet_index())
+    return jsonify({'total': total, 'facets': counts})
@@ -0,0 +1,197 @@
+"""
+Static asset build and serving for the Viber application.
+
+``flask assets build`` copies every file of the static folder to a
+fingerprinted name under ``static/dist`` (``css/style.css`` becomes
+``dist/css/style.<hash>.css``), writes gzip and, if the ``brotli`` package
+is installed, brotli copies next to it, and records the names in
+``dist/manifest.json``. Templates link assets through ``static_url``, which
+returns the fingerprinted URL once the manifest exists. A fingerprinted URL
+never changes content, so it is served with a one year immutable lifetime
+and in the best encoding the client accepts.
+
+``flask assets vendor`` downloads the pinned Bootstrap files into
+``static/vendor`` so a single origin can serve every asset; ``asset_url``
+links the local copy when it exists and the CDN otherwise.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import urllib.request
+from base64 import b64encode
+from typing import Dict, List, Tuple
+from flask import Flask, Response, abort, current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Optional; only gzip copies are written without it
+    brotli = None
+
+EXTENSION_KEY = 'viber.asset_manifest'
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+# Lifetime of fingerprinted assets: one year, the longest allowed
+IMMUTABLE_MAX_AGE = 31536000
+
+# Precompressed copies by content encoding, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Types worth compressing; images and fonts are compressed already
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+
+# Third-party assets: static filename -> (CDN URL, subresource integrity hash)
+VENDOR_ASSETS = {
+    'vendor/bootstrap/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+        'sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH'),
+    'vendor/bootstrap/bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+        'sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz'),
+}
+
+def fingerprint(name: str, content: bytes) -> str:
+    """Insert a hash of a file's content before its extension."""
+    root, extension = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+def build_assets(static_folder: str) -> Dict[str, str]:
+    """
+    Write fingerprinted and precompressed copies of every static file.
+
+    Copies from earlier builds are kept, so pages rendered before a deploy
+    can still load the assets they link to.
+
+    Args:
+        static_folder: The application's static folder
+
+    Returns:
+        dict: The manifest, mapping static filenames to fingerprinted names
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for root, directories, files in os.walk(static_folder):
+        if root == static_folder and DIST_DIR in directories:
+            directories.remove(DIST_DIR)
+        for file_name in sorted(files):
+            path = os.path.join(root, file_name)
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, 'rb') as source:
+                content = source.read()
+            target_name = fingerprint(name, content)
+            target = os.path.join(dist, target_name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target)
+            if name.endswith(COMPRESSIBLE):
+                with open(target + '.gz', 'wb') as output:
+                    output.write(gzip.compress(content, 9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as output:
+                        output.write(brotli.compress(content))
+            manifest[name] = f'{DIST_DIR}/{target_name}'
+    with open(os.path.join(dist, MANIFEST), 'w', encoding='utf-8') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    return manifest
+
+def vendor_assets(static_folder: str) -> List[str]:
+    """
+    Download the third-party assets into the static folder.
+
+    Each download is checked against its integrity hash before it is saved.
+
+    Args:
+        static_folder: The application's static folder
+
+    Returns:
+        list: Static filenames of the downloaded assets
+
+    Raises:
+        ValueError: If a download does not match its integrity hash
+    """
+    for name, (url, integrity) in VENDOR_ASSETS.items():
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read()
+        algorithm, expected = integrity.split('-', 1)
+        if b64encode(hashlib.new(algorithm, content).digest()).decode() != expected:
+            raise ValueError(f'{url} does not match its integrity hash')
+        path = os.path.join(static_folder, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(content)
+    return list(VENDOR_ASSETS)
+
+def get_manifest() -> Dict[str, str]:
+    """
+    Get the asset manifest of the current application.
+
+    The manifest only changes on deploy, so it is read once per application
+    unless templates are reloaded automatically.
+
+    Returns:
+        dict: Static filenames to fingerprinted names; empty before a build
+    """
+    manifest = current_app.extensions.get(EXTENSION_KEY)
+    if manifest is not None and not current_app.jinja_env.auto_reload:
+        return manifest
+    try:
+        with open(os.path.join(current_app.static_folder, DIST_DIR, MANIFEST),
+                  encoding='utf-8') as source:
+            manifest = json.load(source)
+    except FileNotFoundError:
+        manifest = {}
+    current_app.extensions[EXTENSION_KEY] = manifest
+    return manifest
+
+def static_url(filename: str) -> str:
+    """Get the URL of a static file, fingerprinted if the assets were built."""
+    return url_for('static', filename=get_manifest().get(filename, filename))
+
+def asset_url(filename: str) -> str:
+    """Get the URL of a vendored asset, or its CDN URL if it was not vendored."""
+    if filename in get_manifest() or os.path.exists(
+            os.path.join(current_app.static_folder, *filename.split('/'))):
+        return static_url(filename)
+    return VENDOR_ASSETS[filename][0]
+
+def choose_encoding(path: str) -> Tuple[str, str]:
+    """Pick the best precompressed copy of a file that the client accepts."""
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(path + suffix):
+            return encoding, suffix
+    return '', ''
+
+def send_static_file(filename: str) -> Response:
+    """
+    Serve a static file, with immutable caching and precompression if fingerprinted.
+
+    Replaces Flask's static view, which serves every file uncompressed with
+    a short lifetime.
+    """
+    if not filename.startswith(f'{DIST_DIR}/') or filename == f'{DIST_DIR}/{MANIFEST}':
+        return current_app.send_static_file(filename)
+    static_folder = current_app.static_folder
+    path = safe_join(static_folder, filename)
+    if path is None:
+        abort(404)
+    encoding, suffix = choose_encoding(path)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype,
+                                   max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+def init_assets(app: Flask) -> None:
+    """Serve built assets and add the asset URL helpers to templates."""
+    if app.has_static_folder:
+        app.view_functions['static'] = send_static_file
+    app.add_template_global(static_url)
+    app.add_template_global(asset_url)
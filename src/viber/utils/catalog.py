@@ -0,0 +1,203 @@
+"""
+Catalog query helpers for the Viber application.
+"""
+
+import math
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import SmallInteger, func, literal, select, type_coerce, union_all
+from ..extensions import db
+from ..models.product import Product, CATEGORIES, STYLES, SIZES, COLORS, GENDERS, SEASONS
+from ..models.search import products_fts, match_expression, search_condition
+
+# Filterable attributes that accept a list of values
+FACETS = ('category', 'style', 'size', 'color', 'gender', 'season')
+
+# Known values of each facet, in display order
+FACET_VALUES = {
+    'category': CATEGORIES,
+    'style': STYLES,
+    'size': SIZES,
+    'color': COLORS,
+    'gender': GENDERS,
+    'season': SEASONS,
+}
+
+# Sort options mapped to (column name, descending); ``None`` sorts by id only
+SORT_OPTIONS = {
+    'featured': (None, False),
+    'relevance': ('rank', False),
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+    'name_asc': ('name', False),
+    'name_desc': ('name', True),
+}
+
+DEFAULT_SORT = 'featured'
+
+def finite_float(value: str) -> float:
+    """Convert an argument to a float, rejecting nan and infinities."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'{value!r} is not a finite number')
+    return number
+
+def parse_filters(args: Any) -> Dict[str, Any]:
+    """
+    Parse product filters from request arguments.
+
+    Prices that are not finite numbers are ignored like any other invalid
+    value, so the database and the facet index see the same filters.
+
+    Args:
+        args: The request arguments (a MultiDict)
+
+    Returns:
+        dict: The selected filters
+    """
+    selected_filters = {facet: args.getlist(facet) for facet in FACETS}
+    selected_filters.update({
+        'min_price': args.get('min_price', type=finite_float),
+        'max_price': args.get('max_price', type=finite_float),
+        'in_stock': args.get('in_stock') == 'true',
+        'q': args.get('q', '').strip()
+    })
+    return selected_filters
+
+def parse_sort(args: Any) -> str:
+    """
+    Parse the sort option from request arguments.
+
+    Args:
+        args: The request arguments (a MultiDict)
+
+    Returns:
+        str: A valid sort option
+    """
+    searching = match_expression(args.get('q')) is not None
+    sort = args.get('sort') or ('relevance' if searching else DEFAULT_SORT)
+    if sort not in SORT_OPTIONS or (sort == 'relevance' and not searching):
+        return DEFAULT_SORT
+    return sort
+
+def filter_args(selected_filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert selected filters back into URL arguments, dropping empty values.
+
+    Multi-valued filters are sorted and deduplicated, so links match for
+    every order the same selection was requested in.
+
+    Args:
+        selected_filters: The selected filters
+
+    Returns:
+        dict: Arguments suitable for ``url_for``
+    """
+    args = {}
+    for key, value in selected_filters.items():
+        if key == 'in_stock':
+            if value:
+                args[key] = 'true'
+        elif isinstance(value, list):
+            if value:
+                args[key] = sorted(set(value))
+        elif value not in (None, ''):
+            args[key] = value
+    return args
+
+def apply_filters(query: Any, selected_filters: Dict[str, Any]) -> Any:
+    """
+    Apply the selected filters to a product query.
+
+    Args:
+        query: The product query to filter
+        selected_filters: The selected filters
+
+    Returns:
+        The filtered query
+    """
+    for facet in FACETS:
+        if selected_filters.get(facet):
+            query = query.filter(getattr(Product, facet).in_(selected_filters[facet]))
+    if selected_filters.get('min_price') is not None:
+        query = query.filter(Product.price >= selected_filters['min_price'])
+    if selected_filters.get('max_price') is not None:
+        query = query.filter(Product.price <= selected_filters['max_price'])
+    if selected_filters.get('in_stock'):
+        query = query.filter(Product.in_stock == True)
+    expression = match_expression(selected_filters.get('q'))
+    if expression:
+        query = query.join(products_fts, products_fts.c.rowid == Product.id)
+        query = query.filter(search_condition(expression))
+    return query
+
+def sort_column(sort: str) -> Optional[Any]:
+    """
+    Get the product column used by a sort option.
+
+    Args:
+        sort: The sort option
+
+    Returns:
+        The column, or None when the option sorts by id only
+    """
+    column, _ = SORT_OPTIONS[sort]
+    if sort == 'relevance':
+        # bm25 rank of the search match; lower is more relevant
+        return products_fts.c.rank
+    return getattr(Product, column) if column else None
+
+def sort_value(product: Any, sort: str) -> Any:
+    """
+    Get the sort key value of a product for a sort option.
+
+    Args:
+        product: The product
+        sort: The sort option
+
+    Returns:
+        The value of the sort column, or the product id
+    """
+    column, _ = SORT_OPTIONS[sort]
+    if sort == 'relevance':
+        return product.search_rank
+    return getattr(product, column) if column else product.id
+
+def empty_facet_counts() -> Dict[str, Dict[str, int]]:
+    """Get facet counts with every known value set to zero."""
+    return {facet: dict.fromkeys(values, 0) for facet, values in FACET_VALUES.items()}
+
+def facet_counts(selected_filters: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, int]], int]:
+    """
+    Count matching products per facet value in a single query.
+
+    Each facet is counted with every filter applied except its own selection,
+    so the counts show how many products a value would add to the results.
+
+    Args:
+        selected_filters: The selected filters
+
+    Returns:
+        tuple: (counts by facet and value, total matching products)
+    """
+    statements = []
+    for facet in FACETS:
+        column = getattr(Product, facet)
+        # Select the raw codes: a UNION decodes every row with the first
+        # statement's column type, so each facet is decoded below instead
+        statement = select(literal(facet).label('facet'),
+                           type_coerce(column, SmallInteger).label('value'),
+                           func.count().label('count')).select_from(Product)
+        statement = apply_filters(statement, dict(selected_filters, **{facet: []}))
+        statements.append(statement.group_by(column))
+    total = select(literal('').label('facet'), literal(None).label('value'),
+                   func.count().label('count')).select_from(Product)
+    statements.append(apply_filters(total, selected_filters))
+
+    counts = empty_facet_counts()
+    total_count = 0
+    for facet, value, count in db.session.execute(union_all(*statements)):
+        if facet:
+            counts[facet][FACET_VALUES[facet][value]] = count
+        else:
+            total_count = count
+    return counts, total_count
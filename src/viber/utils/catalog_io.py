@@ -0,0 +1,292 @@
+"""
+Bulk catalog import and export for the Viber application.
+
+Rows are streamed one at a time in both directions, so memory use does not
+grow with the size of the catalog. Imports upsert by SKU in chunked
+transactions: each chunk is committed on its own, so the store keeps serving
+(and other writers get the lock) between chunks, and rows that did not
+change are not rewritten.
+"""
+
+import csv
+import itertools
+import json
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.sqlite import insert
+from ..extensions import db
+from ..models.cart import CartSummary
+from ..models.catalog import CatalogVersion, ProductChange
+from ..models.product import (Product, CATEGORIES, FITS, SIZES, COLORS, MATERIALS, STYLES,
+                              SEASONS, GENDERS)
+
+# Columns of an import or export file, in output order
+CATALOG_FIELDS = ('sku', 'name', 'description', 'price', 'image_url', 'category', 'fit',
+                  'size', 'color', 'material', 'style', 'season', 'gender', 'in_stock',
+                  'stock_quantity')
+
+# Columns that must be present in every imported row
+REQUIRED_FIELDS = ('sku', 'name', 'description', 'price', 'image_url')
+
+# Enumerated columns mapped to their allowed values
+ENUM_FIELDS = {
+    'category': CATEGORIES,
+    'fit': FITS,
+    'size': SIZES,
+    'color': COLORS,
+    'material': MATERIALS,
+    'style': STYLES,
+    'season': SEASONS,
+    'gender': GENDERS,
+}
+
+FORMATS = ('csv', 'ndjson')
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+def detect_format(filename: str) -> str:
+    """
+    Guess the file format from a file name.
+
+    Args:
+        filename: The file name, ``-`` for a standard stream
+
+    Returns:
+        str: ``ndjson`` for ``.ndjson``/``.jsonl`` files, otherwise ``csv``
+    """
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+def read_rows(stream: TextIO, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Read raw rows from a CSV or NDJSON stream.
+
+    Args:
+        stream: The input stream; CSV streams should be opened with ``newline=''``
+        file_format: ``csv`` or ``ndjson``
+
+    Yields:
+        tuple: (line number, raw row), where an NDJSON line that is not valid
+        JSON is yielded as the ``ValueError`` describing it
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f'Invalid JSON: {e}')
+
+def validate_row(raw: Any) -> Dict[str, Any]:
+    """
+    Validate a raw row against the product schema.
+
+    Empty optional values take the model defaults. CSV values are strings,
+    NDJSON values may already be typed; both are accepted.
+
+    Args:
+        raw: A mapping of column names to values
+
+    Returns:
+        dict: The column values to store
+
+    Raises:
+        ValueError: If the row is not a mapping, misses a required column, or
+            has a value of the wrong type or outside its allowed values
+    """
+    if not isinstance(raw, dict):
+        raise ValueError('Row is not an object')
+    row = {field: raw[field] for field in CATALOG_FIELDS
+           if raw.get(field) not in (None, '')}
+    missing = [field for field in REQUIRED_FIELDS if field not in row]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+
+    for field in ('sku', 'name', 'description', 'image_url'):
+        row[field] = str(row[field]).strip()
+    for field, values in ENUM_FIELDS.items():
+        if field in row and row[field] not in values:
+            raise ValueError(f'Invalid {field}: {row[field]!r}')
+    try:
+        row['price'] = round(float(row['price']), 2)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid price: {row['price']!r}") from None
+    if not math.isfinite(row['price']) or row['price'] < 0:
+        raise ValueError(f"Invalid price: {row['price']!r}")
+    if 'in_stock' in row and not isinstance(row['in_stock'], bool):
+        value = BOOLEAN_VALUES.get(str(row['in_stock']).strip().lower())
+        if value is None:
+            raise ValueError(f"Invalid in_stock: {row['in_stock']!r}")
+        row['in_stock'] = value
+    if 'stock_quantity' in row:
+        value = row['stock_quantity']
+        if isinstance(value, bool) or not str(value).strip().isdigit():
+            raise ValueError(f'Invalid stock_quantity: {value!r}')
+        row['stock_quantity'] = int(value)
+    return row
+
+def _fill_defaults(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Give every column a value, so one statement can insert the whole chunk."""
+    table = Product.__table__
+    for field in CATALOG_FIELDS:
+        if field not in row:
+            row[field] = table.c[field].default.arg
+    return row
+
+def upsert_statement(fields: Iterable[str] = CATALOG_FIELDS) -> Any:
+    """
+    Build the upsert of product rows by SKU.
+
+    New products are inserted with every column, but existing products only
+    have the given columns updated, so a file that leaves out some columns
+    keeps their current values instead of resetting them to the defaults.
+    Existing products are only updated when one of those columns actually
+    changed, so a nightly sync of a mostly unchanged catalog rewrites few
+    rows, fires few search triggers and keeps ``updated_at`` meaningful.
+
+    Args:
+        fields: The columns present in the imported rows
+
+    Returns:
+        The statement, returning the ids of inserted and updated products
+    """
+    statement = insert(Product.__table__)
+    columns = [field for field in CATALOG_FIELDS if field in fields and field != 'sku']
+    changed = or_(*[Product.__table__.c[field].is_distinct_from(statement.excluded[field])
+                    for field in columns])
+    set_ = {field: statement.excluded[field] for field in columns}
+    set_['updated_at'] = db.func.current_timestamp()
+    return (statement.on_conflict_do_update(index_elements=['sku'], set_=set_, where=changed)
+            .returning(Product.__table__.c.id))
+
+def import_products(rows: Iterable[Tuple[int, Any]], chunk_size: int = 5000,
+                    on_error: Optional[Callable[[int, str], None]] = None,
+                    progress: Optional[Callable[[Dict[str, int], float], None]] = None
+                    ) -> Dict[str, int]:
+    """
+    Validate and upsert products by SKU, committing every chunk.
+
+    Invalid rows are skipped and reported through ``on_error``; when a SKU
+    appears more than once, the last row wins. Columns a row leaves out keep
+    their current values, or the model defaults for new products; columns
+    present but empty take the model defaults. Each chunk also refreshes the
+    cart summaries of the changed products, bumps the catalog version and
+    logs the product changes in its transaction, like an ORM write would.
+
+    Args:
+        rows: (line number, raw row) pairs, as produced by ``read_rows``
+        chunk_size: Valid rows written per transaction
+        on_error: Called with (line number, message) for each rejected row
+        progress: Called with the running counts and seconds elapsed after each chunk
+
+    Returns:
+        dict: Counts of ``read``, ``written`` (inserted or changed),
+        ``unchanged`` (including rows superseded by a later row of the same
+        SKU) and ``rejected`` rows
+    """
+    counts = {'read': 0, 'written': 0, 'unchanged': 0, 'rejected': 0}
+    statements: Dict[Tuple[str, ...], Any] = {}
+    start = time.perf_counter()
+
+    def valid_rows() -> Iterator[Tuple[Tuple[str, ...], Dict[str, Any]]]:
+        for line_number, raw in rows:
+            counts['read'] += 1
+            try:
+                if isinstance(raw, ValueError):
+                    raise raw
+                row = validate_row(raw)
+            except ValueError as e:
+                counts['rejected'] += 1
+                if on_error:
+                    on_error(line_number, str(e))
+                continue
+            fields = tuple(field for field in CATALOG_FIELDS if field in raw)
+            yield fields, _fill_defaults(row)
+
+    chunks = valid_rows()
+    while chunk := list(itertools.islice(chunks, chunk_size)):
+        connection = db.session.connection()
+        # Only the last row of a SKU is written, so it is counted and logged once
+        latest = {row['sku']: (fields, row) for fields, row in chunk}
+        # One statement per set of columns present, usually one per file
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for fields, row in latest.values():
+            groups.setdefault(fields, []).append(row)
+        product_ids = []
+        for fields, group in groups.items():
+            if fields not in statements:
+                statements[fields] = upsert_statement(fields)
+            product_ids += connection.execute(statements[fields], group).scalars().all()
+        if product_ids:
+            CartSummary.refresh_products(connection, product_ids)
+            CatalogVersion.bump(connection)
+            ProductChange.record(connection, ProductChange.UPSERT, product_ids)
+        db.session.commit()
+        counts['written'] += len(product_ids)
+        counts['unchanged'] += len(chunk) - len(product_ids)
+        if progress:
+            progress(counts, time.perf_counter() - start)
+    return counts
+
+def export_products(yield_per: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every product that has a SKU in id order.
+
+    Products without a SKU could not be imported again, so they are left
+    out; ``count_unexported`` tells how many there are.
+
+    Args:
+        yield_per: Rows fetched from the cursor per batch
+
+    Yields:
+        dict: The catalog columns of one product
+    """
+    columns = [Product.__table__.c[field] for field in CATALOG_FIELDS]
+    result = db.session.execute(select(*columns).where(Product.sku.is_not(None))
+                                .order_by(Product.id),
+                                execution_options={'yield_per': yield_per})
+    try:
+        for row in result:
+            yield dict(zip(CATALOG_FIELDS, row))
+    finally:
+        result.close()
+
+def count_unexported() -> int:
+    """Count the products without a SKU, which ``export_products`` leaves out."""
+    return db.session.execute(
+        select(db.func.count()).select_from(Product).where(Product.sku.is_(None))).scalar()
+
+def write_rows(stream: TextIO, rows: Iterable[Dict[str, Any]], file_format: str) -> int:
+    """
+    Write product rows as CSV or NDJSON.
+
+    Args:
+        stream: The output stream; CSV streams should be opened with ``newline=''``
+        rows: The rows to write
+        file_format: ``csv`` or ``ndjson``
+
+    Returns:
+        int: Number of rows written
+    """
+    count = 0
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, 'in_stock': _format_boolean(row['in_stock'])})
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, separators=(',', ':')) + '\n')
+            count += 1
+    return count
+
+def _format_boolean(value: Optional[bool]) -> str:
+    """Format a boolean the way ``validate_row`` reads it back."""
+    return '' if value is None else ('true' if value else 'false')
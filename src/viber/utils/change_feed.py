@@ -0,0 +1,122 @@
+"""
+Product change feed for the Viber application.
+
+Every product write is logged to ``product_changes`` in its own transaction.
+Each worker process keeps a watermark, the id of the last change it has
+seen, and polls the log for newer entries at most every
+``PRODUCT_CHANGE_POLL_INTERVAL`` seconds. In-process caches subscribe to the
+feed and receive the changed product ids, so an update committed by any
+worker reaches the caches of every other worker without reloading them.
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional, Set
+from flask import current_app
+from ..models.catalog import ProductChange
+
+EXTENSION_KEY = 'viber.change_feed'
+
+# Called with (upserted product ids, deleted product ids, reset)
+Subscriber = Callable[[Set[int], Set[int], bool], None]
+
+class ChangeFeed:
+    """Per-process reader of the product change log."""
+
+    def __init__(self, interval: float, batch_size: int = 1000) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.watermark: Optional[int] = None
+        self.subscribers: List[Subscriber] = []
+        self._last_poll = float('-inf')
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Start following the log from its newest change.
+
+        Call before building a cache from the database, so changes committed
+        while it is built are delivered again rather than missed.
+        """
+        with self._lock:
+            if self.watermark is None:
+                self.watermark = ProductChange.latest()
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """Deliver future changes to a cache."""
+        self.start()
+        with self._lock:
+            self.subscribers.append(subscriber)
+
+    def poll(self, force: bool = False) -> int:
+        """
+        Deliver the changes logged since the watermark to every subscriber.
+
+        Changes are merged first, so subscribers get each product once with
+        its latest operation. A subscriber that raises stops the poll without
+        moving the watermark, and the changes are delivered again next time.
+
+        Args:
+            force: Poll even if the interval has not elapsed
+
+        Returns:
+            int: Number of log entries read
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_poll < self.interval:
+                return 0
+            self._last_poll = now
+            if self.watermark is None:
+                self.watermark = ProductChange.latest()
+                return 0
+
+            watermark = self.watermark
+            upserted: Set[int] = set()
+            deleted: Set[int] = set()
+            reset = False
+            read = 0
+            while True:
+                changes = ProductChange.since(watermark, self.batch_size)
+                if not changes:
+                    break
+                if changes[0][0] != watermark + 1 and read == 0:
+                    # Entries after the watermark were pruned before we read them
+                    oldest = ProductChange.oldest()
+                    reset = reset or oldest is None or oldest > watermark + 1
+                for _, product_id, operation in changes:
+                    if operation == ProductChange.RESET:
+                        reset = True
+                    elif operation == ProductChange.DELETE:
+                        deleted.add(product_id)
+                        upserted.discard(product_id)
+                    else:
+                        upserted.add(product_id)
+                        deleted.discard(product_id)
+                read += len(changes)
+                watermark = changes[-1][0]
+                if len(changes) < self.batch_size:
+                    break
+
+            if read:
+                if reset:
+                    upserted.clear()
+                    deleted.clear()
+                for subscriber in self.subscribers:
+                    subscriber(upserted, deleted, reset)
+                self.watermark = watermark
+            return read
+
+def get_change_feed() -> ChangeFeed:
+    """Get the product change feed of the current application, creating it on first use."""
+    feed = current_app.extensions.get(EXTENSION_KEY)
+    if feed is None:
+        feed = ChangeFeed(current_app.config['PRODUCT_CHANGE_POLL_INTERVAL'])
+        current_app.extensions[EXTENSION_KEY] = feed
+    return feed
+
+def poll_changes() -> None:
+    """Apply changes made by other processes to this process's caches, if any subscribe."""
+    feed = current_app.extensions.get(EXTENSION_KEY)
+    if feed is not None and feed.subscribers:
+        feed.poll()
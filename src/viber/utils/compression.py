@@ -0,0 +1,218 @@
+"""
+Response compression for the Viber application.
+
+HTML and JSON responses are compressed in an ``after_request`` handler with
+the best encoding the client accepts: brotli or zstd when their packages are
+installed, otherwise gzip or deflate. Small responses, responses that are
+already encoded and file responses are sent as they are. Streamed responses
+are compressed as they are produced and flushed once enough output is
+pending, so the client can start rendering before the body is complete.
+Streamed templates are flushed after every chunk, as ``buffer_stream``
+already sizes their chunks and marks where the page should be sent early.
+"""
+
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional; br is not offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional; zstd is not offered without it
+    zstandard = None
+
+EXTENSION_KEY = 'viber.compression'
+
+class ZlibEncoder:
+    """Incremental gzip (wbits 31) or deflate (wbits 15) compressor."""
+
+    def __init__(self, level: int, wbits: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress data, returning whatever output is ready."""
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Return all output so far, keeping the stream open."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Return the remaining output and end the stream."""
+        return self._compressor.flush()
+
+class BrotliEncoder:
+    """Incremental brotli compressor, with the interface of ZlibEncoder."""
+
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class ZstdEncoder:
+    """Incremental zstd compressor, with the interface of ZlibEncoder."""
+
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+# Encoder factories by content encoding, in order of preference
+ENCODERS: Dict[str, Callable[[int], Any]] = {}
+if brotli is not None:
+    ENCODERS['br'] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS['zstd'] = ZstdEncoder
+ENCODERS['gzip'] = lambda level: ZlibEncoder(level, 31)
+ENCODERS['deflate'] = lambda level: ZlibEncoder(level, 15)
+
+class CompressionStats:
+    """Thread-safe counters of compressed responses and bytes saved."""
+
+    def __init__(self) -> None:
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def add(self, bytes_in: int, bytes_out: int) -> None:
+        """Count a compressed response."""
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def stats(self) -> Dict[str, int]:
+        """Get the counters."""
+        with self._lock:
+            return {
+                'responses': self.responses,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_saved': self.bytes_in - self.bytes_out,
+            }
+
+def get_compression_stats() -> CompressionStats:
+    """Get the compression counters of the current application."""
+    stats = current_app.extensions.get(EXTENSION_KEY)
+    if stats is None:
+        stats = current_app.extensions[EXTENSION_KEY] = CompressionStats()
+    return stats
+
+def weaken_etag(response: Response) -> None:
+    """
+    Mark a response's entity tag weak, as its encoded body differs byte for byte.
+
+    If-None-Match uses weak comparison, so revalidation keeps working.
+    """
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+def compress_stream(chunks: Iterable[Any], encoder: Any, charset: str,
+                    stats: CompressionStats, flush_size: int = 0) -> Iterator[bytes]:
+    """
+    Compress a streamed body.
+
+    Every flush ends a compressed block, which costs size, so small chunks
+    such as the rows of a JSON lines stream are gathered until at least
+    ``flush_size`` bytes are pending.
+
+    Args:
+        chunks: The body chunks
+        encoder: The encoder to compress with
+        charset: Encoding of text chunks
+        stats: Counters to add the response to once it is complete
+        flush_size: Uncompressed bytes to gather before flushing; 0 flushes
+            after every chunk
+    """
+    bytes_in = bytes_out = pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            if not chunk:
+                continue
+            data = encoder.compress(chunk)
+            bytes_in += len(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                data += encoder.flush()
+                pending = 0
+            if data:
+                bytes_out += len(data)
+                yield data
+        data = encoder.finish()
+        bytes_out += len(data)
+        yield data
+        stats.add(bytes_in, bytes_out)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress an HTML or JSON response if the client accepts an encoding.
+
+    Args:
+        response: The response
+
+    Returns:
+        Response: The same response, compressed when worthwhile
+    """
+    config = current_app.config
+    if (not config['RESPONSE_COMPRESSION'] or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.mimetype not in config['COMPRESSION_MIMETYPES']):
+        return response
+    if response.content_encoding:
+        weaken_etag(response)
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return response
+    encoding = request.accept_encodings.best_match(list(ENCODERS))
+    if encoding is None:
+        return response
+
+    encoder = ENCODERS[encoding](config['COMPRESSION_LEVEL'])
+    stats = get_compression_stats()
+    if response.is_streamed:
+        flush_size = 0 if response.mimetype == 'text/html' else config['COMPRESSION_STREAM_FLUSH']
+        response.response = compress_stream(response.response, encoder,
+                                            response.mimetype_params.get('charset', 'utf-8'),
+                                            stats, flush_size)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        data = encoder.compress(body) + encoder.finish()
+        if len(data) >= len(body):
+            return response
+        response.set_data(data)
+        stats.add(len(body), len(data))
+        current_app.logger.debug('Compressed %s with %s: %d -> %d bytes',
+                                 request.path, encoding, len(body), len(data))
+    response.content_encoding = encoding
+    weaken_etag(response)
+    return response
@@ -0,0 +1,120 @@
+"""
+Conditional GET support for the Viber application.
+
+Pages are validated against a version of the content they are rendered
+from, so a revalidation can be answered with 304 Not Modified before any
+product query runs or any template is rendered.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional, Tuple
+from flask import Response, current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+from ..models.cart import CartSummary
+from ..models.catalog import CatalogVersion
+
+EXTENSION_KEY = 'viber.template_version'
+
+# A content version is an opaque hashable key and an optional modification time
+ContentVersion = Tuple[Hashable, Optional[datetime]]
+
+def template_version() -> ContentVersion:
+    """
+    Get the version of the templates, from their modification times.
+
+    The asset manifest counts as a template, since a new asset build changes
+    the links in every page. Both only change on deploy, so the version is
+    computed once per application unless templates are reloaded automatically.
+
+    Returns:
+        tuple: (latest modification timestamp, latest modification time)
+    """
+    cached = current_app.extensions.get(EXTENSION_KEY)
+    if cached is not None and not current_app.jinja_env.auto_reload:
+        return cached
+    latest = 0.0
+    for root, _, files in os.walk(current_app.template_folder):
+        for name in files:
+            latest = max(latest, os.stat(os.path.join(root, name)).st_mtime)
+    # Pages link the fingerprinted assets named in the manifest
+    manifest = os.path.join(current_app.static_folder, 'dist', 'manifest.json')
+    if os.path.exists(manifest):
+        latest = max(latest, os.stat(manifest).st_mtime)
+    version = current_app.extensions[EXTENSION_KEY] = (
+        latest, datetime.fromtimestamp(int(latest), timezone.utc))
+    return version
+
+def catalog_version() -> ContentVersion:
+    """
+    Get the version of pages rendered from the catalog and the templates.
+
+    Returns:
+        tuple: (catalog and template version, latest modification time)
+    """
+    version, updated_at = CatalogVersion.stamp()
+    templates, templates_modified = template_version()
+    if updated_at is None:
+        return (version, templates), None
+    return (version, templates), max(updated_at.replace(tzinfo=timezone.utc), templates_modified)
+
+def make_etag(*parts: Any) -> str:
+    """Hash the parts a response depends on into an entity tag."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def conditional(version: Callable[[], ContentVersion]) -> Callable:
+    """
+    Decorator answering conditional GET requests for a page.
+
+    The ETag covers the content version and, for logged-in users, the
+    personalised navigation (username and cart count). Personalised pages
+    are marked private and carry no Last-Modified, as cart changes do not
+    move the content modification time. Requests with pending flash messages
+    are rendered normally, since the messages are shown only once.
+
+    Args:
+        version: Function returning the content version of the page
+
+    Returns:
+        The decorator
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def decorated_view(*args: Any, **kwargs: Any) -> Any:
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            key, last_modified = version()
+            authenticated = bool(session.get('authenticated'))
+            if authenticated:
+                username = session['username']
+                etag = make_etag(request.endpoint, key, username,
+                                 CartSummary.get_count(username))
+                last_modified = None
+            else:
+                etag = make_etag(request.endpoint, key)
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = Response(status=304)
+                # The full page may be compressed, so caches must keep
+                # validating the copy for the same Accept-Encoding
+                response.vary.add('Accept-Encoding')
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            if authenticated:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            response.vary.add('Cookie')
+            return response
+        return decorated_view
+    return decorator
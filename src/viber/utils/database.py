@@ -0,0 +1,153 @@
+"""
+Database profiles for the Viber application.
+
+A profile sets the SQLAlchemy engine options and the SQLite pragmas applied
+to every new connection. The production profile is tuned for several
+gunicorn workers writing to one database file: WAL lets readers and a
+writer proceed concurrently, and the busy timeout makes writers wait for
+the write lock instead of failing with ``database is locked``.
+
+With ``CATALOG_READ_ONLY_BIND`` enabled, catalog requests run their
+queries on a separate read-only engine, opened with ``mode=ro`` and
+``query_only``, so they never take a write lock or share a connection
+with cart writes.
+"""
+
+import os
+from typing import Any, Dict
+from flask import Flask, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from ..extensions import READ_ONLY_ENGINE, db
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {
+        'engine_options': {},
+        'pragmas': {},
+    },
+    'production': {
+        'engine_options': {
+            # Connections are cheap for SQLite; keep a few per worker and
+            # wait for one rather than opening connections without bound
+            'pool_size': 5,
+            'max_overflow': 5,
+            'pool_timeout': 30,
+        },
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',  # Durable across crashes of the app in WAL mode
+            'busy_timeout': 5000,  # Milliseconds to wait for the write lock
+            'cache_size': -64000,  # 64 MB page cache per connection
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+
+def configure_database(app: Flask) -> None:
+    """
+    Fill in engine options and pragmas from the configured database profile.
+
+    Must run before the database extension is initialized. Explicit
+    ``SQLALCHEMY_ENGINE_OPTIONS`` and ``SQLITE_PRAGMAS`` settings win over
+    the profile.
+
+    Args:
+        app: The Flask application
+
+    Raises:
+        ValueError: If ``DATABASE_PROFILE`` is unknown
+    """
+    name = app.config['DATABASE_PROFILE']
+    if name not in PROFILES:
+        raise ValueError(f'Unknown database profile: {name}')
+    profile = PROFILES[name]
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite:///:memory:'):
+        # In-memory databases use a single static connection
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    else:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', dict(profile['engine_options']))
+    app.config.setdefault('SQLITE_PRAGMAS', dict(profile['pragmas']))
+
+def read_only_uri(app: Flask) -> str:
+    """
+    Get the URI of the read-only catalog database.
+
+    Args:
+        app: The Flask application
+
+    Returns:
+        str: ``SQLALCHEMY_READ_ONLY_URI`` (e.g. a replica file), or the primary
+        database file opened read-only
+
+    Raises:
+        ValueError: If the primary database is not a SQLite file
+    """
+    if app.config.get('SQLALCHEMY_READ_ONLY_URI'):
+        return app.config['SQLALCHEMY_READ_ONLY_URI']
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        raise ValueError('CATALOG_READ_ONLY_BIND needs a SQLite database file '
+                         'or SQLALCHEMY_READ_ONLY_URI')
+    path = os.path.join(app.instance_path, url.database)  # Absolute paths are kept
+    return f'sqlite:///file:{path}?mode=ro&uri=true'
+
+def use_read_only() -> None:
+    """Run the remaining queries of the request on the read-only engine, if configured."""
+    g.read_only = True
+
+def init_engines(app: Flask) -> None:
+    """
+    Apply the configured SQLite pragmas to every new connection, and create
+    the read-only engine when ``CATALOG_READ_ONLY_BIND`` is enabled.
+
+    Must run after the database extension is initialized.
+
+    Args:
+        app: The Flask application
+    """
+    pragmas = app.config['SQLITE_PRAGMAS']
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite' and pragmas:
+            event.listen(engine, 'connect', _pragma_setter(pragmas))
+
+    if app.config['CATALOG_READ_ONLY_BIND']:
+        engine = create_engine(read_only_uri(app), **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        if engine.dialect.name == 'sqlite':
+            # The journal mode can only be changed by a writer
+            read_only_pragmas = {name: value for name, value in pragmas.items()
+                                 if name != 'journal_mode'}
+            read_only_pragmas['query_only'] = 'ON'
+            event.listen(engine, 'connect', _pragma_setter(read_only_pragmas))
+        app.extensions[READ_ONLY_ENGINE] = engine
+
+def dispose_engines(app: Flask) -> None:
+    """
+    Close every pooled connection of the primary and read-only engines.
+
+    Call it after using the database in a process that forks workers, such
+    as gunicorn with ``--preload``, so no two workers inherit and share one
+    SQLite connection. The engines reconnect on next use.
+
+    Args:
+        app: The Flask application
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
+    if READ_ONLY_ENGINE in app.extensions:
+        engines.append(app.extensions[READ_ONLY_ENGINE])
+    for engine in engines:
+        engine.dispose()
+
+def _pragma_setter(pragmas: Dict[str, Any]) -> Any:
+    """Build a connect event handler setting the given pragmas."""
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return set_pragmas
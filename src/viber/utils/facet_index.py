@@ -0,0 +1,397 @@
+"""
+In-memory bitmap facet index for the Viber product catalog.
+
+Every product gets a position, and every facet value keeps an integer bitset
+of the positions that carry it, so any combination of filters resolves with
+bitwise AND/OR. Products are only loaded from the database to hydrate the
+page of results being displayed.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from ..extensions import db
+from ..models.product import Product
+from .catalog import FACETS, SORT_OPTIONS, empty_facet_counts
+from .change_feed import get_change_feed
+from .pagination import KeysetPage, decode_cursor
+
+EXTENSION_KEY = 'viber.facet_index'
+
+# Columns loaded for each product; facet values first, in FACETS order
+INDEX_COLUMNS = FACETS + ('price', 'name', 'in_stock')
+
+def popcount(bitmap: int) -> int:
+    """Count the set bits of a bitmap."""
+    try:
+        return bitmap.bit_count()
+    except AttributeError:  # pragma: no cover - Python < 3.10
+        return bin(bitmap).count('1')
+
+def positions_to_bitmap(positions: Iterable[int], size: int) -> int:
+    """Build a bitmap from an iterable of positions."""
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+class FacetIndex:
+    """Bitmap index over the filterable attributes of every product."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.ids: List[Optional[int]] = []
+        self.rows: List[Optional[Tuple[Any, ...]]] = []
+        self.positions: Dict[int, int] = {}
+        self.bitmaps: Dict[str, Dict[Any, int]] = {facet: {} for facet in FACETS}
+        self.in_stock = 0
+        self.alive = 0
+        self._orders: Dict[str, Tuple[List[int], List[Tuple[Any, int]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def load(self, rows: Iterable[Tuple[Any, ...]]) -> None:
+        """
+        Replace the index contents.
+
+        Args:
+            rows: Tuples of (id, *INDEX_COLUMNS) for every product
+        """
+        with self._lock:
+            self._reset()
+            # Collect positions first; OR-ing bits one at a time into large
+            # integers would copy every bitmap once per product
+            positions: Dict[str, Dict[Any, List[int]]] = {facet: {} for facet in FACETS}
+            in_stock = []
+            for position, (product_id, *values) in enumerate(rows):
+                self.ids.append(product_id)
+                self.rows.append(tuple(values))
+                self.positions[product_id] = position
+                for facet, value in zip(FACETS, values):
+                    positions[facet].setdefault(value, []).append(position)
+                if values[-1]:
+                    in_stock.append(position)
+            size = len(self.ids)
+            for facet, values in positions.items():
+                self.bitmaps[facet] = {value: positions_to_bitmap(found, size)
+                                       for value, found in values.items()}
+            self.in_stock = positions_to_bitmap(in_stock, size)
+            self.alive = (1 << size) - 1
+
+    def upsert(self, rows: Iterable[Tuple[Any, ...]]) -> None:
+        """
+        Add or update products.
+
+        Args:
+            rows: Tuples of (id, *INDEX_COLUMNS)
+        """
+        with self._lock:
+            for product_id, *values in rows:
+                position = self.positions.get(product_id)
+                if position is None:
+                    position = len(self.ids)
+                    self.ids.append(product_id)
+                    self.rows.append(None)
+                    self.positions[product_id] = position
+                else:
+                    self._clear(position)
+                self._set(position, tuple(values))
+            self._orders.clear()
+
+    def remove(self, product_ids: Iterable[int]) -> None:
+        """
+        Remove products from the index.
+
+        Args:
+            product_ids: Ids of the deleted products
+        """
+        with self._lock:
+            for product_id in product_ids:
+                position = self.positions.pop(product_id, None)
+                if position is not None:
+                    self._clear(position)
+                    self.ids[position] = None
+            self._orders.clear()
+
+    def _set(self, position: int, values: Tuple[Any, ...]) -> None:
+        bit = 1 << position
+        for facet, value in zip(FACETS, values):
+            bitmaps = self.bitmaps[facet]
+            bitmaps[value] = bitmaps.get(value, 0) | bit
+        if values[-1]:
+            self.in_stock |= bit
+        self.alive |= bit
+        self.rows[position] = values
+
+    def _clear(self, position: int) -> None:
+        values = self.rows[position]
+        if values is None:
+            return
+        mask = ~(1 << position)
+        for facet, value in zip(FACETS, values):
+            self.bitmaps[facet][value] &= mask
+        self.in_stock &= mask
+        self.alive &= mask
+        self.rows[position] = None
+
+    def _order(self, sort: str) -> Tuple[List[int], List[Tuple[Any, int]]]:
+        """Get live positions in ascending (sort value, id) order with their keys."""
+        order = self._orders.get(sort)
+        if order is None:
+            with self._lock:
+                column, _ = SORT_OPTIONS[sort]
+                offset = INDEX_COLUMNS.index(column) if column else None
+                keyed = sorted(
+                    ((values[offset] if offset is not None else self.ids[position],
+                      self.ids[position]), position)
+                    for position, values in enumerate(self.rows) if values is not None
+                )
+                order = ([position for _, position in keyed], [key for key, _ in keyed])
+                self._orders[sort] = order
+        return order
+
+    def match(self, selected_filters: Dict[str, Any]) -> int:
+        """
+        Resolve the selected filters to a bitmap of matching positions.
+
+        Args:
+            selected_filters: The selected filters
+
+        Returns:
+            int: Bitmap of matching positions
+        """
+        bitmap = self._match_facets(selected_filters)
+        min_price = selected_filters.get('min_price')
+        max_price = selected_filters.get('max_price')
+        if min_price is not None or max_price is not None:
+            bitmap &= self._price_range(min_price, max_price)
+        return bitmap
+
+    def _match_facets(self, selected_filters: Dict[str, Any]) -> int:
+        bitmap = self.alive
+        for facet in FACETS:
+            values = selected_filters.get(facet)
+            if values:
+                facet_bitmaps = self.bitmaps[facet]
+                union = 0
+                for value in values:
+                    union |= facet_bitmaps.get(value, 0)
+                bitmap &= union
+        if selected_filters.get('in_stock'):
+            bitmap &= self.in_stock
+        return bitmap
+
+    def facet_counts(self, selected_filters: Dict[str, Any]
+                     ) -> Tuple[Dict[str, Dict[str, int]], int]:
+        """
+        Count matching products per facet value, excluding each facet's own selection.
+
+        Args:
+            selected_filters: The selected filters
+
+        Returns:
+            tuple: (counts by facet and value, total matching products)
+        """
+        counts = empty_facet_counts()
+        with self._lock:
+            base = self.match({facet: values for facet, values in selected_filters.items()
+                               if facet not in FACETS})
+            selections = {}
+            for facet in FACETS:
+                selection = -1
+                if selected_filters.get(facet):
+                    selection = 0
+                    for value in selected_filters[facet]:
+                        selection |= self.bitmaps[facet].get(value, 0)
+                selections[facet] = selection
+            for facet in FACETS:
+                others = base
+                for other, selection in selections.items():
+                    if other != facet:
+                        others &= selection
+                for value, bitmap in self.bitmaps[facet].items():
+                    counts[facet][value] = popcount(others & bitmap)
+            total = base
+            for selection in selections.values():
+                total &= selection
+        return counts, popcount(total)
+
+    def _price_range(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        positions, keys = self._order('price_asc')
+        start = 0 if min_price is None else bisect_left(keys, (min_price,))
+        end = len(keys) if max_price is None else bisect_right(keys, (max_price, float('inf')))
+        return positions_to_bitmap(positions[start:end], len(self.ids))
+
+    def paginate(self, selected_filters: Dict[str, Any], sort: str, per_page: int,
+                 after: Optional[str] = None,
+                 before: Optional[str] = None) -> Tuple[List[int], bool, bool]:
+        """
+        Find one page of matching product ids.
+
+        Args:
+            selected_filters: The selected filters
+            sort: The sort option
+            per_page: Maximum number of products per page
+            after: Cursor of the last product of the previous page
+            before: Cursor of the first product of the next page
+
+        Returns:
+            tuple: (product ids in display order, has_next, has_prev)
+        """
+        min_price = selected_filters.get('min_price')
+        max_price = selected_filters.get('max_price')
+        price = INDEX_COLUMNS.index('price')
+
+        position = decode_cursor(after, sort)
+        backwards = False
+        if position is None and before:
+            position = decode_cursor(before, sort)
+            backwards = position is not None
+        _, descending = SORT_OPTIONS[sort]
+        reverse = descending != backwards
+
+        # The walk reads rows and ids that commits patch in place, so it holds
+        # the lock throughout. Price bounds are checked while walking the sort
+        # order, which is cheaper than materialising a bitmap of the range
+        ids = []
+        with self._lock:
+            bitmap = self._match_facets(selected_filters)
+            positions, keys = self._order(sort)
+            matches = bitmap.to_bytes((len(self.ids) + 7) // 8, 'little')
+
+            # Walk the ascending order forwards or backwards from the cursor
+            if position is None:
+                indexes = range(len(keys) - 1, -1, -1) if reverse else range(len(keys))
+            elif reverse:
+                indexes = range(bisect_left(keys, tuple(position)) - 1, -1, -1)
+            else:
+                indexes = range(bisect_right(keys, tuple(position)), len(keys))
+
+            for index in indexes:
+                found = positions[index]
+                if matches[found >> 3] >> (found & 7) & 1:
+                    if min_price is not None and self.rows[found][price] < min_price:
+                        continue
+                    if max_price is not None and self.rows[found][price] > max_price:
+                        continue
+                    ids.append(self.ids[found])
+                    if len(ids) > per_page:
+                        break
+        has_more = len(ids) > per_page
+        ids = ids[:per_page]
+
+        if backwards:
+            ids.reverse()
+            return ids, True, has_more
+        return ids, has_more, position is not None
+
+    def page(self, selected_filters: Dict[str, Any], sort: str, per_page: int,
+             after: Optional[str] = None, before: Optional[str] = None) -> KeysetPage:
+        """
+        Fetch one page of matching products, loading only that page from the database.
+
+        Args:
+            selected_filters: The selected filters
+            sort: The sort option
+            per_page: Maximum number of products per page
+            after: Cursor of the last product of the previous page
+            before: Cursor of the first product of the next page
+
+        Returns:
+            KeysetPage: The requested page
+        """
+        ids, has_next, has_prev = self.paginate(selected_filters, sort, per_page, after, before)
+        products = {}
+        if ids:
+            products = {p.id: p for p in Product.query.filter(Product.id.in_(ids))}
+        items = [products[product_id] for product_id in ids if product_id in products]
+        return KeysetPage(items, sort, has_next=has_next, has_prev=has_prev)
+
+    def rebuild(self) -> None:
+        """Reload the whole index from the database."""
+        columns = [Product.id] + [getattr(Product, column) for column in INDEX_COLUMNS]
+        self.load(db.session.execute(select(*columns)).all())
+
+    def apply_changes(self, upserted: Set[int], deleted: Set[int], reset: bool) -> None:
+        """
+        Apply product changes from the change feed.
+
+        Args:
+            upserted: Ids of inserted or updated products
+            deleted: Ids of deleted products
+            reset: Whether the whole catalog must be reloaded
+        """
+        if reset or len(upserted) > len(self) // 4:
+            self.rebuild()
+            return
+        columns = [Product.id] + [getattr(Product, column) for column in INDEX_COLUMNS]
+        ids = sorted(upserted)
+        rows = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows.extend(db.session.execute(select(*columns).where(Product.id.in_(chunk))))
+        # Products deleted since the change was logged are gone from the table
+        found = {row[0] for row in rows}
+        self.remove(deleted | (upserted - found))
+        self.upsert(rows)
+
+def get_facet_index() -> Optional[FacetIndex]:
+    """
+    Get the facet index of the current application, building it on first use.
+
+    Returns:
+        FacetIndex: The index, or None if ``CATALOG_FACET_INDEX`` is disabled
+    """
+    if not current_app.config.get('CATALOG_FACET_INDEX'):
+        return None
+    index = current_app.extensions.get(EXTENSION_KEY)
+    if index is None:
+        # Follow the change feed from before the load, so writes by other
+        # processes while the index is built are applied afterwards
+        feed = get_change_feed()
+        feed.start()
+        index = FacetIndex()
+        index.rebuild()
+        feed.subscribe(index.apply_changes)
+        current_app.extensions[EXTENSION_KEY] = index
+    return index
+
+def _index_row(product: Product) -> Tuple[Any, ...]:
+    return (product.id,) + tuple(getattr(product, column) for column in INDEX_COLUMNS)
+
+@event.listens_for(db.session, 'after_flush')
+def _record_product_changes(session: Any, flush_context: Any) -> None:
+    """Capture flushed product changes so they can be applied once committed."""
+    if not has_app_context() or EXTENSION_KEY not in current_app.extensions:
+        return
+    changes = session.info.setdefault(EXTENSION_KEY, {'upsert': {}, 'remove': set()})
+    for product in session.new | session.dirty:
+        if isinstance(product, Product):
+            changes['upsert'][product.id] = _index_row(product)
+            changes['remove'].discard(product.id)
+    for product in session.deleted:
+        if isinstance(product, Product):
+            changes['upsert'].pop(product.id, None)
+            changes['remove'].add(product.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_product_changes(session: Any) -> None:
+    """Patch the facet index with the committed product changes."""
+    changes = session.info.pop(EXTENSION_KEY, None)
+    if changes is None or not has_app_context():
+        return
+    index = current_app.extensions.get(EXTENSION_KEY)
+    if index is not None:
+        index.remove(changes['remove'])
+        index.upsert(changes['upsert'].values())
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_product_changes(session: Any, previous_transaction: Any) -> None:
+    """Forget product changes that were rolled back."""
+    session.info.pop(EXTENSION_KEY, None)
@@ -0,0 +1,165 @@
+"""
+Full-response cache for the public content pages of the Viber application.
+
+The home, about and contact pages are the same for every visitor who is not
+logged in and has no pending flash messages. Their rendered responses are
+cached per page and template version, together with a gzip copy compressed
+once, and served without running the view or rendering a template.
+
+The in-process LRU can be backed by a SQLite file shared by every worker
+(``PAGE_CACHE_PATH``), so a page rendered by one worker is served by all.
+"""
+
+import gzip
+import sqlite3
+import threading
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional, Tuple
+from flask import Response, current_app, make_response, request, session
+from .cache import LRUCache
+from .conditional import template_version
+
+EXTENSION_KEY = 'viber.page_cache'
+
+# A cached page is its body, its gzip-compressed body and its content type
+PageEntry = Tuple[bytes, bytes, str]
+
+class SharedPageStore:
+    """Cached pages stored in a SQLite file shared by worker processes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the table on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS page_cache ('
+                'page TEXT PRIMARY KEY, version TEXT NOT NULL, body BLOB NOT NULL, '
+                'gzip_body BLOB NOT NULL, content_type TEXT NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+    def get(self, page: str, version: str) -> Optional[PageEntry]:
+        """Get the cached entry of a page, if it was rendered from this version."""
+        row = self._connection().execute(
+            'SELECT body, gzip_body, content_type FROM page_cache WHERE page = ? AND version = ?',
+            (page, version)).fetchone()
+        return tuple(row) if row is not None else None
+
+    def set(self, page: str, version: str, entry: PageEntry) -> None:
+        """Cache a page, replacing the entry of any other version."""
+        self._connection().execute(
+            'INSERT OR REPLACE INTO page_cache (page, version, body, gzip_body, content_type) '
+            'VALUES (?, ?, ?, ?, ?)', (page, version, *entry))
+
+    def close(self) -> None:
+        """Close this thread's connection; the next access reopens it."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+class PageCache:
+    """In-process page cache, optionally backed by a store shared between workers."""
+
+    def __init__(self, max_bytes: int, path: Optional[str] = None) -> None:
+        self.memory = LRUCache(max_bytes)
+        self.shared = SharedPageStore(path) if path else None
+
+    def get(self, page: str, version: str) -> Optional[PageEntry]:
+        """
+        Get a cached page, copying it from the shared store on a local miss.
+
+        Args:
+            page: The page path
+            version: The template version it must be rendered from
+
+        Returns:
+            tuple: The cached entry, or None on a miss
+        """
+        key: Hashable = (page, version)
+        entry = self.memory.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(page, version)
+            if entry is not None:
+                self.memory.set(key, entry, entry_size(entry))
+        return entry
+
+    def set(self, page: str, version: str, entry: PageEntry) -> None:
+        """Cache a page locally and in the shared store."""
+        self.memory.set((page, version), entry, entry_size(entry))
+        if self.shared is not None:
+            self.shared.set(page, version, entry)
+
+    def close(self) -> None:
+        """Close the connection to the shared store, e.g. before forking workers."""
+        if self.shared is not None:
+            self.shared.close()
+
+def entry_size(entry: PageEntry) -> int:
+    """Get the size of a cached page in bytes."""
+    return len(entry[0]) + len(entry[1])
+
+def get_page_cache() -> Optional[PageCache]:
+    """
+    Get the page cache of the current application.
+
+    Returns:
+        PageCache: The cache, or None if ``PAGE_CACHE_BYTES`` is 0
+    """
+    max_bytes = current_app.config.get('PAGE_CACHE_BYTES')
+    if not max_bytes:
+        return None
+    path = current_app.config.get('PAGE_CACHE_PATH')
+    cache = current_app.extensions.get(EXTENSION_KEY)
+    if (cache is None or cache.memory.max_bytes != max_bytes
+            or (cache.shared.path if cache.shared else None) != path):
+        cache = current_app.extensions[EXTENSION_KEY] = PageCache(max_bytes, path)
+    return cache
+
+def page_response(entry: PageEntry) -> Response:
+    """Build a response from a cached page, gzip-encoded if the client accepts it."""
+    body, gzip_body, content_type = entry
+    if request.accept_encodings['gzip'] and len(gzip_body) < len(body):
+        response = Response(gzip_body, content_type=content_type)
+        response.content_encoding = 'gzip'
+    else:
+        response = Response(body, content_type=content_type)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def cached_page(view: Callable) -> Callable:
+    """
+    Decorator serving an anonymous page from the page cache.
+
+    Logged-in visitors see their name and cart in the navigation, and pending
+    flash messages are shown only once, so those requests always run the
+    view. Place it below ``conditional`` so revalidations are still answered
+    with 304 before the cache is read.
+    """
+    @wraps(view)
+    def decorated_view(*args: Any, **kwargs: Any) -> Any:
+        cache = get_page_cache()
+        if (cache is None or request.method not in ('GET', 'HEAD')
+                or session.get('authenticated') or session.get('_flashes')):
+            return view(*args, **kwargs)
+
+        page = request.script_root + request.path
+        version = repr(template_version()[0])
+        entry = cache.get(page, version)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            level = current_app.config['PAGE_CACHE_GZIP_LEVEL']
+            entry = (body, gzip.compress(body, level, mtime=0), response.content_type)
+            cache.set(page, version, entry)
+        return page_response(entry)
+    return decorated_view
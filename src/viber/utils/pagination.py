@@ -0,0 +1,166 @@
+"""
+Keyset pagination utilities for the Viber application.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy import tuple_
+from ..models.product import Product
+from .catalog import SORT_OPTIONS, sort_column, sort_value
+
+def encode_cursor(sort: str, value: Any, product_id: int) -> str:
+    """
+    Encode a position in a sorted listing as an opaque cursor.
+
+    Args:
+        sort: The sort option the cursor belongs to
+        value: The sort key value at the position
+        product_id: The product id at the position
+
+    Returns:
+        str: The URL-safe cursor
+    """
+    payload = json.dumps([sort, value, product_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def is_sort_value(value: Any, sort: str) -> bool:
+    """
+    Check that a decoded cursor value has the type of a sort option's key.
+
+    Names are strings, the featured order uses product ids, and prices and
+    search ranks are numbers. ``bool`` is rejected although it is an ``int``.
+    """
+    if isinstance(value, bool):
+        return False
+    column, _ = SORT_OPTIONS[sort]
+    if column == 'name':
+        return isinstance(value, str)
+    if column is None:
+        return isinstance(value, int)
+    return isinstance(value, (int, float))
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Optional[Tuple[Any, int]]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor: The cursor to decode
+        sort: The sort option the cursor must belong to
+
+    Returns:
+        tuple: The (value, product_id) position, or None if the cursor is
+        missing, malformed, belongs to another sort option or holds values
+        of the wrong type
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, product_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if (cursor_sort != sort or sort not in SORT_OPTIONS or not is_sort_value(value, sort)
+            or not isinstance(product_id, int) or isinstance(product_id, bool)):
+        return None
+    return value, product_id
+
+class KeysetPage:
+    """A page of products fetched with keyset pagination."""
+
+    def __init__(self, items: List[Any], sort: str, has_next: bool, has_prev: bool) -> None:
+        self.items = items
+        self.sort = sort
+        self.has_next = has_next
+        self.has_prev = has_prev
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        """Cursor for the page after this one."""
+        if not self.has_next or not self.items:
+            return None
+        last = self.items[-1]
+        return encode_cursor(self.sort, sort_value(last, self.sort), last.id)
+
+    @property
+    def prev_cursor(self) -> Optional[str]:
+        """Cursor for the page before this one."""
+        if not self.has_prev or not self.items:
+            return None
+        first = self.items[0]
+        return encode_cursor(self.sort, sort_value(first, self.sort), first.id)
+
+def keyset_paginate(query: Any, sort: str, per_page: int,
+                    after: Optional[str] = None, before: Optional[str] = None,
+                    load: Optional[Callable[[List[int]], List[Any]]] = None) -> KeysetPage:
+    """
+    Fetch one page of a product query using keyset pagination.
+
+    Products are ordered by the sort column with ``id`` as the tiebreaker, so
+    every position is unique and each page is a bounded index range scan
+    regardless of how deep into the listing it is.
+
+    Args:
+        query: The filtered product query
+        sort: The sort option
+        per_page: Maximum number of products per page
+        after: Cursor of the last product of the previous page
+        before: Cursor of the first product of the next page
+        load: Function turning product ids into display objects; when given,
+            only the ids are selected and products are not loaded as ORM instances
+
+    Returns:
+        KeysetPage: The requested page
+    """
+    column = sort_column(sort)
+    _, descending = SORT_OPTIONS[sort]
+    position = decode_cursor(after, sort)
+    backwards = False
+    if position is None and before:
+        position = decode_cursor(before, sort)
+        backwards = position is not None
+
+    # Walking backwards flips the direction of both the ordering and the bound
+    reverse = descending != backwards
+    keys = [column, Product.id] if column is not None else [Product.id]
+    if position is not None:
+        value, product_id = position
+        bound = [value, product_id] if column is not None else [product_id]
+        key = tuple_(*keys) if len(keys) > 1 else keys[0]
+        bound_value = tuple_(*bound) if len(bound) > 1 else bound[0]
+        query = query.filter(key < bound_value if reverse else key > bound_value)
+    query = query.order_by(*[k.desc() if reverse else k.asc() for k in keys])
+
+    if load is not None:
+        entities = [Product.id, column] if sort == 'relevance' else [Product.id]
+        rows = query.with_entities(*entities).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        items = load([row[0] for row in rows])
+        if sort == 'relevance':
+            ranks = {row[0]: row[1] for row in rows}
+            for item in items:
+                item.search_rank = ranks[item.id]
+    else:
+        if sort == 'relevance':
+            # The search rank is not a product attribute, so load it alongside
+            items = []
+            for product, rank in query.add_columns(column).limit(per_page + 1):
+                product.search_rank = rank
+                items.append(product)
+        else:
+            items = query.limit(per_page + 1).all()
+        has_more = len(items) > per_page
+        items = items[:per_page]
+
+    if backwards:
+        items.reverse()
+        return KeysetPage(items, sort, has_next=True, has_prev=has_more)
+    return KeysetPage(items, sort, has_next=has_more, has_prev=position is not None)
@@ -0,0 +1,158 @@
+"""
+Cached rendering of the product grid for the Viber application.
+
+The grid is the same for every visitor except for the cart button on each
+card, so the rendered fragment leaves a placeholder for that button and is
+cached per catalog version, filter selection, sort option and page.
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from flask import current_app, get_template_attribute, session
+from markupsafe import Markup
+from ..models.catalog import CatalogVersion
+from ..models.search import match_expression
+from .cache import LRUCache
+from .catalog import FACETS
+
+EXTENSION_KEY = 'viber.grid_cache'
+
+CART_ACTION = re.compile(r'<!--cart-action:(\d+):([01])-->')
+
+# A cached grid alternates static markup with (product id, in stock) slots
+Fragment = Tuple[Union[str, Tuple[int, bool]], ...]
+
+def cart_action_placeholder(product: Any) -> Markup:
+    """Mark where the user-specific cart button of a product card goes."""
+    return Markup(f'<!--cart-action:{product.id}:{int(bool(product.in_stock))}-->')
+
+def split_fragment(html: str) -> Fragment:
+    """Split rendered grid markup into static parts and cart button slots."""
+    parts: List[Union[str, Tuple[int, bool]]] = []
+    position = 0
+    for match in CART_ACTION.finditer(html):
+        parts.append(html[position:match.start()])
+        parts.append((int(match.group(1)), match.group(2) == '1'))
+        position = match.end()
+    parts.append(html[position:])
+    return tuple(parts)
+
+def assemble_fragment(fragment: Fragment) -> Markup:
+    """Fill the cart button slots of a grid fragment for the current user."""
+    cart_action = get_template_attribute('_cart_action.html', 'cart_action')
+    authenticated = bool(session.get('authenticated'))
+    return Markup(''.join(
+        part if isinstance(part, str) else cart_action(part[0], part[1], authenticated)
+        for part in fragment
+    ))
+
+def get_grid_cache() -> Optional[LRUCache]:
+    """
+    Get the product grid cache of the current application.
+
+    Returns:
+        LRUCache: The cache, or None if ``PRODUCT_GRID_CACHE_BYTES`` is 0
+    """
+    max_bytes = current_app.config.get('PRODUCT_GRID_CACHE_BYTES')
+    if not max_bytes:
+        return None
+    cache = current_app.extensions.get(EXTENSION_KEY)
+    if cache is None or cache.max_bytes != max_bytes:
+        cache = current_app.extensions[EXTENSION_KEY] = LRUCache(max_bytes)
+    return cache
+
+def filters_key(selected_filters: Dict[str, Any]) -> Tuple[Any, ...]:
+    """
+    Build an order-insensitive key for a filter selection.
+
+    Args:
+        selected_filters: The selected filters
+
+    Returns:
+        tuple: Equal for selections that produce the same results
+    """
+    return (
+        tuple(tuple(sorted(set(selected_filters.get(facet) or ()))) for facet in FACETS),
+        selected_filters.get('min_price'),
+        selected_filters.get('max_price'),
+        bool(selected_filters.get('in_stock')),
+        match_expression(selected_filters.get('q')),
+    )
+
+def versioned_key(key: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """Prefix a grid cache key with the current catalog version."""
+    return (CatalogVersion.current(),) + key
+
+def cached(cache: Optional[LRUCache], key: Tuple[Any, ...],
+           compute: Callable[[], Any], size: Callable[[Any], int]) -> Any:
+    """
+    Get a value from the grid cache, computing and storing it on a miss.
+
+    Args:
+        cache: The cache, or None to always compute
+        key: The cache key, without the catalog version
+        compute: Function computing the value
+        size: Function estimating the size of the value in bytes
+
+    Returns:
+        The cached or computed value
+    """
+    if cache is None:
+        return compute()
+    key = versioned_key(key)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, size(value))
+    return value
+
+def fragment_size(fragment: Fragment) -> int:
+    """Estimate the size of a grid fragment in bytes."""
+    return sum(len(part.encode()) for part in fragment if isinstance(part, str))
+
+def stream_product_grid(selected_filters: Dict[str, Any], sort: str, per_page: int,
+                        after: Optional[str], before: Optional[str],
+                        fetch_page: Callable[[], Any], **context: Any) -> Iterator[Markup]:
+    """
+    Render the product grid in chunks, reusing a cached fragment when possible.
+
+    Nothing is fetched or rendered until the first chunk is requested, so a
+    streamed page can send everything above the grid first. On a cache miss
+    the cards are yielded as they are rendered and the fragment is cached
+    once the grid is complete.
+
+    Args:
+        selected_filters: The selected filters
+        sort: The sort option
+        per_page: Maximum number of products per page
+        after: Cursor of the last product of the previous page
+        before: Cursor of the first product of the next page
+        fetch_page: Function returning the page of products to render
+        **context: Additional template context
+
+    Yields:
+        Markup: Parts of the grid for the current user
+    """
+    cache = get_grid_cache()
+    if cache is not None:
+        # The pagination links repeat the search as typed, so only the same
+        # spelling shares a fragment
+        key = versioned_key(('grid', filters_key(selected_filters), selected_filters.get('q'),
+                             sort, per_page, after, before))
+        fragment = cache.get(key)
+        if fragment is not None:
+            yield assemble_fragment(fragment)
+            return
+
+    # Rendered as part of the streamed page, inside its request context
+    template = current_app.jinja_env.get_template('_product_grid.html')
+    context.update(page=fetch_page(), sort_by=sort, cart_action=cart_action_placeholder)
+    current_app.update_template_context(context)
+    html = []
+    for part in template.generate(context):
+        html.append(part)
+        fragment = split_fragment(part)
+        yield assemble_fragment(fragment) if len(fragment) > 1 else Markup(part)
+    if cache is not None:
+        fragment = split_fragment(''.join(html))
+        cache.set(key, fragment, fragment_size(fragment))
@@ -0,0 +1,178 @@
+"""
+Read-only in-memory catalog snapshot for the Viber application.
+
+The snapshot holds the display data of every product column by column:
+numbers in typed arrays, enumerated attributes as one byte codes and
+repeated strings shared between products, with a dict from product id to
+position. Pages look products up by id and get small ``__slots__`` records
+instead of ORM instances, so rendering skips the identity map, attribute
+instrumentation and the row-to-object work of a full product query.
+
+A snapshot is never modified. It is stamped with the catalog version it was
+built at, and replaced by a freshly built one as soon as a request sees a
+newer version.
+"""
+
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from flask import current_app, g
+from sqlalchemy import SmallInteger, select, type_coerce
+from ..extensions import db
+from ..models.catalog import CatalogVersion
+from ..models.product import Product
+
+EXTENSION_KEY = 'viber.catalog_snapshot'
+
+# Columns kept for display, loaded after the product id
+SNAPSHOT_COLUMNS = ('sku', 'name', 'description', 'price', 'image_url', 'category', 'fit',
+                    'size', 'color', 'material', 'style', 'season', 'gender', 'in_stock',
+                    'stock_quantity')
+
+# Enumerated columns, stored as their codes
+ENUM_COLUMNS = ('category', 'fit', 'size', 'color', 'material', 'style', 'season', 'gender')
+
+# Numeric columns mapped to their array type codes; NULL is stored as -1
+NUMERIC_COLUMNS = {'price': 'd', 'in_stock': 'b', 'stock_quantity': 'q'}
+
+# Fields of ``Product.to_dict()``
+DICT_FIELDS = ('id',) + tuple(column for column in SNAPSHOT_COLUMNS if column != 'sku')
+
+NULL = -1
+
+_build_lock = threading.Lock()
+
+class ProductRecord:
+    """Read-only view of one product in a snapshot, with the attributes of ``Product``."""
+
+    __slots__ = ('_snapshot', '_position', 'search_rank')
+
+    def __init__(self, snapshot: 'CatalogSnapshot', position: int) -> None:
+        self._snapshot = snapshot
+        self._position = position
+
+    @property
+    def id(self) -> int:
+        """The product id."""
+        return self._snapshot.ids[self._position]
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._snapshot.value(name, self._position)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        return f'<ProductRecord {self.name}>'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the product to a dictionary, like ``Product.to_dict()``."""
+        return {field: getattr(self, field) for field in DICT_FIELDS}
+
+class CatalogSnapshot:
+    """Immutable column-oriented copy of the catalog at one catalog version."""
+
+    __slots__ = ('version', 'ids', 'positions', 'columns', 'enum_values')
+
+    def __init__(self, version: int, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Build a snapshot.
+
+        Args:
+            version: The catalog version the rows were read at or after
+            rows: Tuples of (id, *SNAPSHOT_COLUMNS), with enumerated columns as codes
+        """
+        self.version = version
+        self.ids = array('q')
+        self.enum_values = {column: Product.__table__.c[column].type.values
+                            for column in ENUM_COLUMNS}
+        columns: Dict[str, Any] = {}
+        for column in SNAPSHOT_COLUMNS:
+            if column in ENUM_COLUMNS:
+                columns[column] = array('B')
+            elif column in NUMERIC_COLUMNS:
+                columns[column] = array(NUMERIC_COLUMNS[column])
+            else:
+                columns[column] = []
+        strings: Dict[str, str] = {}  # Generated catalogs repeat names and descriptions
+
+        for product_id, *values in rows:
+            self.ids.append(product_id)
+            for column, value in zip(SNAPSHOT_COLUMNS, values):
+                if column in NUMERIC_COLUMNS:
+                    value = NULL if value is None else value
+                elif value is not None and column not in ENUM_COLUMNS:
+                    value = strings.setdefault(value, value)
+                columns[column].append(value)
+        self.columns = columns
+        self.positions = {product_id: position for position, product_id in enumerate(self.ids)}
+
+    @classmethod
+    def build(cls) -> 'CatalogSnapshot':
+        """Load a snapshot of the current catalog from the database."""
+        # Read the version first: a change committed while the rows load is
+        # then picked up as a newer version on the next request
+        version = CatalogVersion.current()
+        columns = [type_coerce(Product.__table__.c[column], SmallInteger)
+                   if column in ENUM_COLUMNS else Product.__table__.c[column]
+                   for column in SNAPSHOT_COLUMNS]
+        rows = db.session.execute(select(Product.id, *columns).order_by(Product.id))
+        return cls(version, rows)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self.positions
+
+    def value(self, column: str, position: int) -> Any:
+        """
+        Get one column value of the product at a position.
+
+        Raises:
+            KeyError: If the column is not part of the snapshot
+        """
+        value = self.columns[column][position]
+        if column in ENUM_COLUMNS:
+            return self.enum_values[column][value]
+        if column in NUMERIC_COLUMNS:
+            if value == NULL:
+                return None
+            return bool(value) if column == 'in_stock' else value
+        return value
+
+    def get(self, product_id: int) -> Optional[ProductRecord]:
+        """Get the record of a product, or None if it is not in the snapshot."""
+        position = self.positions.get(product_id)
+        return None if position is None else ProductRecord(self, position)
+
+    def get_many(self, product_ids: Iterable[int]) -> List[ProductRecord]:
+        """Get the records of products in the given order, skipping unknown ids."""
+        positions = self.positions
+        return [ProductRecord(self, positions[product_id])
+                for product_id in product_ids if product_id in positions]
+
+def get_snapshot() -> Optional[CatalogSnapshot]:
+    """
+    Get the catalog snapshot of the current application at the current catalog version.
+
+    The snapshot is built on first use and rebuilt when the catalog version
+    changes; requests already holding the old snapshot keep using it.
+
+    Returns:
+        CatalogSnapshot: The snapshot, or None if ``CATALOG_SNAPSHOT`` is disabled
+    """
+    if not current_app.config.get('CATALOG_SNAPSHOT'):
+        return None
+    if 'catalog_snapshot' in g:
+        return g.catalog_snapshot
+    version = CatalogVersion.current()
+    snapshot = current_app.extensions.get(EXTENSION_KEY)
+    if snapshot is None or snapshot.version != version:
+        with _build_lock:
+            snapshot = current_app.extensions.get(EXTENSION_KEY)
+            if snapshot is None or snapshot.version != version:
+                snapshot = CatalogSnapshot.build()
+                current_app.extensions[EXTENSION_KEY] = snapshot
+    g.catalog_snapshot = snapshot
+    return snapshot
@@ -2,24 +2,126 @@
 Template utilities for the Viber application.
 """
 
-from typing import Any, Dict
-from flask import render_template, session
-from ..models.cart import CartItem
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from flask import Flask, Response, current_app, render_template, session, stream_template
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from ..models.cart import CartSummary
 
-def render_template_with_nav(template_name: str, **context: Dict[str, Any]) -> str:
+# Output by the ``flush`` template variable of a streamed page: everything
+# rendered before it is sent to the client straight away
+FLUSH = Markup('<!--flush-->')
+
+# Pages rendered once by each worker before it accepts traffic
+WARM_UP_PATHS = ('/', '/about', '/contact', '/login', '/products')
+
+def render_template_with_nav(template_name: str, stream: bool = False,
+                             **context: Dict[str, Any]) -> Union[str, Response]:
     """
     Render a template with common navigation context.
     
     Args:
         template_name: Name of the template to render
+        stream: Send the page in chunks as it is rendered. Slow context
+            values should then be callables or generators the template
+            uses after a ``{{ flush }}``, so the page head goes out first.
         **context: Template context variables
         
     Returns:
-        str: Rendered template
+        str: Rendered template, or a streamed response if ``stream`` is set
     """
     # Add cart count to context if user is authenticated
     if session.get('authenticated'):
-        cart_count = CartItem.get_cart_count(session['username'])
-        context['cart_count'] = cart_count
+        context['cart_count'] = CartSummary.get_count(session['username'])
     
-    return render_template(template_name, **context) 
\ No newline at end of file
+    if stream:
+        events = stream_template(template_name, flush=FLUSH, **context)
+        return Response(buffer_stream(events, current_app.config['TEMPLATE_STREAM_BUFFER']),
+                        mimetype='text/html')
+    return render_template(template_name, **context)
+
+def buffer_stream(events: Iterable[str], size: int) -> Iterator[str]:
+    """
+    Join template output into chunks of at least ``size`` characters.
+
+    A flush marker sends the buffered output early, whatever its size.
+
+    Args:
+        events: Template output, as yielded by Jinja
+        size: Minimum chunk size in characters
+
+    Yields:
+        str: Chunks of the page
+    """
+    buffer: List[str] = []
+    buffered = 0
+    for event in events:
+        if event == FLUSH:
+            if buffer:
+                yield ''.join(buffer)
+                buffer, buffered = [], 0
+            continue
+        buffer.append(event)
+        buffered += len(event)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def configure_template_cache(app: Flask) -> None:
+    """
+    Store compiled templates on disk when TEMPLATE_BYTECODE_CACHE is set.
+
+    Workers then load the bytecode written by ``flask templates compile`` or
+    by an earlier worker instead of parsing and compiling each template on
+    its first use. Entries are keyed by the template source checksum, so an
+    edited template is compiled again. Must be called before the Jinja
+    environment is first used.
+
+    Args:
+        app: The Flask application
+    """
+    if app.config['TEMPLATE_BYTECODE_CACHE']:
+        bytecode_cache = make_bytecode_cache(app.config['TEMPLATE_CACHE_DIR'])
+        app.jinja_options = {**app.jinja_options, 'bytecode_cache': bytecode_cache}
+
+def make_bytecode_cache(directory: str) -> FileSystemBytecodeCache:
+    """Create a bytecode cache in a directory, creating the directory if needed."""
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+def compile_templates(app: Flask, directory: Optional[str] = None) -> List[str]:
+    """
+    Compile every template of an application into the bytecode cache.
+
+    Args:
+        app: The Flask application
+        directory: Cache directory (default: TEMPLATE_CACHE_DIR)
+
+    Returns:
+        list: Names of the compiled templates
+    """
+    env = app.jinja_env.overlay(
+        bytecode_cache=make_bytecode_cache(directory or app.config['TEMPLATE_CACHE_DIR']))
+    names = sorted(app.jinja_env.list_templates())
+    for name in names:
+        env.get_template(name)
+    return names
+
+def warm_up(app: Flask, paths: Tuple[str, ...] = WARM_UP_PATHS) -> Dict[str, int]:
+    """
+    Load every template and render pages once, so first requests are not slower.
+
+    Args:
+        app: The Flask application
+        paths: Pages to request
+
+    Returns:
+        dict: Response status of each page
+    """
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    client = app.test_client()
+    return {path: client.get(path, buffered=True).status_code for path in paths}
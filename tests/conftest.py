@@ -2,10 +2,26 @@
 Test configuration and fixtures for the Viber application.
 """
 
+import re
 import pytest
+from contextlib import contextmanager
+from flask.testing import FlaskClient
+from sqlalchemy import event
 from viber import create_app, db
 from viber.models.product import Product
 
+class BufferedClient(FlaskClient):
+    """Test client reading streamed responses in full, as a WSGI server would.
+
+    A streamed response keeps its request context until it is read or closed,
+    so one left unread would leak its context into later tests. Pass
+    ``buffered=False`` to read a response chunk by chunk, and close it.
+    """
+
+    def open(self, *args, **kwargs):
+        kwargs.setdefault('buffered', True)
+        return super().open(*args, **kwargs)
+
 @pytest.fixture
 def app():
     """Create and configure a test Flask application."""
@@ -15,6 +31,7 @@ def app():
         'WTF_CSRF_ENABLED': False,
         'SECRET_KEY': 'test_secret_key'  # Add secret key for sessions
     })
+    app.test_client_class = BufferedClient
     
     with app.app_context():
         # Drop all tables first to ensure clean state
@@ -58,6 +75,47 @@ def runner(app):
     """Create a test CLI runner."""
     return app.test_cli_runner()
 
+@pytest.fixture
+def query_counter(app):
+    """Record the SQL statements executed inside a ``with`` block."""
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def counter():
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    return counter
+
+@pytest.fixture
+def add_products(app):
+    """Add numbered products; a column value may be a function of the product number."""
+    defaults = {'name': lambda i: f'Hat {i}', 'description': 'A hat', 'price': 10.0,
+                'image_url': 'https://test.com/hat.jpg'}
+
+    def add(count, **columns):
+        columns = {**defaults, **columns}
+        with app.app_context():
+            db.session.add_all([
+                Product(**{name: value(i) if callable(value) else value
+                           for name, value in columns.items()})
+                for i in range(count)])
+            db.session.commit()
+
+    return add
+
+@pytest.fixture
+def card_titles():
+    """Get the product card titles of a page in display order."""
+    return lambda html: re.findall(r'<h5 class="card-title">([^<]+)</h5>', html)
+
 @pytest.fixture
 def auth(client):
     """Authentication helper class."""
@@ -0,0 +1,88 @@
+"""
+Tests for the streaming product API.
+"""
+
+import json
+from sqlalchemy import event
+from viber import db
+from viber.models.product import Product
+
+def add_products(app):
+    """Add a few products with distinct prices and colors."""
+    with app.app_context():
+        for i, color in enumerate(['Red', 'Blue', 'Red']):
+            db.session.add(Product(name=f'Shirt {i}', description='A cotton shirt',
+                                   price=10.0 + i, image_url='https://test.com/shirt.jpg',
+                                   color=color, in_stock=i != 1))
+        db.session.commit()
+
+def read_ndjson(response):
+    """Decode a newline delimited JSON response."""
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+def test_api_products_streams_ndjson(app, client):
+    """Test that every product is streamed as one JSON object per line."""
+    add_products(app)
+    response = client.get('/api/products', buffered=False)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    products = read_ndjson(response)
+    response.close()
+    assert [p['id'] for p in products] == [1, 2, 3, 4]
+    with app.app_context():
+        assert products[0] == db.session.get(Product, 1).to_dict()
+
+def test_api_products_filters_and_sort(app, client):
+    """Test that the products page filters and sort options apply."""
+    add_products(app)
+    response = client.get('/api/products?color=Red&sort=price_desc&in_stock=true')
+    assert [p['name'] for p in read_ndjson(response)] == ['Shirt 2', 'Shirt 0']
+    response = client.get('/api/products?q=cotton&fields=id')
+    assert sorted(p['id'] for p in read_ndjson(response)) == [2, 3, 4]
+
+def test_api_products_fields_projection(app, client):
+    """Test that only the requested columns are selected and returned."""
+    statements = []
+    with app.app_context():
+        def record(*args):
+            statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = client.get('/api/products?fields=id,price,in_stock')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert read_ndjson(response) == [{'id': 1, 'price': 29.99, 'in_stock': True}]
+    assert not any('description' in statement for statement in statements)
+
+def test_api_products_json_array(app, client):
+    """Test that the JSON format streams a single array."""
+    add_products(app)
+    response = client.get('/api/products?format=json&fields=id,name')
+    assert response.mimetype == 'application/json'
+    assert [p['id'] for p in json.loads(response.data)] == [1, 2, 3, 4]
+    assert json.loads(client.get('/api/products?format=json&color=Pink').data) == []
+
+def test_api_products_yields_in_batches(app, client):
+    """Test that results are fetched from the cursor in batches."""
+    add_products(app)
+    app.config['API_YIELD_PER'] = 2
+    with app.app_context():
+        options = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            options.append(context.execution_options.get('yield_per'))
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = client.get('/api/products?fields=id')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert len(read_ndjson(response)) == 4
+    assert 2 in options
+
+def test_api_products_rejects_bad_arguments(client):
+    """Test that unknown fields and formats are rejected."""
+    response = client.get('/api/products?fields=id,secret')
+    assert response.status_code == 400
+    assert 'secret' in response.get_json()['error']
+    response = client.get('/api/products?format=xml')
+    assert response.status_code == 400
@@ -65,15 +65,15 @@ class TestApp(unittest.TestCase):
         public_routes = ['/', '/about', '/contact', '/products']
         
         for route in public_routes:
-            # Without login
-            response = self.client.get(route)
+            # Without login (read in full, as /products is streamed)
+            response = self.client.get(route, buffered=True)
             self.assertEqual(response.status_code, 200)
             
             # With login
             with self.client.session_transaction() as sess:
                 sess['authenticated'] = True
                 sess['username'] = 'testuser'
-            response = self.client.get(route)
+            response = self.client.get(route, buffered=True)
             self.assertEqual(response.status_code, 200)
 
     def test_login_redirect_to_next(self):
@@ -3,7 +3,10 @@ Tests for cart functionality.
 """
 
 import json
-from viber.models.cart import CartItem
+import pytest
+from sqlalchemy.exc import IntegrityError
+from viber import db
+from viber.models.cart import CartItem, CartSummary
 from viber.models.product import Product
 
 def test_add_to_cart(auth, client, app):
@@ -198,4 +201,225 @@ def test_cart_isolation_between_users(auth, client, app):
         assert len(user2_items) == 1, "User2 should have 1 item"
         assert user1_items[0].product_id == product.id
         assert user2_items[0].product_id == product.id
-        assert user1_items[0].id != user2_items[0].id 
\ No newline at end of file
+        assert user1_items[0].id != user2_items[0].id 
+
+
+def fill_cart(app, username, count):
+    """Add ``count`` new products to a user's cart, two of each."""
+    with app.app_context():
+        for i in range(count):
+            product = Product(name=f'Cap {i}', description='A cap', price=10.0 + i,
+                              image_url='https://test.com/cap.jpg')
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(CartItem(session_id=username, product_id=product.id, quantity=2))
+        db.session.commit()
+
+def test_cart_totals(app):
+    """Test that cart count and total are computed in SQL."""
+    fill_cart(app, 'testuser', 3)
+    with app.app_context():
+        assert CartItem.get_cart_totals('testuser') == (6, 2 * (10.0 + 11.0 + 12.0))
+        assert CartItem.get_cart_count('testuser') == 6
+        assert CartItem.get_cart_totals('nobody') == (0, 0.0)
+        assert CartItem.get_cart_count('nobody') == 0
+
+def test_view_cart_query_count(auth, client, app, query_counter):
+    """Test that the cart page runs the same number of queries for any cart size."""
+    auth.login()
+    fill_cart(app, 'testuser', 1)
+    with query_counter() as small:
+        response = client.get('/cart')
+    assert response.status_code == 200
+
+    fill_cart(app, 'testuser', 39)
+    with query_counter() as large:
+        response = client.get('/cart')
+    assert response.data.count(b'<tr data-item-id') == 40
+    with app.app_context():
+        _, total = CartItem.get_cart_totals('testuser')
+    assert f'${total:.2f}'.encode() in response.data
+    assert len(large) == len(small)
+
+def test_add_to_cart_upserts_one_row(auth, client, app, query_counter):
+    """Test that repeated adds increment a single row and read the count by key."""
+    auth.login()
+    client.post('/cart/add/1')
+    with query_counter() as statements:
+        response = client.post('/cart/add/1')
+    data = response.get_json()
+    assert data['quantity'] == 2
+    assert data['cart_count'] == 2
+    assert [statement.split('\n')[0][:26] for statement in statements] == [
+        'INSERT INTO cart_items (se', 'INSERT INTO cart_summaries', 'SELECT cart_summaries.item']
+    with app.app_context():
+        assert CartItem.query.count() == 1
+
+def test_add_missing_product_to_cart(auth, client, app):
+    """Test that adding an unknown product is a 404 and leaves the cart unchanged."""
+    auth.login()
+    assert client.post('/cart/add/999').status_code == 404
+    with app.app_context():
+        assert CartItem.query.count() == 0
+
+def test_cart_rejects_duplicate_rows(app):
+    """Test that a product can only appear once per cart."""
+    with app.app_context():
+        db.session.add_all([CartItem(session_id='user1', product_id=1),
+                            CartItem(session_id='user1', product_id=1)])
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+
+def assert_summaries_consistent(app):
+    """Check every cart summary against an aggregate of its cart items."""
+    with app.app_context():
+        for summary in CartSummary.query.all():
+            count, total = CartItem.get_cart_totals(summary.session_id)
+            assert summary.item_count == count == CartItem.get_cart_count(summary.session_id)
+            assert summary.total == pytest.approx(total)
+
+def test_cart_summary_consistency(auth, client, app):
+    """Test that the cart summary follows every kind of cart change."""
+    fill_cart(app, 'other', 2)
+    auth.login()
+    client.post('/cart/add/1')
+    client.post('/cart/add/2')
+    client.post('/cart/add/1')
+    with app.app_context():
+        assert CartSummary.get_count('testuser') == 3
+        item = CartItem.query.filter_by(session_id='testuser', product_id=2).one()
+    assert_summaries_consistent(app)
+
+    client.post(f'/cart/update/{item.id}', json={'quantity': 5})
+    with app.app_context():
+        assert CartSummary.get_count('testuser') == 7
+    assert_summaries_consistent(app)
+
+    # Price changes move the totals of every cart holding the product
+    with app.app_context():
+        db.session.get(Product, 2).price = 1.0
+        db.session.commit()
+        assert db.session.get(CartSummary, 'testuser').total == pytest.approx(2 * 29.99 + 5 * 1.0)
+        Product.query.filter(Product.id == 2).update({'price': 2.0})
+        db.session.commit()
+        assert db.session.get(CartSummary, 'testuser').total == pytest.approx(2 * 29.99 + 5 * 2.0)
+    assert_summaries_consistent(app)
+
+    client.post(f'/cart/remove/{item.id}')
+    assert_summaries_consistent(app)
+    auth.logout(clear_cart=True)
+    with app.app_context():
+        assert CartSummary.get_count('testuser') == 0
+        assert CartSummary.get_count('other') == 4
+    assert_summaries_consistent(app)
+
+def test_nav_cart_count_skips_cart_items(auth, client, query_counter):
+    """Test that the navigation badge is read from the cart summary."""
+    auth.login()
+    client.post('/cart/add/1')
+    client.post('/cart/add/1')
+    with query_counter() as statements:
+        response = client.get('/about')
+    assert b'<span class="badge bg-primary">2</span>' in response.data
+    assert not any('cart_items' in statement for statement in statements)
+
+def test_cart_batch(auth, client, app):
+    """Test that a batch of cart operations is applied and summarised."""
+    fill_cart(app, 'testuser', 3)
+    auth.login()
+    with app.app_context():
+        first, second, third = [item.id for item in CartItem.get_cart_items('testuser')]
+    response = client.post('/cart/batch', json=[
+        {'op': 'update', 'item_id': first, 'quantity': 5},
+        {'op': 'remove', 'item_id': second},
+        {'op': 'update', 'item_id': third, 'quantity': 0},
+        {'op': 'add', 'product_id': 1, 'quantity': 2},
+    ])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['cart_count'] == 7
+    assert data['total'] == pytest.approx(5 * 10.0 + 2 * 29.99)
+    with app.app_context():
+        added = CartItem.query.filter_by(session_id='testuser', product_id=1).one().id
+    assert [(item['id'], item['quantity']) for item in data['items']] == [
+        (first, 5), (added, 2)]
+    assert_summaries_consistent(app)
+
+def test_cart_batch_applies_operations_in_order(auth, client, app):
+    """Test that adds see the updates and removals made earlier in the batch."""
+    auth.login()
+    client.post('/cart/add/1')
+    with app.app_context():
+        item_id = CartItem.query.filter_by(session_id='testuser').one().id
+
+    response = client.post('/cart/batch', json=[
+        {'op': 'update', 'item_id': item_id, 'quantity': 3},
+        {'op': 'add', 'product_id': 1},
+    ])
+    assert response.status_code == 200
+    assert response.get_json()['cart_count'] == 4
+
+    response = client.post('/cart/batch', json=[
+        {'op': 'remove', 'item_id': item_id},
+        {'op': 'add', 'product_id': 1, 'quantity': 2},
+    ])
+    assert response.status_code == 200
+    assert response.get_json()['cart_count'] == 2
+    with app.app_context():
+        assert [(item.product_id, item.quantity)
+                for item in CartItem.get_cart_items('testuser')] == [(1, 2)]
+    assert_summaries_consistent(app)
+
+def test_cart_batch_is_atomic(auth, client, app):
+    """Test that a batch with a failing operation changes nothing."""
+    fill_cart(app, 'testuser', 1)
+    fill_cart(app, 'other', 1)
+    auth.login()
+    with app.app_context():
+        mine = CartItem.query.filter_by(session_id='testuser').one().id
+        theirs = CartItem.query.filter_by(session_id='other').one().id
+
+    response = client.post('/cart/batch', json=[
+        {'op': 'update', 'item_id': mine, 'quantity': 9},
+        {'op': 'add', 'product_id': 999},
+    ])
+    assert response.status_code == 404
+    response = client.post('/cart/batch', json=[
+        {'op': 'remove', 'item_id': mine},
+        {'op': 'update', 'item_id': theirs, 'quantity': 9},
+    ])
+    assert response.status_code == 403
+    assert client.post('/cart/batch', json=[{'op': 'remove', 'item_id': 999}]).status_code == 404
+    with app.app_context():
+        assert [(item.id, item.quantity) for item in CartItem.query.order_by(CartItem.id)] == [
+            (mine, 2), (theirs, 2)]
+    assert_summaries_consistent(app)
+
+def test_cart_batch_rejects_invalid_operations(auth, client):
+    """Test that malformed batches are rejected."""
+    auth.login()
+    for body in [{'op': 'add'}, [], [{'op': 'clear'}], [{'op': 'add', 'product_id': '1'}],
+                 [{'op': 'update', 'item_id': 1}], [{'op': 'add', 'product_id': 1, 'quantity': 0}],
+                 [{'op': 'add', 'product_id': True, 'quantity': True}],
+                 [{'op': 'add', 'product_id': 1, 'quantity': True}],
+                 [{'op': 'remove', 'item_id': True}],
+                 [{'op': 'update', 'item_id': 1, 'quantity': False}]]:
+        response = client.post('/cart/batch', json=body)
+        assert response.status_code == 400, body
+        assert 'error' in response.get_json()
+
+def test_add_to_cart_returns_nav_fragment(auth, client, query_counter):
+    """Test that add-to-cart returns what the page needs to update in place."""
+    auth.login()
+    client.post('/cart/add/1')
+    with query_counter() as statements:
+        response = client.post('/cart/add/1?nav=1')
+    data = response.get_json()
+    assert data['product_id'] == 1
+    assert data['quantity'] == 2
+    assert data['cart_count'] == 2
+    assert '<span class="badge bg-primary">2</span>' in data['nav']
+    assert 'href="/cart"' in data['nav']
+    assert not any(statement.startswith('SELECT') and 'FROM products' in statement
+               for statement in statements)
+    assert 'nav' not in client.post('/cart/add/1').get_json()
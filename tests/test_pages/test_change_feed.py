@@ -0,0 +1,224 @@
+"""
+Tests for the product change log and the per-process change feed.
+"""
+
+import multiprocessing
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from viber import create_app, db
+from viber.init_db import seed_products
+from viber.models.catalog import CatalogVersion, ProductChange
+from viber.models.product import Product
+from viber.utils.catalog_io import import_products
+from viber.utils.change_feed import ChangeFeed, get_change_feed
+from viber.utils.facet_index import INDEX_COLUMNS, get_facet_index
+
+def new_product(name, **values):
+    """Build a product with the required columns set."""
+    return Product(name=name, description='A product', price=values.pop('price', 10.0),
+                   image_url='https://test.com/product.jpg', **values)
+
+def test_orm_writes_are_logged(app):
+    """Test that inserts, updates and deletes are logged in their own transaction."""
+    with app.app_context():
+        start = ProductChange.latest()
+        product = new_product('Scarf')
+        db.session.add(product)
+        db.session.commit()
+        product.price = 12.0
+        db.session.commit()
+        db.session.delete(product)
+        db.session.commit()
+
+        product = db.session.get(Product, 1)
+        product.price = 1.0
+        db.session.flush()
+        db.session.rollback()
+
+        changes = [(product_id, operation)
+                   for _, product_id, operation in ProductChange.since(start)]
+        assert changes == [(2, 'upsert'), (2, 'upsert'), (2, 'delete')]
+
+def test_orm_bulk_writes_are_logged(app):
+    """Test that ORM bulk updates and deletes bump the version and log their products."""
+    with app.app_context():
+        db.session.add_all([new_product('Scarf'), new_product('Gloves')])
+        db.session.commit()
+        version = CatalogVersion.current()
+        start = ProductChange.latest()
+
+        Product.query.filter(Product.name == 'Scarf').update({'price': 11.0})
+        db.session.execute(update(Product).where(Product.id == 3).values(price=12.0))
+        db.session.execute(update(Product), [{'id': 1, 'price': 13.0}])
+        Product.query.filter(Product.name == 'Nothing').update({'price': 1.0})
+        Product.query.filter(Product.id > 1).delete()
+        db.session.commit()
+
+        assert CatalogVersion.current() == version + 4
+        changes = [(product_id, operation)
+                   for _, product_id, operation in ProductChange.since(start)]
+        assert changes == [(2, 'upsert'), (3, 'upsert'), (1, 'upsert'),
+                           (2, 'delete'), (3, 'delete')]
+
+def test_bulk_writers_log_changes(app):
+    """Test that the seeder logs a reset and the importer logs each product."""
+    with app.app_context():
+        start = ProductChange.latest()
+        seed_products(3, seed=1)
+        assert [row[1:] for row in ProductChange.since(start)] == [(None, 'reset')]
+
+        start = ProductChange.latest()
+        rows = [(1, {'sku': 'SKU1', 'name': 'Imported', 'description': 'Imported',
+                     'price': '5', 'image_url': 'https://test.com/product.jpg'})]
+        import_products(rows)
+        import_products(rows)  # Unchanged the second time
+        assert [row[1:] for row in ProductChange.since(start)] == [(5, 'upsert')]
+
+def test_feed_merges_changes(app):
+    """Test that a poll delivers each product once with its latest operation."""
+    with app.app_context():
+        feed = ChangeFeed(interval=0)
+        received = []
+        feed.subscribe(lambda upserted, deleted, reset: received.append(
+            (sorted(upserted), sorted(deleted), reset)))
+        assert feed.poll() == 0
+
+        connection = db.session.connection()
+        ProductChange.record(connection, ProductChange.UPSERT, [1, 2, 3])
+        ProductChange.record(connection, ProductChange.DELETE, [2])
+        ProductChange.record(connection, ProductChange.UPSERT, [4])
+        ProductChange.record(connection, ProductChange.DELETE, [4])
+        db.session.commit()
+        assert feed.poll() == 6
+        assert received == [([1, 3], [2, 4], False)]
+        assert feed.watermark == ProductChange.latest()
+        assert feed.poll() == 0 and len(received) == 1
+
+def test_feed_interval_and_failures(app):
+    """Test that polls are throttled and a failing subscriber gets the changes again."""
+    with app.app_context():
+        feed = ChangeFeed(interval=3600)
+        failures = [RuntimeError('cache unavailable')]
+        received = []
+
+        def subscriber(upserted, deleted, reset):
+            if failures:
+                raise failures.pop()
+            received.append(sorted(upserted))
+
+        feed.subscribe(subscriber)
+        ProductChange.record(db.session.connection(), ProductChange.UPSERT, [1])
+        db.session.commit()
+        with pytest.raises(RuntimeError):
+            feed.poll()
+        assert feed.poll() == 0  # Within the interval
+        assert feed.poll(force=True) == 1
+        assert received == [[1]]
+
+def test_feed_resets_after_pruned_changes(app):
+    """Test that a reader whose changes were pruned is told to reload everything."""
+    with app.app_context():
+        feed = ChangeFeed(interval=0)
+        received = []
+        feed.subscribe(lambda upserted, deleted, reset: received.append(reset))
+        connection = db.session.connection()
+        ProductChange.record(connection, ProductChange.UPSERT, [1])
+        db.session.commit()
+        ProductChange.prune(db.session.connection(), datetime.utcnow() + timedelta(days=1))
+        ProductChange.record(db.session.connection(), ProductChange.UPSERT, [1])
+        db.session.commit()
+        assert feed.poll() == 1
+        assert received == [True]
+
+def test_prune_changes_command(app, runner):
+    """Test that old changes are pruned and recent ones kept."""
+    with app.app_context():
+        ProductChange.record(db.session.connection(), ProductChange.UPSERT, [1, 1])
+        db.session.commit()
+    result = runner.invoke(args=['catalog', 'prune-changes', '--days', '1'])
+    assert 'Pruned 0 product changes.' in result.output
+    result = runner.invoke(args=['catalog', 'prune-changes', '--days', '0'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert ProductChange.since(0) == []
+
+def update_catalog(uri, price, deleted_id, new_name):
+    """Change the catalog from a separate process, as another worker would."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'DATABASE_PROFILE': 'production'})
+    with app.app_context():
+        product = db.session.get(Product, 1)
+        product.price = price
+        product.color = 'Red'
+        db.session.delete(db.session.get(Product, deleted_id))
+        db.session.add(new_product(new_name, color='Red'))
+        db.session.commit()
+
+def update_prices(uri, product_ids, rounds):
+    """Reprice products repeatedly from a separate process."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'DATABASE_PROFILE': 'production'})
+    with app.app_context():
+        for i in range(rounds):
+            for product_id in product_ids:
+                db.session.get(Product, product_id).price = float(i)
+            db.session.commit()
+
+@pytest.fixture
+def file_app(tmp_path):
+    """Create an application on a database file with the facet index enabled."""
+    uri = f'sqlite:///{tmp_path / "viber.db"}'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'DATABASE_PROFILE': 'production',
+                      'CATALOG_FACET_INDEX': True, 'PRODUCT_GRID_CACHE_BYTES': 0,
+                      'PRODUCT_CHANGE_POLL_INTERVAL': 0})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([new_product(f'Hat {i}', color='Black', price=20.0)
+                            for i in range(8)])
+        db.session.commit()
+    return app, uri
+
+def run_processes(target, args_list):
+    """Run a function in spawned processes and wait for them to succeed."""
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=target, args=args) for args in args_list]
+    for process in processes:
+        process.start()
+    return processes
+
+def test_other_process_changes_reach_facet_index(file_app):
+    """Test that changes committed by another process are applied to this process's index."""
+    app, uri = file_app
+    client = app.test_client()
+    assert b'Hat 0' not in client.get('/products?color=Red').data  # Builds the index
+
+    processes = run_processes(update_catalog, [(uri, 55.0, 2, 'Red Scarf')])
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    html = client.get('/products?color=Red').data
+    assert b'Hat 0' in html and b'$55.00' in html
+    assert b'Red Scarf' in html
+    assert b'Hat 1' not in client.get('/products?color=Black').data
+    with app.app_context():
+        assert len(get_facet_index()) == 8
+
+def test_concurrent_updates_converge(file_app):
+    """Test that polling while other processes write leaves the index matching the database."""
+    app, uri = file_app
+    with app.app_context():
+        index = get_facet_index()
+        feed = get_change_feed()
+        processes = run_processes(update_prices, [(uri, [1, 2, 3, 4], 15), (uri, [5, 6], 15)])
+        while any(process.is_alive() for process in processes):
+            feed.poll(force=True)
+        for process in processes:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+        feed.poll(force=True)
+
+        prices = {product.id: product.price for product in Product.query}
+        assert prices[1] == 14.0 and prices[5] == 14.0
+        price = INDEX_COLUMNS.index('price')
+        assert {product_id: index.rows[position][price]
+                for product_id, position in index.positions.items()} == prices
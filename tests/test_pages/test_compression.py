@@ -0,0 +1,112 @@
+"""
+Tests for response compression.
+"""
+
+import gzip
+import zlib
+import pytest
+from viber import db
+from viber.models.product import Product
+from viber.utils.compression import get_compression_stats
+
+GZIP = {'Accept-Encoding': 'gzip, deflate'}
+
+@pytest.fixture
+def catalog(app):
+    """Add enough products for a products page worth compressing."""
+    with app.app_context():
+        db.session.add_all([
+            Product(name=f'Cotton Shirt {i}', description='A soft cotton shirt', price=20.0 + i,
+                    image_url='https://test.com/shirt.jpg', color='Blue')
+            for i in range(20)])
+        db.session.commit()
+    return app
+
+def test_products_page_gzipped(catalog, client):
+    """Test that the products page is gzipped for clients accepting it."""
+    plain = client.get('/products')
+    response = client.get('/products', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary and 'Accept-Encoding' in plain.vary
+    assert 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(response.data) == plain.data
+    assert len(response.data) < len(plain.data)
+    with catalog.app_context():
+        stats = get_compression_stats().stats()
+    assert stats['responses'] == 1
+    assert stats['bytes_saved'] == len(plain.data) - len(response.data)
+
+def test_revalidation_with_weak_etag(catalog, client):
+    """Test that the weakened entity tag of a compressed page still revalidates."""
+    response = client.get('/products', headers=GZIP)
+    etag, weak = response.get_etag()
+    assert weak
+    response = client.get('/products', headers={**GZIP, 'If-None-Match': f'W/"{etag}"'})
+    assert response.status_code == 304
+
+def test_client_preference_honored(catalog, client):
+    """Test that the encoding the client prefers is used, and none when refused."""
+    plain = client.get('/products').data
+    response = client.get('/products', headers={'Accept-Encoding': 'gzip;q=0.5, deflate'})
+    assert response.headers['Content-Encoding'] == 'deflate'
+    assert zlib.decompress(response.data) == plain
+    response = client.get('/products', headers={'Accept-Encoding': 'identity, gzip;q=0'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_compression_level(catalog, client):
+    """Test that a higher level gives a smaller body."""
+    catalog.config['COMPRESSION_LEVEL'] = 1
+    fast = client.get('/products', headers=GZIP).data
+    catalog.config['COMPRESSION_LEVEL'] = 9
+    small = client.get('/products', headers=GZIP).data
+    assert len(small) < len(fast)
+    assert gzip.decompress(small) == gzip.decompress(fast)
+
+def test_small_and_disabled_responses_not_compressed(catalog, client):
+    """Test the size threshold and the switch."""
+    catalog.config['STREAM_PRODUCT_PAGES'] = False  # The size of streamed pages is unknown
+    assert client.get('/products', headers=GZIP).headers['Content-Encoding'] == 'gzip'
+    catalog.config['COMPRESSION_MIN_SIZE'] = 10 ** 7
+    assert 'Content-Encoding' not in client.get('/products', headers=GZIP).headers
+    catalog.config['COMPRESSION_MIN_SIZE'] = 0
+    catalog.config['RESPONSE_COMPRESSION'] = False
+    assert 'Content-Encoding' not in client.get('/products', headers=GZIP).headers
+
+def test_streamed_api_compressed(catalog, client):
+    """Test that streamed JSON is compressed chunk by chunk."""
+    plain = client.get('/api/products').data
+    response = client.get('/api/products', headers=GZIP, buffered=False)
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data) == plain
+    response.close()
+
+def test_streamed_rows_compressed_in_blocks(app, client):
+    """Test that small streamed rows are gathered into blocks, not flushed one by one."""
+    with app.app_context():
+        db.session.add_all([
+            Product(name=f'Cotton Shirt {i}', description='A soft cotton shirt', price=20.0 + i,
+                    image_url='https://test.com/shirt.jpg')
+            for i in range(2000)])
+        db.session.commit()
+    url = '/api/products?fields=id,price,in_stock'
+    plain = client.get(url).data
+    response = client.get(url, headers=GZIP, buffered=False)
+    chunks = list(response.response)
+    response.close()
+    assert gzip.decompress(b''.join(chunks)) == plain
+    assert len(plain) > 2 * app.config['COMPRESSION_STREAM_FLUSH']
+    assert 1 < len([chunk for chunk in chunks if chunk]) < len(plain) // 8192 + 3
+    assert len(b''.join(chunks)) < 1.1 * len(gzip.compress(plain, 6))
+
+def test_encoded_and_static_responses_untouched(client):
+    """Test that precompressed pages are not compressed twice and files are sent as they are."""
+    plain = client.get('/about').data
+    response = client.get('/about', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == plain
+    assert response.get_etag()[1]
+    response = client.get('/static/css/style.css', headers=GZIP)
+    assert 'Content-Encoding' not in response.headers
+    response.close()
@@ -0,0 +1,87 @@
+"""
+Tests for conditional GET on catalog and content pages.
+"""
+
+import pytest
+from sqlalchemy import event
+from viber import db
+from viber.models.product import Product
+
+def test_products_not_modified(app, client):
+    """Test that a revalidated products page is answered before querying products."""
+    response = client.get('/products?color=Black')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.last_modified is not None
+    assert response.cache_control.public
+    assert response.cache_control.no_cache
+
+    statements = []
+    with app.app_context():
+        def record(*args):
+            statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = client.get('/products?color=Black', headers={'If-None-Match': etag})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert set(response.vary) == set(client.get('/products?color=Black').vary)
+    assert not any('FROM products' in statement for statement in statements)
+
+def test_products_if_modified_since(client):
+    """Test that If-Modified-Since is honoured without an entity tag."""
+    response = client.get('/products')
+    headers = {'If-Modified-Since': response.headers['Last-Modified']}
+    assert client.get('/products', headers=headers).status_code == 304
+
+def test_products_etag_changes_with_catalog(app, client):
+    """Test that changing a product invalidates the products page."""
+    etag = client.get('/products').headers['ETag']
+    with app.app_context():
+        Product.query.first().price = 19.99
+        db.session.commit()
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert b'$19.99' in response.data
+
+@pytest.mark.parametrize('url', ['/', '/about', '/contact', '/products/facets'])
+def test_pages_not_modified(client, url):
+    """Test that content pages answer revalidation with 304."""
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'Cookie' in response.vary
+    vary = set(response.vary)
+    response = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert set(response.vary) == vary
+
+def test_personalised_pages_are_private(client, auth):
+    """Test that logged-in pages are private and track the cart count."""
+    anonymous = client.get('/products').headers['ETag']
+    auth.login()
+    response = client.get('/products')
+    etag = response.headers['ETag']
+    assert etag != anonymous
+    assert response.cache_control.private
+    assert not response.cache_control.public
+    assert response.last_modified is None
+    assert client.get('/products', headers={'If-None-Match': anonymous}).status_code == 200
+    assert client.get('/products', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/cart/add/1')
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_pending_flashes_render_page(client):
+    """Test that pages with pending flash messages are always rendered."""
+    etag = client.get('/').headers['ETag']
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('success', 'Welcome back')]
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Welcome back' in response.data
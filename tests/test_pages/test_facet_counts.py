@@ -0,0 +1,104 @@
+"""
+Tests for product facet counts.
+"""
+
+import json
+import random
+import re
+from sqlalchemy import event
+from viber import db
+from viber.models.product import Product, CATEGORIES, COLORS, SIZES
+from viber.utils.catalog import FACETS, FACET_VALUES, apply_filters, facet_counts
+from viber.utils.facet_index import FacetIndex
+
+def add_products(app, count, seed=3):
+    """Add products with random facet values."""
+    rng = random.Random(seed)
+    with app.app_context():
+        for i in range(count):
+            db.session.add(Product(
+                name=f'Hat {i}',
+                description='A hat',
+                price=float(rng.randint(10, 30)),
+                image_url='https://test.com/hat.jpg',
+                category=rng.choice(CATEGORIES[:4]),
+                size=rng.choice(SIZES),
+                color=rng.choice(COLORS[:5]),
+                in_stock=rng.random() < 0.6
+            ))
+        db.session.commit()
+
+def expected_counts(selected_filters):
+    """Count facet values the slow way, one query per value."""
+    counts = {}
+    for facet in FACETS:
+        counts[facet] = {}
+        for value in FACET_VALUES[facet]:
+            filters = dict(selected_filters, **{facet: [value]})
+            counts[facet][value] = apply_filters(Product.query, filters).count()
+    return counts, apply_filters(Product.query, selected_filters).count()
+
+FILTER_SETS = [
+    {},
+    {'color': ['Black']},
+    {'color': ['Black', 'White'], 'size': ['M']},
+    {'category': ['Shirts'], 'in_stock': True, 'min_price': 15.0},
+    {'size': ['XS', 'XL'], 'max_price': 20.0, 'color': ['Navy']},
+]
+
+def test_counts_exclude_own_selection(app):
+    """Test that each facet is counted with all other filters applied."""
+    add_products(app, 80)
+    with app.app_context():
+        for selected_filters in FILTER_SETS:
+            assert facet_counts(selected_filters) == expected_counts(selected_filters)
+
+def test_counts_use_a_single_query(app):
+    """Test that all facet counts come from one statement."""
+    statements = []
+    with app.app_context():
+        def record(*args):
+            statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            facet_counts({'color': ['Black'], 'in_stock': True})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert len(statements) == 1
+
+def test_index_counts_match_sql(app):
+    """Test that bitmap facet counts agree with the SQL aggregate."""
+    add_products(app, 80)
+    with app.app_context():
+        index = FacetIndex()
+        index.rebuild()
+        for selected_filters in FILTER_SETS:
+            assert index.facet_counts(selected_filters) == facet_counts(selected_filters)
+
+def test_products_page_shows_counts(client):
+    """Test that the page carries the counts for a placeholder next to each filter value."""
+    response = client.get('/products?size=L')
+    data = response.data.decode()
+    assert response.status_code == 200
+    assert '<span class="text-muted facet-count" data-facet="size" data-value="M"></span>' in data
+    assert data.count('class="text-muted facet-count"') == \
+        sum(len(values) for values in FACET_VALUES.values())
+    counts = re.search(r'<script id="facet-counts" type="application/json">(.*?)</script>', data)
+    assert json.loads(counts.group(1))['size']['M'] == 1
+
+def test_products_page_counts_can_be_disabled(app, client):
+    """Test that counts are not computed when disabled."""
+    app.config['PRODUCT_FACET_COUNTS'] = False
+    response = client.get('/products')
+    assert b'facet-count' not in response.data
+
+def test_facets_endpoint(client):
+    """Test the JSON facet count endpoint."""
+    response = client.get('/products/facets?color=Red')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == 0
+    assert data['facets']['color']['Black'] == 1
+    assert data['facets']['color']['Red'] == 0
+    assert data['facets']['size']['M'] == 0
+    assert set(data['facets']) == set(FACETS)
@@ -0,0 +1,180 @@
+"""
+Tests for the in-memory bitmap facet index.
+"""
+
+import random
+import sys
+import threading
+import time
+import pytest
+from viber import db
+from viber.models.product import Product, CATEGORIES, STYLES, SIZES, COLORS, GENDERS, SEASONS
+from viber.utils.catalog import SORT_OPTIONS, apply_filters
+from viber.utils.facet_index import FacetIndex, get_facet_index
+from viber.utils.pagination import keyset_paginate
+
+def add_random_products(app, count, seed=7):
+    """Add products with random attributes."""
+    rng = random.Random(seed)
+    with app.app_context():
+        for i in range(count):
+            db.session.add(Product(
+                name=f'Hat {rng.randint(0, 9)}',
+                description='A hat',
+                price=float(rng.randint(10, 30)),
+                image_url='https://test.com/hat.jpg',
+                category=rng.choice(CATEGORIES[:3]),
+                style=rng.choice(STYLES[:3]),
+                size=rng.choice(SIZES),
+                color=rng.choice(COLORS[:4]),
+                gender=rng.choice(GENDERS),
+                season=rng.choice(SEASONS),
+                in_stock=rng.random() < 0.7
+            ))
+        db.session.commit()
+
+def random_filters(rng):
+    """Build a random filter selection."""
+    filters = {
+        'category': rng.sample(CATEGORIES[:3], rng.randint(0, 2)),
+        'style': rng.sample(STYLES[:3], rng.randint(0, 1)),
+        'size': rng.sample(SIZES, rng.randint(0, 3)),
+        'color': rng.sample(COLORS[:4], rng.randint(0, 2)),
+        'gender': rng.sample(GENDERS, rng.randint(0, 1)),
+        'season': [],
+        'min_price': rng.choice([None, 15.0]),
+        'max_price': rng.choice([None, 25.0]),
+        'in_stock': rng.random() < 0.5
+    }
+    return filters
+
+def all_pages(fetch):
+    """Follow next cursors and return every page of ids."""
+    pages = [fetch(None)]
+    while pages[-1].has_next:
+        pages.append(fetch(pages[-1].next_cursor))
+    return [[p.id for p in page] for page in pages]
+
+@pytest.mark.parametrize('sort', [sort for sort in SORT_OPTIONS if sort != 'relevance'])
+def test_index_matches_sql(app, sort):
+    """Test that the index returns the same pages as the SQL query."""
+    add_random_products(app, 120)
+    rng = random.Random(sort)
+    with app.app_context():
+        index = FacetIndex()
+        index.rebuild()
+        assert len(index) == 121
+        for _ in range(15):
+            filters = random_filters(rng)
+            query = apply_filters(Product.query, filters)
+            expected = all_pages(lambda cursor: keyset_paginate(query, sort, 7, after=cursor))
+            actual = all_pages(lambda cursor: index.page(filters, sort, 7, after=cursor))
+            assert actual == expected, filters
+
+def test_index_pages_backwards(app):
+    """Test that prev cursors from the index walk back over the same pages."""
+    add_random_products(app, 40)
+    with app.app_context():
+        index = FacetIndex()
+        index.rebuild()
+        filters = {'in_stock': True}
+        last = index.page(filters, 'name_desc', 5)
+        while last.has_next:
+            last = index.page(filters, 'name_desc', 5, after=last.next_cursor)
+        first = last
+        while first.has_prev:
+            previous = index.page(filters, 'name_desc', 5, before=first.prev_cursor)
+            assert previous.has_next
+            first = previous
+        assert [p.id for p in first] == [p.id for p in index.page(filters, 'name_desc', 5)]
+
+def test_pages_consistent_during_writes():
+    """Test that pages walked while another thread patches the index never see half a change."""
+    rng = random.Random(3)
+    rows = [(product_id, rng.choice(CATEGORIES), STYLES[0], SIZES[0], COLORS[0], GENDERS[0],
+             SEASONS[0], float(rng.randint(10, 99)), f'Hat {product_id}', True)
+            for product_id in range(1, 20001)]
+    index = FacetIndex()
+    index.load(rows)
+    stop = threading.Event()
+
+    def patch():
+        while not stop.is_set():
+            changed = rng.sample(rows, 50)
+            index.remove(row[0] for row in changed)
+            index.upsert(changed)
+
+    writer = threading.Thread(target=patch)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)  # Switch threads often, mid-walk
+    writer.start()
+    try:
+        deadline = time.perf_counter() + 0.5
+        while time.perf_counter() < deadline:
+            ids = index.paginate({'category': [CATEGORIES[0]], 'min_price': 98.0},
+                                 'name_asc', 50)[0]
+            assert None not in ids
+    finally:
+        stop.set()
+        writer.join()
+        sys.setswitchinterval(interval)
+
+def test_index_patched_on_commit(app):
+    """Test that committed product changes update the index incrementally."""
+    app.config['CATALOG_FACET_INDEX'] = True
+    with app.app_context():
+        index = get_facet_index()
+        product = Product.query.first()
+        assert index.paginate({'color': ['Black']}, 'featured', 10)[0] == [product.id]
+
+        # Update
+        product.color = 'Red'
+        db.session.commit()
+        assert index.paginate({'color': ['Black']}, 'featured', 10)[0] == []
+        assert index.paginate({'color': ['Red']}, 'featured', 10)[0] == [product.id]
+
+        # Insert
+        new_product = Product(name='New Hat', description='New', price=5.0,
+                              image_url='https://test.com/new.jpg', color='Red')
+        db.session.add(new_product)
+        db.session.commit()
+        ids = index.paginate({'color': ['Red']}, 'price_asc', 10)[0]
+        assert ids == [new_product.id, product.id]
+
+        # Rolled back changes are ignored
+        new_product.color = 'Blue'
+        db.session.flush()
+        db.session.rollback()
+        assert index.paginate({'color': ['Blue']}, 'featured', 10)[0] == []
+
+        # Delete
+        db.session.delete(new_product)
+        db.session.commit()
+        assert index.paginate({}, 'featured', 10)[0] == [product.id]
+
+def test_products_page_uses_index(app, client):
+    """Test that the products page serves results from the index when enabled."""
+    add_random_products(app, 30)
+    app.config['CATALOG_FACET_INDEX'] = True
+    response = client.get('/products?color=Black&sort=price_asc')
+    assert response.status_code == 200
+    with app.app_context():
+        index = app.extensions['viber.facet_index']
+        expected = Product.query.filter_by(color='Black').count()
+        assert index.paginate({'color': ['Black']}, 'featured', 100)[0]
+    assert response.data.decode().count('card-title') == min(expected, 24)
+
+def test_non_finite_prices_ignored(app, client):
+    """Test that nan and infinite price bounds are ignored by both the database and the index."""
+    add_random_products(app, 30)
+    pages = {}
+    for use_index in (False, True):
+        app.config['CATALOG_FACET_INDEX'] = use_index
+        for query in ('', 'min_price=nan', 'max_price=nan', 'min_price=-inf&max_price=inf'):
+            pages[use_index, query] = client.get(f'/products?{query}').data.count(b'card-title')
+    assert set(pages.values()) == {24}
+
+def test_index_disabled_by_default(app):
+    """Test that the index is not built unless enabled."""
+    with app.app_context():
+        assert get_facet_index() is None
@@ -0,0 +1,138 @@
+"""
+Tests for the product grid fragment cache and the catalog version.
+"""
+
+import re
+from sqlalchemy import event
+from viber import db
+from viber.models.cart import CartItem
+from viber.models.catalog import CatalogVersion
+from viber.models.product import Product
+from viber.utils.cache import LRUCache
+from viber.utils.product_grid import filters_key, split_fragment
+
+def test_lru_cache_evicts_by_size():
+    """Test that the cache stays within its byte cap, evicting the oldest values."""
+    cache = LRUCache(max_bytes=10)
+    cache.set('a', 'aaaa', 4)
+    cache.set('b', 'bbbb', 4)
+    assert cache.get('a') == 'aaaa'  # a is now the most recently used
+    cache.set('c', 'cccc', 4)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaaa'
+    cache.set('huge', 'x' * 11, 11)
+    assert cache.get('huge') is None
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'evictions': 1,
+                             'entries': 2, 'bytes': 8, 'max_bytes': 10}
+
+def test_filters_key_is_order_insensitive():
+    """Test that equivalent filter selections share a cache key."""
+    first = {'color': ['Red', 'Black'], 'size': ['M'], 'min_price': 10.0, 'q': ' Cotton  shirt'}
+    second = {'size': ['M'], 'color': ['Black', 'Red', 'Red'], 'min_price': 10.0,
+              'q': 'cotton shirt'}
+    assert filters_key(first) != filters_key(second)  # search case is significant to FTS
+    second['q'] = 'Cotton shirt'
+    assert filters_key(first) == filters_key(second)
+    assert filters_key({'in_stock': False}) == filters_key({})
+
+def test_split_fragment():
+    """Test that cart button placeholders are split out of cached markup."""
+    html = 'a<!--cart-action:3:1-->b<!--cart-action:12:0-->c'
+    assert split_fragment(html) == ('a', (3, True), 'b', (12, False), 'c')
+
+def test_catalog_version_bumped_by_product_changes(app):
+    """Test that inserting, updating and deleting products bumps the version."""
+    with app.app_context():
+        start = CatalogVersion.current()
+        product = Product(name='New Hat', description='New', price=5.0,
+                          image_url='https://test.com/new.jpg')
+        db.session.add(product)
+        db.session.commit()
+        assert CatalogVersion.current() == start + 1
+
+        product.price = 6.0
+        db.session.commit()
+        assert CatalogVersion.current() == start + 2
+
+        db.session.add(CartItem(session_id='user', product_id=product.id))
+        db.session.commit()
+        assert CatalogVersion.current() == start + 2
+
+        db.session.delete(CartItem.query.first())
+        db.session.delete(product)
+        db.session.commit()
+        assert CatalogVersion.current() == start + 3
+
+def count_product_queries(app, client, url):
+    """Request a URL and count the statements selecting products."""
+    statements = []
+    with app.app_context():
+        def record(*args):
+            if 'FROM products' in args[2]:
+                statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return response, len(statements)
+
+def test_grid_cache_hit_skips_queries(app, client):
+    """Test that a repeated filter selection is served from the cache."""
+    first, first_queries = count_product_queries(
+        app, client, '/products?color=Black&size=M&color=Red')
+    second, second_queries = count_product_queries(
+        app, client, '/products?size=M&color=Red&color=Black')
+    assert first_queries == 2  # page and facet counts
+    assert second_queries == 0
+    assert first.data.count(b'card-title') == second.data.count(b'card-title') == 1
+    assert app.extensions['viber.grid_cache'].stats()['hits'] == 2
+
+def test_grid_cache_links_match_request(app, client):
+    """Test that a cached grid links to the next page with the search as requested."""
+    app.config['PRODUCTS_PER_PAGE'] = 1
+    with app.app_context():
+        db.session.add(Product(name='Test Hat 2', description='Another hat', price=9.99,
+                               image_url='https://test.com/hat.jpg', color='Black'))
+        db.session.commit()
+
+    def next_link(url):
+        html = client.get(url).get_data(as_text=True)
+        return re.search(r'rel="next"\s+href="([^"]+)"', html).group(1)
+
+    first = next_link('/products?q=Hat&color=Red&color=Black')
+    assert next_link('/products?color=Black&q=Hat&color=Red') == first
+    assert 'q=Hat' in first and first.index('color=Black') < first.index('color=Red')
+    assert 'q=hat*' in next_link('/products?q=hat*&color=Red&color=Black')
+
+def test_grid_cache_keeps_cart_buttons_per_user(app, client):
+    """Test that the cached grid shows the right cart button for each visitor."""
+    response = client.get('/products')
+    assert b'Login to Add to Cart' in response.data
+
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['username'] = 'testuser'
+    response = client.get('/products')
+    assert app.extensions['viber.grid_cache'].stats()['hits'] >= 1
+    assert b'Login to Add to Cart' not in response.data
+    assert b'class="btn btn-primary w-100 add-to-cart" data-product-id="1"' in response.data
+
+def test_grid_cache_invalidated_by_product_changes(app, client):
+    """Test that changing a product bumps the catalog version and misses the cache."""
+    assert b'$29.99' in client.get('/products').data
+    with app.app_context():
+        Product.query.first().price = 19.99
+        db.session.commit()
+    response = client.get('/products')
+    assert b'$19.99' in response.data
+    assert b'$29.99' not in response.data
+
+def test_grid_cache_can_be_disabled(app, client):
+    """Test that a zero size disables the cache."""
+    app.config['PRODUCT_GRID_CACHE_BYTES'] = 0
+    _, first_queries = count_product_queries(app, client, '/products')
+    _, second_queries = count_product_queries(app, client, '/products')
+    assert first_queries == second_queries == 2
+    assert 'viber.grid_cache' not in app.extensions
@@ -0,0 +1,84 @@
+"""
+Tests for the anonymous content page cache.
+"""
+
+import gzip
+import pytest
+from flask import template_rendered
+from viber.utils.page_cache import EXTENSION_KEY, get_page_cache
+
+@pytest.fixture
+def renders(app):
+    """Count the templates rendered by the application."""
+    rendered = []
+
+    def record(sender, template, context, **extra):
+        rendered.append(template.name)
+
+    template_rendered.connect(record, app)
+    yield rendered
+    template_rendered.disconnect(record, app)
+
+@pytest.mark.parametrize('url', ['/', '/about', '/contact'])
+def test_anonymous_pages_served_from_cache(client, renders, url):
+    """Test that a second anonymous request is served without rendering."""
+    first = client.get(url)
+    assert len(renders) == 1
+    second = client.get(url)
+    assert renders == [renders[0]]
+    assert second.status_code == 200
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.cache_control.public and second.cache_control.no_cache
+    assert 'Accept-Encoding' in second.vary
+
+def test_gzip_served_when_accepted(client):
+    """Test that clients accepting gzip get the precompressed copy."""
+    plain = client.get('/about').data
+    response = client.get('/about', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == plain
+    response = client.get('/about', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_logged_in_and_flashes_bypass_cache(client, auth, renders):
+    """Test that personalised pages and pending flashes are always rendered."""
+    client.get('/')
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('info', 'Welcome back')]
+    assert b'Welcome back' in client.get('/').data
+    auth.login()
+    renders.clear()
+    assert b'Welcome, testuser!' in client.get('/').data
+    assert renders == ['home.html']
+
+def test_revalidation_still_returns_304(client):
+    """Test that cached pages are still revalidated by their entity tag."""
+    etag = client.get('/contact').headers['ETag']
+    response = client.get('/contact', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+def test_shared_store_serves_other_workers(app, tmp_path, renders):
+    """Test that a page rendered by one worker is served to another from the shared file."""
+    app.config['PAGE_CACHE_PATH'] = str(tmp_path / 'pages.db')
+    client = app.test_client()
+    html = client.get('/about').data
+    app.extensions.pop(EXTENSION_KEY)  # Another worker starts with an empty memory cache
+    assert client.get('/about').data == html
+    assert len(renders) == 1
+
+    # Closing before workers are forked only drops the connection
+    with app.app_context():
+        cache = get_page_cache()
+        cache.close()
+        assert cache.shared._local.connection is None
+    cache.memory.clear()
+    assert client.get('/about').data == html
+    assert len(renders) == 1
+
+def test_cache_disabled(app, client, renders):
+    """Test that a zero size disables the page cache."""
+    app.config['PAGE_CACHE_BYTES'] = 0
+    client.get('/')
+    client.get('/')
+    assert len(renders) == 2
@@ -2,6 +2,10 @@
 Tests for page functionality.
 """
 
+from sqlalchemy import text
+from viber import db
+from viber.models.product import Product, CATEGORIES
+
 def test_public_pages_accessible(client):
     """Test that public pages are accessible without authentication."""
     public_routes = ['/', '/about', '/contact', '/products']
@@ -39,4 +43,19 @@ def test_navigation_includes_products(client):
     """Test that navigation bar includes products link."""
     response = client.get('/about')  # Use public page
     assert b'href="/products"' in response.data
-    assert b'Products' in response.data 
\ No newline at end of file
+    assert b'Products' in response.data 
+
+
+def test_product_attributes_stored_as_codes(app, client):
+    """Test that attributes are stored as list positions but read and filtered as strings."""
+    with app.app_context():
+        assert db.session.execute(text('SELECT category FROM products')).scalar() == 0
+        product = db.session.get(Product, 1)
+        assert product.category == CATEGORIES[0]
+        assert product.to_dict()['size'] == 'M'
+
+    assert b'Test Hat' in client.get('/products?category=T-Shirts').data
+    assert b'Test Hat' not in client.get('/products?category=Jeans').data
+    response = client.get('/products?category=Hats')  # Not a known value
+    assert response.status_code == 200
+    assert b'Test Hat' not in response.data
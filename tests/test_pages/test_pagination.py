@@ -0,0 +1,118 @@
+"""
+Tests for keyset pagination of the products page.
+"""
+
+import re
+import pytest
+from viber import db
+from viber.models.product import Product
+from viber.utils.catalog import SORT_OPTIONS
+from viber.utils.pagination import encode_cursor, decode_cursor, keyset_paginate
+
+def add_products(app, count):
+    """Add products with repeated prices and names to exercise tiebreaking."""
+    with app.app_context():
+        for i in range(count):
+            db.session.add(Product(
+                name=f'Hat {i % 4}',
+                description='A hat',
+                price=10.0 + (i % 3),
+                image_url='https://test.com/hat.jpg',
+                color='Red' if i % 2 else 'Blue',
+                in_stock=True
+            ))
+        db.session.commit()
+
+def walk(app, sort, per_page, **filters):
+    """Collect product ids by following next cursors, then prev cursors back."""
+    with app.app_context():
+        query = Product.query
+        if filters:
+            query = query.filter_by(**filters)
+        pages = [keyset_paginate(query, sort, per_page)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(query, sort, per_page, after=pages[-1].next_cursor))
+        backwards = [pages[-1]]
+        while backwards[-1].has_prev:
+            backwards.append(keyset_paginate(query, sort, per_page,
+                                             before=backwards[-1].prev_cursor))
+        forward_ids = [[p.id for p in page] for page in pages]
+        backward_ids = [[p.id for p in page] for page in reversed(backwards)]
+        return forward_ids, backward_ids
+
+@pytest.mark.parametrize('sort', [sort for sort in SORT_OPTIONS if sort != 'relevance'])
+def test_pagination_is_stable_for_every_sort(app, sort):
+    """Test that pages cover every product exactly once in sort order."""
+    add_products(app, 23)
+    forward, backward = walk(app, sort, per_page=5)
+
+    with app.app_context():
+        column, descending = SORT_OPTIONS[sort]
+        products = Product.query.all()
+        key = (lambda p: (getattr(p, column), p.id)) if column else (lambda p: p.id)
+        expected = [p.id for p in sorted(products, key=key, reverse=descending)]
+
+    assert [len(page) for page in forward] == [5, 5, 5, 5, 4]
+    assert [pid for page in forward for pid in page] == expected
+    assert backward == forward
+
+def test_pagination_respects_filters(app):
+    """Test that cursors page through filtered results only."""
+    add_products(app, 20)
+    forward, _ = walk(app, 'price_desc', per_page=3, color='Red')
+    with app.app_context():
+        red_ids = {p.id for p in Product.query.filter_by(color='Red')}
+    assert {pid for page in forward for pid in page} == red_ids
+
+def test_cursor_round_trip():
+    """Test that cursors decode only for the sort they were made for."""
+    cursor = encode_cursor('price_asc', 19.99, 42)
+    assert decode_cursor(cursor, 'price_asc') == (19.99, 42)
+    assert decode_cursor(cursor, 'name_asc') is None
+    assert decode_cursor('not-a-cursor', 'price_asc') is None
+    assert decode_cursor(None, 'price_asc') is None
+
+def test_cursor_rejects_values_of_the_wrong_type():
+    """Test that cursors whose values do not match the sort key are ignored."""
+    assert decode_cursor(encode_cursor('price_asc', 5, 1), 'price_asc') == (5, 1)
+    assert decode_cursor(encode_cursor('name_asc', 'Hat', 1), 'name_asc') == ('Hat', 1)
+    assert decode_cursor(encode_cursor('featured', 3, 3), 'featured') == (3, 3)
+    assert decode_cursor(encode_cursor('relevance', -1.5, 1), 'relevance') == (-1.5, 1)
+    for sort, value, product_id in [('price_asc', [1], 5), ('price_asc', 'abc', 5),
+                                    ('price_desc', True, 5), ('price_asc', None, 5),
+                                    ('name_asc', 12, 5), ('name_desc', {'a': 1}, 5),
+                                    ('featured', 1.5, 5), ('featured', '3', 5),
+                                    ('relevance', 'abc', 5), ('price_asc', 5, True),
+                                    ('price_asc', 5, 1.0)]:
+        assert decode_cursor(encode_cursor(sort, value, product_id), sort) is None, value
+
+def test_products_page_is_bounded(app, client):
+    """Test that the products page renders a single page with a next link."""
+    app.config['PRODUCTS_PER_PAGE'] = 4
+    add_products(app, 10)
+
+    response = client.get('/products?sort=price_asc&color=Red')
+    data = response.data.decode()
+    assert response.status_code == 200
+    assert data.count('card-title') == 4
+    next_url = re.search(r'rel="next"\s+href="([^"]+)"', data).group(1)
+    assert 'color=Red' in next_url and 'sort=price_asc' in next_url
+
+    response = client.get(next_url.replace('&amp;', '&'))
+    assert response.status_code == 200
+    assert response.data.decode().count('card-title') == 1
+
+def test_products_page_ignores_invalid_cursor(client, app):
+    """Test that a tampered cursor falls back to the first page."""
+    response = client.get('/products?after=garbage')
+    assert response.status_code == 200
+    assert b'Test Hat' in response.data
+
+    # Cursors with values of the wrong type, on both the database and index paths
+    for use_index in (False, True):
+        app.config['CATALOG_FACET_INDEX'] = use_index
+        for sort, value in [('price_asc', [1]), ('price_asc', 'abc'), ('name_asc', 1)]:
+            cursor = encode_cursor(sort, value, 5)
+            response = client.get(f'/products?sort={sort}&after={cursor}')
+            assert response.status_code == 200
+            assert b'Test Hat' in response.data
@@ -0,0 +1,85 @@
+"""
+Query plan regression tests for product filters.
+"""
+
+import re
+import pytest
+from sqlalchemy import event
+from werkzeug.datastructures import MultiDict
+from viber import db
+from viber.models.product import Product
+from viber.utils.catalog import apply_filters, parse_filters
+from viber.utils.pagination import keyset_paginate, encode_cursor
+
+# Representative filter/sort combinations generated by the products page
+FILTER_SETS = [
+    ({'category': ['Jeans']}, 'featured'),
+    ({'category': ['Jeans', 'Pants']}, 'price_asc'),
+    ({'category': ['Jeans']}, 'name_desc'),
+    ({'style': ['Casual']}, 'price_asc'),
+    ({'size': ['M', 'L']}, 'featured'),
+    ({'color': ['Red'], 'size': ['M']}, 'featured'),
+    ({'gender': ['Men'], 'season': ['Winter']}, 'name_asc'),
+    ({'min_price': '20', 'max_price': '30'}, 'featured'),
+    ({'in_stock': 'true'}, 'price_desc'),
+    ({}, 'price_asc'),
+    ({}, 'name_desc'),
+]
+
+# A full table scan reads as "SCAN products" with no index after it
+FULL_SCAN = re.compile(r'^SCAN products$')
+
+# Sorting the filtered rows instead of walking an index in page order
+SORTED = re.compile(r'^USE TEMP B-TREE FOR ORDER BY$')
+
+# One facet value with every sort: each must be read in page order from an index
+SINGLE_FACET_SETS = [({facet: [value]}, sort)
+                     for facet, value in [('category', 'Jeans'), ('style', 'Casual'),
+                                          ('size', 'M'), ('color', 'Red'), ('gender', 'Men'),
+                                          ('season', 'Winter')]
+                     for sort in ('featured', 'price_asc', 'price_desc', 'name_asc', 'name_desc')]
+SINGLE_FACET_SETS += [({'in_stock': 'true'}, sort)
+                      for sort in ('featured', 'price_asc', 'name_desc')]
+
+def explain_page_query(args, sort, cursor=None):
+    """Run the page query for a filter set and return its query plan details."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        query = apply_filters(Product.query, parse_filters(MultiDict(args)))
+        keyset_paginate(query, sort, 24, after=cursor)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    statement, parameters = statements[-1]
+    rows = db.session.connection().exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    return [row[-1] for row in rows]
+
+def page_plans(args, sort):
+    """Get the query plans of the first page and of a later page."""
+    value = 50.0 if sort.startswith('price') else 'M' if sort.startswith('name') else 1
+    for cursor in (None, encode_cursor(sort, value, 1)):
+        plan = explain_page_query(args, sort, cursor)
+        assert plan, 'No query plan returned'
+        yield plan
+
+@pytest.mark.parametrize('args,sort', FILTER_SETS)
+def test_filtered_queries_use_an_index(app, args, sort):
+    """Test that no filter or sort combination falls back to a full table scan."""
+    with app.app_context():
+        for plan in page_plans(args, sort):
+            assert not any(FULL_SCAN.match(detail) for detail in plan), \
+                f'{args} sorted by {sort} scans products: {plan}'
+
+@pytest.mark.parametrize('args,sort', SINGLE_FACET_SETS)
+def test_single_facet_pages_read_in_order(app, args, sort):
+    """Test that a facet value's pages come in order from an index, without sorting."""
+    with app.app_context():
+        for plan in page_plans(args, sort):
+            assert not any(FULL_SCAN.match(detail) or SORTED.match(detail)
+                           for detail in plan), f'{args} sorted by {sort} sorts rows: {plan}'
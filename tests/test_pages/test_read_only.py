@@ -0,0 +1,108 @@
+"""
+Tests for routing catalog reads to the read-only engine.
+"""
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from viber import create_app, db
+from viber.extensions import READ_ONLY_ENGINE
+from viber.models.product import Product
+from viber.utils.database import dispose_engines
+
+@pytest.fixture
+def routed_app(tmp_path):
+    """Create an application on a database file with the read-only bind enabled."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "viber.db"}',
+        'DATABASE_PROFILE': 'production',
+        'CATALOG_READ_ONLY_BIND': True,
+        'SECRET_KEY': 'test_secret_key'
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Product(name='Test Hat', description='A test hat', price=29.99,
+                               image_url='https://test.com/hat.jpg'))
+        db.session.commit()
+    return app
+
+def record_statements(app):
+    """Record the statements run on the primary and the read-only engine."""
+    with app.app_context():
+        engines = {'primary': db.engine, 'read_only': app.extensions[READ_ONLY_ENGINE]}
+    statements = {name: [] for name in engines}
+    for name, engine in engines.items():
+        event.listen(engine, 'before_cursor_execute',
+                     lambda *args, name=name: statements[name].append(args[2]))
+    return statements
+
+def test_catalog_reads_use_read_only_engine(routed_app):
+    """Test that catalog pages and the API never touch the primary engine."""
+    client = routed_app.test_client()
+    statements = record_statements(routed_app)
+    for url in ['/', '/products', '/products?q=hat&color=Black', '/products/facets',
+                '/api/products']:
+        assert client.get(url).status_code == 200, url
+    assert statements['primary'] == []
+    assert statements['read_only']
+
+def test_cart_writes_use_primary(routed_app):
+    """Test that cart writes stay on the primary engine."""
+    client = routed_app.test_client()
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['username'] = 'testuser'
+    statements = record_statements(routed_app)
+    assert client.post('/cart/add/1').status_code == 200
+    assert statements['read_only'] == []
+    assert any(statement.startswith('INSERT') for statement in statements['primary'])
+
+    # The new cart count is visible to the next catalog page
+    response = client.get('/products')
+    assert b'<span class="badge bg-primary">1</span>' in response.data
+
+def test_read_only_engine_rejects_writes(routed_app):
+    """Test that the read-only engine cannot open a write transaction."""
+    with routed_app.extensions[READ_ONLY_ENGINE].connect() as connection:
+        assert connection.execute(text('PRAGMA query_only')).scalar() == 1
+        with pytest.raises(OperationalError, match='readonly'):
+            connection.execute(text('DELETE FROM products'))
+
+def test_catalog_reads_not_blocked_by_writer(routed_app):
+    """Test that catalog pages are served while a write transaction is open."""
+    client = routed_app.test_client()
+    with routed_app.app_context():
+        connection = db.engine.raw_connection()
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute("UPDATE products SET name = 'Renamed Hat'")
+        response = client.get('/products')
+        assert response.status_code == 200
+        assert b'Test Hat' in response.data
+    finally:
+        connection.rollback()
+        connection.close()
+
+def test_dispose_engines(routed_app):
+    """Test that no pooled connection is left open for forked workers to share."""
+    client = routed_app.test_client()
+    assert client.get('/products').status_code == 200
+    with routed_app.app_context():
+        engines = [db.engine, routed_app.extensions[READ_ONLY_ENGINE]]
+        db.session.execute(text('SELECT 1'))
+        db.session.remove()
+    assert all(engine.pool.checkedin() for engine in engines)
+    dispose_engines(routed_app)
+    assert not any(engine.pool.checkedin() for engine in engines)
+    assert client.get('/products').status_code == 200
+
+def test_read_only_bind_disabled_by_default(app):
+    """Test that without the switch every query uses the primary engine."""
+    assert READ_ONLY_ENGINE not in app.extensions
+
+def test_read_only_bind_needs_database_file():
+    """Test that an in-memory database cannot be opened twice read-only."""
+    with pytest.raises(ValueError):
+        create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                    'CATALOG_READ_ONLY_BIND': True})
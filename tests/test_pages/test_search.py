@@ -0,0 +1,128 @@
+"""
+Tests for full-text product search.
+"""
+
+import sqlite3
+import pytest
+from sqlalchemy import text
+from viber import create_app, db
+from viber.init_db import init_db
+from viber.models.product import Product
+from viber.models.search import match_expression
+from viber.utils.catalog import apply_filters, facet_counts
+from viber.utils.pagination import keyset_paginate
+
+PRODUCTS = [
+    ('Casual Cotton Shirt', 'A relaxed shirt made from soft cotton.', 25.0, 'Black'),
+    ('Formal Wool Coat', 'A warm coat for the office.', 150.0, 'Navy'),
+    ('Cotton Hoodie', 'Cotton hoodie, cotton lining, cotton cuffs.', 45.0, 'Black'),
+    ('Vintage Denim Jeans', 'Classic denim that works with any shirt.', 60.0, 'Blue'),
+]
+
+@pytest.fixture
+def catalog(app):
+    """Add products with distinct names and descriptions."""
+    with app.app_context():
+        for name, description, price, color in PRODUCTS:
+            db.session.add(Product(name=name, description=description, price=price,
+                                   image_url='https://test.com/p.jpg', color=color))
+        db.session.commit()
+    return app
+
+def search(query, sort='relevance', **filters):
+    """Return the names of the products matching a search."""
+    selected_filters = dict(filters, q=query)
+    page = keyset_paginate(apply_filters(Product.query, selected_filters), sort, 10)
+    return [product.name for product in page]
+
+def test_match_expression_escapes_input():
+    """Test that user input cannot inject FTS5 syntax."""
+    assert match_expression('cotton shi') == '"cotton" "shi"*'
+    assert match_expression('NEAR(a OR "b") -c') == '"NEAR" "a" "OR" "b" "c"*'
+    assert match_expression('  ') is None
+    assert match_expression(None) is None
+
+def test_search_ranks_by_relevance(catalog):
+    """Test that search results are ranked with bm25."""
+    with catalog.app_context():
+        assert search('cotton') == ['Cotton Hoodie', 'Casual Cotton Shirt']
+        assert search('shirts') == ['Casual Cotton Shirt', 'Vintage Denim Jeans']
+        assert search('jea') == ['Vintage Denim Jeans']
+        assert search('(unbalanced "quotes') == []
+
+def test_search_composes_with_filters_and_sort(catalog):
+    """Test that search combines with facet filters and other sort options."""
+    with catalog.app_context():
+        assert search('shirt', sort='price_desc') == ['Vintage Denim Jeans', 'Casual Cotton Shirt']
+        assert search('shirt', color=['Blue']) == ['Vintage Denim Jeans']
+        assert search('cotton', max_price=30.0) == ['Casual Cotton Shirt']
+
+def test_search_relevance_pagination(catalog):
+    """Test that relevance cursors page through all matches once."""
+    with catalog.app_context():
+        selected_filters = {'q': 'cotton shirt'}
+        query = apply_filters(Product.query, selected_filters)
+        first = keyset_paginate(query, 'relevance', 1)
+        second = keyset_paginate(query, 'relevance', 1, after=first.next_cursor)
+        assert [p.name for p in first] == ['Casual Cotton Shirt']
+        assert not second.has_next
+        back = keyset_paginate(query, 'relevance', 1, before=second.prev_cursor)
+        assert [p.name for p in back] == ['Casual Cotton Shirt']
+
+def test_search_index_follows_product_changes(catalog):
+    """Test that triggers keep the search index in sync."""
+    with catalog.app_context():
+        product = Product.query.filter_by(name='Formal Wool Coat').one()
+        product.name = 'Formal Linen Coat'
+        db.session.commit()
+        assert search('wool') == []
+        assert search('linen') == ['Formal Linen Coat']
+
+        db.session.delete(product)
+        db.session.commit()
+        assert search('linen') == []
+        integrity = text(
+            "INSERT INTO products_fts(products_fts, rank) VALUES ('integrity-check', 1)")
+        db.session.execute(integrity)
+
+def test_search_facet_counts(catalog):
+    """Test that facet counts are restricted to search matches."""
+    with catalog.app_context():
+        counts, total = facet_counts({'q': 'cotton'})
+        assert total == 2
+        assert counts['color']['Black'] == 2
+        assert counts['color']['Blue'] == 0
+
+def test_products_page_search(catalog, client):
+    """Test the search box on the products page."""
+    response = client.get('/products?q=denim')
+    data = response.data.decode()
+    assert response.status_code == 200
+    assert 'Vintage Denim Jeans' in data
+    assert 'Cotton Hoodie' not in data
+    assert 'value="denim"' in data
+    assert 'sort=relevance' in data
+
+def test_products_page_search_with_facet_index(catalog, client):
+    """Test that searches bypass the facet index, which has no text."""
+    catalog.config['CATALOG_FACET_INDEX'] = True
+    response = client.get('/products?q=hoodie&color=Black')
+    data = response.data.decode()
+    assert 'Cotton Hoodie' in data
+    assert 'Casual Cotton Shirt' not in data
+
+def test_init_db_builds_search_index(tmp_path, monkeypatch):
+    """Test that init_db populates the search index in bulk."""
+    database = tmp_path / 'viber.db'
+    monkeypatch.setattr('viber.init_db.create_app',
+                        lambda: create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'}))
+    monkeypatch.chdir(tmp_path)
+    init_db()
+
+    connection = sqlite3.connect(database)
+    indexed = connection.execute(
+        "SELECT count(*) FROM products_fts WHERE products_fts MATCH 'made'").fetchone()[0]
+    triggers = connection.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'trigger'").fetchone()[0]
+    assert indexed == 100
+    assert triggers == 3
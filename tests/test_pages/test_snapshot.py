@@ -0,0 +1,130 @@
+"""
+Tests for the in-memory catalog snapshot.
+"""
+
+import pytest
+from werkzeug.datastructures import MultiDict
+from viber import db
+from viber.models.product import Product
+from viber.utils.catalog import apply_filters, parse_filters
+from viber.utils.pagination import keyset_paginate
+from viber.utils.snapshot import (EXTENSION_KEY, SNAPSHOT_COLUMNS, CatalogSnapshot, ProductRecord,
+                                  get_snapshot)
+
+@pytest.fixture
+def snapshot_app(app, add_products):
+    """Enable the snapshot on the test application, with a few more products."""
+    app.config['CATALOG_SNAPSHOT'] = True
+    app.config['PRODUCT_GRID_CACHE_BYTES'] = 0
+    add_products(5, name=lambda i: f'Wool Scarf {i}', description='A warm scarf',
+                 price=lambda i: 10.0 + i, image_url='https://test.com/scarf.jpg',
+                 category='Coats', color='Red', in_stock=lambda i: i % 2 == 0,
+                 stock_quantity=lambda i: None if i == 3 else i)
+    return app
+
+def test_snapshot_matches_orm(snapshot_app):
+    """Test that every record reads the same values as the ORM product."""
+    with snapshot_app.app_context():
+        snapshot = CatalogSnapshot.build()
+        products = Product.query.order_by(Product.id).all()
+        assert len(snapshot) == len(products)
+        for product in products:
+            record = snapshot.get(product.id)
+            assert record.to_dict() == product.to_dict()
+            assert record.sku == product.sku
+        assert snapshot.get(999) is None
+        assert [record.id for record in snapshot.get_many([3, 999, 1])] == [3, 1]
+
+def test_records_are_slotted_and_read_only(snapshot_app):
+    """Test that records carry no per-instance dict and reject unknown attributes."""
+    with snapshot_app.app_context():
+        record = CatalogSnapshot.build().get(1)
+    assert isinstance(record, ProductRecord)
+    assert not hasattr(record, '__dict__')
+    with pytest.raises(AttributeError):
+        record.cart_items  # pylint: disable=pointless-statement
+
+def test_products_page_renders_from_snapshot(snapshot_app, client, query_counter, card_titles):
+    """Test that the products page selects only ids and renders the same cards."""
+    snapshot_app.config['CATALOG_SNAPSHOT'] = False
+    urls = ['/products', '/products?color=Red&sort=price_desc', '/products?q=scarf',
+            '/products?sort=name_asc&in_stock=true']
+    expected = [card_titles(client.get(url).get_data(as_text=True)) for url in urls]
+
+    snapshot_app.config['CATALOG_SNAPSHOT'] = True
+    client.get('/products')  # Build the snapshot
+    for facet_index in (False, True):
+        snapshot_app.config['CATALOG_FACET_INDEX'] = facet_index
+        for url, titles in zip(urls, expected):
+            with query_counter() as statements:
+                html = client.get(url).get_data(as_text=True)
+            assert card_titles(html) == titles, url
+            assert not any('products.description' in statement for statement in statements), url
+
+def test_pagination_loads_from_snapshot(snapshot_app):
+    """Test that keyset pages and cursors match the ORM path."""
+    with snapshot_app.app_context():
+        snapshot = get_snapshot()
+        for sort in ('featured', 'price_desc', 'name_asc', 'relevance'):
+            args = MultiDict({'q': 'scarf'} if sort == 'relevance' else {})
+            query = apply_filters(Product.query, parse_filters(args))
+            orm = keyset_paginate(query, sort, 2)
+            records = keyset_paginate(query, sort, 2, load=snapshot.get_many)
+            assert [item.id for item in records] == [item.id for item in orm]
+            assert records.next_cursor == orm.next_cursor
+            assert records.has_next == orm.has_next
+
+def test_snapshot_swapped_on_catalog_change(snapshot_app, client):
+    """Test that a committed product change replaces the snapshot on the next request."""
+    client.get('/products')
+    first = snapshot_app.extensions[EXTENSION_KEY]
+    client.get('/products')
+    assert snapshot_app.extensions[EXTENSION_KEY] is first
+
+    with snapshot_app.app_context():
+        product = db.session.get(Product, 1)
+        product.price = 99.5
+        db.session.commit()
+
+    assert b'$99.50' in client.get('/products').data
+    second = snapshot_app.extensions[EXTENSION_KEY]
+    assert second is not first and second.version > first.version
+    assert first.get(1).price == 29.99  # Requests still holding it are unaffected
+
+def test_cart_renders_from_snapshot(snapshot_app, client, query_counter):
+    """Test that the cart page reads product display data from the snapshot."""
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['username'] = 'testuser'
+    client.post('/cart/add/2')
+    client.post('/cart/add/1')
+    client.get('/products')  # Build the snapshot
+
+    with query_counter() as statements:
+        html = client.get('/cart').get_data(as_text=True)
+    assert html.index('Wool Scarf 0') < html.index('Test Hat')
+    assert '$29.99' in html
+    assert not any('products.name' in statement for statement in statements)
+
+def test_cart_lines_missing_from_snapshot(snapshot_app, client):
+    """Test that the cart lists every line its total counts when the snapshot lags behind."""
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['username'] = 'testuser'
+    client.post('/cart/add/2')
+    client.post('/cart/add/1')
+    client.get('/products')  # Build the snapshot
+    # The same catalog version without product 2, as read while it was being committed
+    snapshot = snapshot_app.extensions[EXTENSION_KEY]
+    rows = [(product_id, *(snapshot.columns[column][position] for column in SNAPSHOT_COLUMNS))
+            for position, product_id in enumerate(snapshot.ids) if product_id != 2]
+    snapshot_app.extensions[EXTENSION_KEY] = CatalogSnapshot(snapshot.version, rows)
+
+    html = client.get('/cart').get_data(as_text=True)
+    assert 'Wool Scarf 0' in html and 'Test Hat' in html
+    assert '$39.99' in html
+
+def test_snapshot_disabled_by_default(app):
+    """Test that the snapshot is opt-in."""
+    with app.app_context():
+        assert get_snapshot() is None
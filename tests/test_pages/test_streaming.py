@@ -0,0 +1,79 @@
+"""
+Tests for streamed rendering of the products page.
+"""
+
+import pytest
+from viber import db
+from viber.init_db import seed_products
+from viber.utils.template import FLUSH, buffer_stream
+
+def test_buffer_stream():
+    """Test that output is joined into chunks and flushed at the marker."""
+    events = ['ab', 'cd', FLUSH, 'e', 'fgh', 'i', FLUSH, FLUSH, 'j']
+    assert list(buffer_stream(events, 4)) == ['abcd', 'efgh', 'i', 'j']
+
+@pytest.mark.parametrize('count', [10, 3000])
+def test_first_chunk_sent_before_products_are_queried(app, client, query_counter, card_titles,
+                                                      count):
+    """Test that the head and navigation go out before any product query, at any catalog size."""
+    with app.app_context():
+        seed_products(count, seed=1)
+    app.config['PRODUCT_GRID_CACHE_BYTES'] = 0  # Render every grid
+
+    with query_counter() as statements:
+        response = client.get('/products?sort=price_desc', buffered=False)
+        chunks = iter(response.response)
+        first = next(chunks).decode()
+        before_first = list(statements)
+        html = first + b''.join(chunks).decode()
+        response.close()
+
+    assert response.is_streamed
+    assert '<nav' in first and 'Filters' not in first
+    assert not any('products' in statement for statement in before_first)
+    assert any('FROM products' in statement for statement in statements)
+
+    app.config['STREAM_PRODUCT_PAGES'] = False
+    rendered = client.get('/products?sort=price_desc').get_data(as_text=True)
+    assert html == rendered
+    assert len(card_titles(html)) == min(count + 1, app.config['PRODUCTS_PER_PAGE'])
+
+def test_sidebar_sent_before_facets_are_counted(app, client, query_counter):
+    """Test that the filter sidebar goes out before the facet count query runs."""
+    with app.app_context():
+        seed_products(50, seed=1)
+    app.config['PRODUCT_GRID_CACHE_BYTES'] = 0  # Count on every request
+
+    with query_counter() as statements:
+        response = client.get('/products', buffered=False)
+        sent = ''
+        for chunk in response.response:
+            sent += chunk.decode()
+            if 'Apply Filters' in sent:
+                break
+        before_sidebar = list(statements)
+        sent += b''.join(response.response).decode()
+        response.close()
+
+    assert 'id="facet-counts"' not in sent.split('Apply Filters')[0]
+    assert not any('UNION ALL' in statement for statement in before_sidebar)
+    assert any('UNION ALL' in statement for statement in statements)
+    assert sent.index('Apply Filters') < sent.index('id="facet-counts"')
+
+def test_grid_streamed_in_chunks(app, client):
+    """Test that cards are sent as they are rendered, with the visitor's cart buttons."""
+    with app.app_context():
+        seed_products(50, seed=1)
+    app.config['TEMPLATE_STREAM_BUFFER'] = 2048
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['username'] = 'testuser'
+
+    response = client.get('/products', buffered=False)
+    chunks = [chunk.decode() for chunk in response.response]
+    response.close()
+    grid = [chunk for chunk in chunks if 'card-title' in chunk]
+    assert len(grid) > 3
+    html = ''.join(chunks)
+    assert 'cart-action' not in html
+    assert 'Add to Cart' in html and 'Login to Add to Cart' not in html
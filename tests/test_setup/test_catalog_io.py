@@ -0,0 +1,153 @@
+"""
+Tests for the catalog import and export commands.
+"""
+
+import csv
+import io
+import json
+import pytest
+from viber import db
+from viber.models.cart import CartItem, CartSummary
+from viber.models.catalog import CatalogVersion, ProductChange
+from viber.models.product import Product
+from viber.utils.catalog_io import CATALOG_FIELDS, read_rows, validate_row
+
+def product_row(sku, **values):
+    """Build a valid import row."""
+    row = {'sku': sku, 'name': f'Product {sku}', 'description': 'Imported', 'price': '19.99',
+           'image_url': 'https://test.com/product.jpg', 'category': 'Shirts', 'color': 'Navy'}
+    row.update(values)
+    return row
+
+def write_csv(path, rows):
+    """Write import rows as CSV."""
+    with open(path, 'w', encoding='utf-8', newline='') as stream:
+        writer = csv.DictWriter(stream, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+def test_validate_row():
+    """Test that rows are coerced and enums are checked."""
+    row = validate_row(product_row('A1', in_stock='false', stock_quantity='3', fit=''))
+    assert row['price'] == 19.99
+    assert row['in_stock'] is False
+    assert row['stock_quantity'] == 3
+    assert 'fit' not in row  # Empty values take the model default
+
+    for bad in [{'category': 'Hats'}, {'price': 'cheap'}, {'price': '-1'}, {'price': 'nan'},
+                {'price': 'inf'}, {'price': '-inf'}, {'price': float('nan')},
+                {'in_stock': 'maybe'}, {'stock_quantity': '2.5'}, {'name': ''}]:
+        with pytest.raises(ValueError):
+            validate_row(product_row('A1', **bad))
+    with pytest.raises(ValueError, match='Missing sku'):
+        validate_row(product_row(''))
+
+def test_read_ndjson_reports_bad_lines():
+    """Test that NDJSON lines are numbered and invalid JSON is reported, not raised."""
+    stream = io.StringIO('{"sku": "A1"}\n\nnot json\n')
+    rows = list(read_rows(stream, 'ndjson'))
+    assert rows[0] == (1, {'sku': 'A1'})
+    assert rows[1][0] == 3 and isinstance(rows[1][1], ValueError)
+
+def test_import_upserts_by_sku(app, runner, tmp_path):
+    """Test that importing inserts new SKUs and updates only changed ones."""
+    path = write_csv(tmp_path / 'catalog.csv', [product_row(f'SKU{i}') for i in range(5)])
+    result = runner.invoke(args=['catalog', 'import', path, '--chunk-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert '5 written, 0 unchanged, 0 rejected' in result.output
+    assert 'rows/s' in result.output
+
+    with app.app_context():
+        product = Product.query.filter_by(sku='SKU1').one()
+        product_id = product.id
+        db.session.add(CartItem(session_id='user1', product_id=product_id, quantity=2))
+        db.session.commit()
+        version = CatalogVersion.current()
+
+    rows = [product_row(f'SKU{i}') for i in range(5)]
+    rows[1]['price'] = '25.00'
+    path = write_csv(tmp_path / 'catalog.csv', rows)
+    result = runner.invoke(args=['catalog', 'import', path])
+    assert result.exit_code == 0, result.output
+    assert '1 written, 4 unchanged, 0 rejected' in result.output
+
+    with app.app_context():
+        assert Product.query.count() == 6
+        product = Product.query.filter_by(sku='SKU1').one()
+        assert product.id == product_id
+        assert product.price == 25.0
+        assert product.fit == 'Regular' and product.in_stock and product.stock_quantity == 10
+        assert CartSummary.get_totals('user1') == (2, 50.0)
+        assert CatalogVersion.current() == version + 1
+
+def test_import_writes_a_repeated_sku_once(app, runner, tmp_path):
+    """Test that the last row of a SKU repeated within a chunk is written and logged once."""
+    rows = [product_row('SKU1', price='5'), product_row('SKU2'), product_row('SKU1', price='7')]
+    path = write_csv(tmp_path / 'catalog.csv', rows)
+    with app.app_context():
+        start = ProductChange.latest()
+    result = runner.invoke(args=['catalog', 'import', path])
+    assert result.exit_code == 0, result.output
+    assert '2 written, 1 unchanged, 0 rejected' in result.output
+    with app.app_context():
+        assert Product.query.filter_by(sku='SKU1').one().price == 7.0
+        assert sorted(row[1] for row in ProductChange.since(start)) == [2, 3]
+
+def test_partial_import_keeps_other_columns(app, runner, tmp_path):
+    """Test that columns left out of a file keep their values, and new products get defaults."""
+    full = write_csv(tmp_path / 'full.csv', [product_row('SKU1', in_stock='0', stock_quantity='3')])
+    assert runner.invoke(args=['catalog', 'import', full]).exit_code == 0
+
+    fields = ['sku', 'name', 'description', 'price', 'image_url']
+    path = tmp_path / 'prices.ndjson'
+    path.write_text(''.join(json.dumps({field: row[field] for field in fields}) + '\n'
+                            for row in [product_row('SKU1', price='25'), product_row('SKU2')]),
+                    encoding='utf-8')
+    result = runner.invoke(args=['catalog', 'import', str(path)])
+    assert result.exit_code == 0, result.output
+    assert '2 written, 0 unchanged, 0 rejected' in result.output
+
+    with app.app_context():
+        updated = Product.query.filter_by(sku='SKU1').one()
+        assert updated.price == 25.0
+        assert (updated.category, updated.color) == ('Shirts', 'Navy')
+        assert not updated.in_stock and updated.stock_quantity == 3
+        inserted = Product.query.filter_by(sku='SKU2').one()
+        assert (inserted.category, inserted.color) == ('T-Shirts', 'Black')
+        assert inserted.in_stock and inserted.stock_quantity == 10
+
+def test_import_rejects_invalid_rows(app, runner, tmp_path):
+    """Test that invalid rows are reported with their line and the rest is imported."""
+    rows = [product_row('SKU1'), product_row('SKU2', color='Plaid'), product_row('SKU3')]
+    path = write_csv(tmp_path / 'catalog.csv', rows)
+    result = runner.invoke(args=['catalog', 'import', path])
+    assert result.exit_code == 1
+    assert "catalog.csv:3: Invalid color: 'Plaid'" in result.output
+    assert '2 written, 0 unchanged, 1 rejected' in result.output
+    with app.app_context():
+        assert {product.sku for product in Product.query if product.sku} == {'SKU1', 'SKU3'}
+
+def test_export_import_round_trip(app, runner, tmp_path):
+    """Test that an export can be imported again without changes."""
+    path = write_csv(tmp_path / 'catalog.csv', [product_row(f'SKU{i}', in_stock='0')
+                                                for i in range(3)])
+    assert runner.invoke(args=['catalog', 'import', path]).exit_code == 0
+    assert runner.invoke(args=['catalog', 'seed', '--count', '4', '--seed', '1']).exit_code == 0
+
+    for name in ('export.csv', 'export.ndjson'):
+        exported = str(tmp_path / name)
+        result = runner.invoke(args=['catalog', 'export', exported])
+        assert result.exit_code == 0, result.output
+        assert 'Exported 7 products.' in result.output
+        # The fixture's product was created without a SKU
+        assert 'skipped 1 products without a SKU' in result.output
+
+        result = runner.invoke(args=['catalog', 'import', exported])
+        assert result.exit_code == 0, result.output
+        assert '0 written, 7 unchanged, 0 rejected' in result.output
+
+    with open(tmp_path / 'export.ndjson', encoding='utf-8') as stream:
+        first = json.loads(stream.readline())
+    assert list(first) == list(CATALOG_FIELDS)
+    assert first['sku'] == 'SKU0' and first['in_stock'] is False
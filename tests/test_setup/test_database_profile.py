@@ -0,0 +1,104 @@
+"""
+Tests for the database profiles.
+"""
+
+import multiprocessing
+import pytest
+from sqlalchemy import text
+from viber import create_app, db
+from viber.models.cart import CartItem, CartSummary
+from viber.models.product import Product
+
+def create_database(uri, profile='production'):
+    """Create an application with a seeded database file."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'DATABASE_PROFILE': profile})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Product(name=f'Hat {i}', description='A hat', price=10.0,
+                                    image_url='https://test.com/hat.jpg') for i in range(3)])
+        db.session.commit()
+    return app
+
+def test_production_pragmas(tmp_path):
+    """Test that the production profile configures every new connection."""
+    app = create_database(f'sqlite:///{tmp_path / "viber.db"}')
+    with app.app_context():
+        with db.engine.connect() as connection:
+            pragma = lambda name: connection.execute(text(f'PRAGMA {name}')).scalar()
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1  # NORMAL
+            assert pragma('busy_timeout') == 5000
+            assert pragma('cache_size') == -64000
+            assert pragma('mmap_size') == 256 * 1024 * 1024
+            assert pragma('temp_store') == 2  # MEMORY
+        assert db.engine.pool.size() == 5
+
+def test_default_profile_leaves_pragmas(tmp_path):
+    """Test that the default profile keeps SQLite's defaults."""
+    app = create_database(f'sqlite:///{tmp_path / "viber.db"}', profile='default')
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'delete'
+
+def test_explicit_settings_override_profile(tmp_path):
+    """Test that configured pragmas and engine options win over the profile."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "viber.db"}',
+                      'DATABASE_PROFILE': 'production',
+                      'SQLITE_PRAGMAS': {'busy_timeout': 100},
+                      'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2}})
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 100
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'delete'
+        assert db.engine.pool.size() == 2
+
+def test_unknown_profile():
+    """Test that a misspelled profile fails loudly."""
+    with pytest.raises(ValueError):
+        create_app({'DATABASE_PROFILE': 'prod'})
+
+def add_to_cart_worker(uri, profile, username, adds, errors):
+    """Add products to a cart as fast as possible from a separate process."""
+    # Turn off the driver's own lock wait, so only the profile makes writers wait
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'DATABASE_PROFILE': profile,
+                      'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 0}}})
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['username'] = username
+    failed = 0
+    for i in range(adds):
+        try:
+            if client.post(f'/cart/add/{i % 3 + 1}').status_code != 200:
+                failed += 1
+            client.get('/about')
+        except Exception:  # database is locked
+            failed += 1
+    errors.put(failed)
+
+@pytest.mark.parametrize('profile', ['default', 'production'])
+def test_concurrent_writers(tmp_path, profile):
+    """Test that concurrent worker processes add to carts without lock errors in production."""
+    uri = f'sqlite:///{tmp_path / "viber.db"}'
+    app = create_database(uri, profile)
+    workers, adds = 6, 30
+
+    context = multiprocessing.get_context('spawn')
+    errors = context.Queue()
+    processes = [context.Process(target=add_to_cart_worker,
+                                 args=(uri, profile, f'user{i % 2}', adds, errors))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    failed = sum(errors.get(timeout=120) for _ in processes)
+    for process in processes:
+        process.join()
+
+    if profile == 'default':
+        assert failed > 0
+        return
+    assert failed == 0
+    with app.app_context():
+        for username in ('user0', 'user1'):
+            assert CartItem.get_cart_count(username) == workers // 2 * adds
+            assert CartSummary.get_count(username) == workers // 2 * adds
@@ -2,8 +2,12 @@
 Tests for database initialization functionality.
 """
 
+from sqlalchemy import inspect, text
 from viber import db
-from viber.init_db import generate_products, generate_price, generate_description
+from viber.init_db import (generate_products, generate_price, generate_description,
+                           generate_product_rows, generate_sku, seed_products)
+from viber.models.catalog import CatalogVersion
+from viber.models.search import FTS_TABLE, match_expression
 from viber.models.product import Product, CATEGORIES, FITS, MATERIALS, STYLES
 
 def test_generate_price():
@@ -71,4 +75,55 @@ def test_init_db(app):  # pylint: disable=unused-argument
         assert sample_product.material in MATERIALS, f"Invalid material: {sample_product.material}"
         assert sample_product.style in STYLES, f"Invalid style: {sample_product.style}"
         assert isinstance(sample_product.stock_quantity, int), "Stock quantity is not an integer"
-        assert sample_product.stock_quantity >= 0, "Stock quantity is negative" 
\ No newline at end of file
+        assert sample_product.stock_quantity >= 0, "Stock quantity is negative"
+
+def test_generate_product_rows_seeded():
+    """Test that a seed reproduces the same catalog."""
+    first = list(generate_product_rows(20, seed=42))
+    assert first == list(generate_product_rows(20, seed=42))
+    assert first != list(generate_product_rows(20, seed=43))
+    assert [product.name for product in generate_products(20, seed=42)] == \
+        [row['name'] for row in first]
+
+def test_seed_products(app):
+    """Test that seeding in chunks keeps indexes, search and the catalog version current."""
+    with app.app_context():
+        version = CatalogVersion.current()
+        progress = []
+        assert seed_products(25, seed=7, chunk_size=10,
+                             progress=lambda done, elapsed: progress.append(done)) == 25
+        assert progress == [10, 20, 25]
+        assert Product.query.count() == 26
+        assert CatalogVersion.current() != version
+
+        indexes = {index['name'] for index in inspect(db.engine).get_indexes('products')}
+        assert indexes == {index.name for index in Product.__table__.indexes}
+
+        # The search index covers the seeded rows, and the triggers the next write
+        def matches(query):
+            return db.session.execute(text(
+                f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query'),
+                {'query': match_expression(query)}).scalar()
+        assert matches('hat') == 1 + sum('Hat' in row['name']
+                                         for row in generate_product_rows(25, seed=7))
+        db.session.add(Product(name='Zebra Scarf', description='Striped', price=10.0,
+                               image_url='https://test.com/scarf.jpg'))
+        db.session.commit()
+        assert matches('zebra') == 1
+
+        # SKUs follow the ids, so the same seed again gets new ones
+        seed_products(5, seed=7)
+        seeded = Product.query.filter(Product.sku.is_not(None)).order_by(Product.id).all()
+        assert len(seeded) == 30
+        assert all(product.sku == generate_sku(product.id) for product in seeded)
+
+def test_catalog_seed_command(app, runner):
+    """Test the catalog seed command."""
+    result = runner.invoke(args=['catalog', 'seed', '--count', '30', '--seed', '1',
+                                 '--chunk-size', '20'])
+    assert result.exit_code == 0, result.output
+    assert '20/30 products' in result.output
+    assert 'Seeded 30 products.' in result.output
+    with app.app_context():
+        names = [product.name for product in Product.query.order_by(Product.id)][1:]
+    assert names == [row['name'] for row in generate_product_rows(30, seed=1)]
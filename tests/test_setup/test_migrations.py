@@ -0,0 +1,95 @@
+"""
+Tests for database migrations.
+"""
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade, downgrade
+from sqlalchemy import inspect, text
+from viber import create_app, db
+from viber.init_db import generate_sku
+
+def test_migrations_match_models(tmp_path):
+    """Test that upgrading to head produces the schema declared by the models."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "migrated.db"}'})
+    with app.app_context():
+        upgrade()
+        with db.engine.connect() as connection:
+            opts = app.extensions['migrate'].configure_args
+            context = MigrationContext.configure(connection, opts=opts)
+            diff = compare_metadata(context, db.metadata)
+        assert diff == [], f'Models and migrations have drifted: {diff}'
+
+def test_migrations_downgrade_to_base(tmp_path):
+    """Test that every migration can be reverted."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "migrated.db"}'})
+    with app.app_context():
+        upgrade()
+        downgrade(revision='base')
+        assert inspect(db.engine).get_table_names() == ['alembic_version']
+
+def test_cart_duplicates_merged_before_unique_index(tmp_path):
+    """Test that duplicate cart rows are merged when the unique index is added."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "migrated.db"}'})
+    with app.app_context():
+        upgrade(revision='d2a9c4e6b1f3')
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO products (id, name, description, price, image_url, category, fit,"
+                " size, color, material, style, season, gender)"
+                " VALUES (1, 'Hat', 'A hat', 9.99, 'hat.jpg', 'T-Shirts', 'Regular', 'M',"
+                " 'Black', 'Cotton', 'Casual', 'All-Season', 'Unisex')"))
+            connection.execute(text(
+                "INSERT INTO cart_items (id, session_id, product_id, quantity)"
+                " VALUES (1, 'user1', 1, 1), (2, 'user2', 1, 1), (3, 'user1', 1, 2)"))
+        upgrade(revision='e5c1a7b3d904')
+        with db.engine.connect() as connection:
+            rows = connection.execute(text(
+                'SELECT id, session_id, quantity FROM cart_items ORDER BY id')).all()
+        assert [tuple(row) for row in rows] == [(1, 'user1', 3), (2, 'user2', 1)]
+
+def test_product_attributes_encoded(tmp_path):
+    """Test that attribute strings become codes and back, keeping the search triggers."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "migrated.db"}'})
+    with app.app_context():
+        upgrade(revision='a4f8e2c6d917')
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO products (id, name, description, price, image_url, category, fit,"
+                " size, color, material, style, season, gender)"
+                " VALUES (1, 'Hat', 'A hat', 9.99, 'hat.jpg', 'Jeans', 'Slim', 'XL',"
+                " 'Navy', 'Wool', 'Sport', 'Winter', 'Women')"))
+        upgrade(revision='c8b2d5f1e7a3')
+        with db.engine.begin() as connection:
+            row = connection.execute(text(
+                'SELECT category, fit, size, color, material, style, season, gender'
+                ' FROM products')).one()
+            assert tuple(row) == (3, 1, 4, 2, 2, 2, 3, 1)
+            triggers = connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+            assert sorted(triggers) == ['products_fts_ad', 'products_fts_ai', 'products_fts_au']
+            connection.execute(text("UPDATE products SET name = 'Beanie'"))
+            assert connection.execute(text(
+                "SELECT count(*) FROM products_fts WHERE products_fts MATCH 'beanie'"
+            )).scalar() == 1
+
+        downgrade(revision='a4f8e2c6d917')
+        with db.engine.connect() as connection:
+            row = connection.execute(text('SELECT category, size, gender FROM products')).one()
+        assert tuple(row) == ('Jeans', 'XL', 'Women')
+
+def test_existing_products_get_skus(tmp_path):
+    """Test that products created before SKUs existed get the seeder's SKU for their id."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "migrated.db"}'})
+    with app.app_context():
+        upgrade(revision='f3d6b2e8c715')
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO products (id, name, description, price, image_url, category, fit,"
+                " size, color, material, style, season, gender)"
+                " VALUES (7, 'Hat', 'A hat', 9.99, 'hat.jpg', 'Jeans', 'Slim', 'XL',"
+                " 'Navy', 'Wool', 'Sport', 'Winter', 'Women')"))
+        upgrade(revision='a4f8e2c6d917')
+        with db.engine.connect() as connection:
+            assert connection.execute(text('SELECT sku FROM products')).scalar() == \
+                generate_sku(7)
@@ -33,7 +33,7 @@ def test_wsgi_template_paths():
 def test_wsgi_blueprints():
     """Test that all blueprints are registered."""
     app = create_app()
-    expected_blueprints = ['auth', 'cart', 'pages']
+    expected_blueprints = ['auth', 'cart', 'pages', 'api']
     registered_blueprints = list(app.blueprints.keys())
     
     for bp in expected_blueprints:
@@ -0,0 +1,96 @@
+"""
+Tests for static asset fingerprinting and serving.
+"""
+
+import gzip
+import io
+import os
+import shutil
+import pytest
+from viber.utils import assets
+from viber.utils.assets import IMMUTABLE_MAX_AGE, VENDOR_ASSETS, build_assets, vendor_assets
+
+@pytest.fixture
+def static_app(app, tmp_path):
+    """Point the application at a copy of the static folder."""
+    static_folder = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static_folder)
+    app.static_folder = str(static_folder)
+    return app
+
+def test_unbuilt_assets_link_originals(static_app, client):
+    """Test that pages link the plain static files and the CDN before a build."""
+    html = client.get('/about').get_data(as_text=True)
+    assert 'href="/static/css/style.css"' in html
+    assert VENDOR_ASSETS['vendor/bootstrap/bootstrap.min.css'][0] in html
+    response = client.get('/static/css/style.css')
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
+
+def test_build_fingerprints_and_compresses(static_app, runner):
+    """Test that the build writes hashed copies, gzip copies and a manifest."""
+    result = runner.invoke(args=['assets', 'build'])
+    assert result.exit_code == 0, result.output
+    manifest = build_assets(static_app.static_folder)  # A rebuild gives the same names
+    target = manifest['css/style.css']
+    assert target.startswith('dist/css/style.') and target.endswith('.css')
+    path = os.path.join(static_app.static_folder, *target.split('/'))
+    with open(path + '.gz', 'rb') as compressed, open(path, 'rb') as original:
+        assert gzip.decompress(compressed.read()) == original.read()
+
+def test_fingerprinted_assets_served_immutable(static_app, client):
+    """Test that built assets are linked and served precompressed with a long lifetime."""
+    target = build_assets(static_app.static_folder)['css/style.css']
+    html = client.get('/about').get_data(as_text=True)
+    assert f'href="/static/{target}"' in html
+
+    plain = client.get(f'/static/{target}')
+    assert plain.mimetype == 'text/css'
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.cache_control.max_age == IMMUTABLE_MAX_AGE
+    assert plain.cache_control.immutable and plain.cache_control.public
+    assert 'Accept-Encoding' in plain.vary
+
+    compressed = client.get(f'/static/{target}', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.mimetype == 'text/css'
+    assert gzip.decompress(compressed.data) == plain.data
+    plain.close()
+    compressed.close()
+
+def test_brotli_preferred_when_built(static_app, client):
+    """Test that a brotli copy is served to clients accepting it."""
+    target = build_assets(static_app.static_folder)['css/style.css']
+    with open(os.path.join(static_app.static_folder, *target.split('/')) + '.br', 'wb') as output:
+        output.write(b'brotli')
+    response = client.get(f'/static/{target}', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.data == b'brotli'
+    response.close()
+
+def test_static_paths_stay_inside_folder(static_app, client):
+    """Test that fingerprinted paths cannot escape the static folder."""
+    build_assets(static_app.static_folder)
+    assert client.get('/static/dist/..%2F..%2Fconftest.py').status_code == 404
+
+def test_vendored_assets_served_locally(static_app, client, monkeypatch):
+    """Test that vendored Bootstrap files are checked, saved and linked locally."""
+    content = b'/* bootstrap */'
+    digest = assets.b64encode(assets.hashlib.sha384(content).digest()).decode()
+    monkeypatch.setattr(assets, 'VENDOR_ASSETS', {
+        name: (url, f'sha384-{digest}') for name, (url, _) in VENDOR_ASSETS.items()})
+    monkeypatch.setattr(assets.urllib.request, 'urlopen',
+                        lambda url, timeout: io.BytesIO(content))
+    assert vendor_assets(static_app.static_folder) == list(VENDOR_ASSETS)
+    target = build_assets(static_app.static_folder)['vendor/bootstrap/bootstrap.min.css']
+    html = client.get('/about').get_data(as_text=True)
+    assert f'href="/static/{target}"' in html
+    assert 'cdn.jsdelivr.net/npm/bootstrap@' not in html
+
+def test_vendored_asset_integrity_checked(static_app, monkeypatch):
+    """Test that a download not matching its integrity hash is rejected."""
+    monkeypatch.setattr(assets.urllib.request, 'urlopen',
+                        lambda url, timeout: io.BytesIO(b'tampered'))
+    with pytest.raises(ValueError):
+        vendor_assets(static_app.static_folder)
+    assert not os.path.exists(os.path.join(static_app.static_folder, 'vendor'))
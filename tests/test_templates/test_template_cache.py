@@ -0,0 +1,52 @@
+"""
+Tests for the template bytecode cache and worker warm-up.
+"""
+
+import os
+import pytest
+from viber import create_app, db
+from viber.utils.template import WARM_UP_PATHS, warm_up
+
+@pytest.fixture
+def cached_app(tmp_path):
+    """Create an application loading templates from a bytecode cache directory."""
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'TEMPLATE_BYTECODE_CACHE': True,
+                      'TEMPLATE_CACHE_DIR': str(tmp_path / 'jinja_cache')})
+    with app.app_context():
+        db.create_all()
+    return app
+
+def test_compile_command(app, runner, tmp_path):
+    """Test that the compile command writes one cache entry per template."""
+    cache_dir = tmp_path / 'jinja_cache'
+    result = runner.invoke(args=['templates', 'compile', '--cache-dir', str(cache_dir)])
+    assert result.exit_code == 0, result.output
+    count = len(app.jinja_env.list_templates())
+    assert f'Compiled {count} templates' in result.output
+    assert len(os.listdir(cache_dir)) == count
+
+def test_pages_load_compiled_templates(cached_app, monkeypatch):
+    """Test that precompiled templates are rendered without compiling them again."""
+    result = cached_app.test_cli_runner().invoke(args=['templates', 'compile'])
+    assert result.exit_code == 0, result.output
+
+    def compile_source(*args, **kwargs):
+        raise AssertionError('template compiled at request time')
+
+    monkeypatch.setattr(cached_app.jinja_env, 'compile', compile_source)
+    client = cached_app.test_client()
+    for path in ('/', '/products'):
+        assert client.get(path).status_code == 200
+
+def test_warm_up_renders_pages(cached_app):
+    """Test that the warm-up loads every template and renders each page."""
+    with cached_app.app_context():
+        statuses = warm_up(cached_app)
+    assert statuses == {path: 200 for path in WARM_UP_PATHS}
+    assert len(cached_app.jinja_env.cache) == len(cached_app.jinja_env.list_templates())
+    assert os.listdir(cached_app.config['TEMPLATE_CACHE_DIR'])
+
+def test_bytecode_cache_disabled_by_default(app):
+    """Test that templates are compiled in memory unless the cache is enabled."""
+    assert app.jinja_env.bytecode_cache is None
@@ -2,9 +2,36 @@
 WSGI entry point for the Viber application.
 """
 
+import os
+from sqlalchemy.exc import OperationalError
 from viber import create_app
+from viber.utils.database import dispose_engines
+from viber.utils.page_cache import get_page_cache
+from viber.utils.snapshot import get_snapshot
+from viber.utils.template import warm_up
 
-app = create_app()
+# Served by several gunicorn workers sharing one SQLite database, and the
+# rendered anonymous pages through a cache file next to it
+app = create_app({'DATABASE_PROFILE': 'production', 'CATALOG_READ_ONLY_BIND': True,
+                  'CATALOG_SNAPSHOT': True, 'TEMPLATE_BYTECODE_CACHE': True,
+                  'PAGE_CACHE_PATH': os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                  'instance', 'page_cache.db')})
+
+# Load the catalog snapshot and render each page once when the application
+# is loaded, rather than on its first requests
+with app.app_context():
+    try:
+        get_snapshot()
+    except OperationalError as error:
+        app.logger.warning('Skipping warm-up, the database is not ready: %s', error)
+    else:
+        warm_up(app)
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        page_cache.close()
+# With --preload the workers are forked from this process, and must not
+# share the connections opened above
+dispose_engines(app)
 
 if __name__ == '__main__':
-    app.run(port=8080) 
\ No newline at end of file
+    app.run(port=8080)